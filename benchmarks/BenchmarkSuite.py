@@ -0,0 +1,135 @@
+"""
+Runs storage and route benchmarks on a synthetic database, run it with:
+python -m benchmarks.BenchmarkSuite --expenses 100000 --save results.json
+and compare a later run with it by --baseline results.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.Benchmarks import (find_regressions, load_results, run_benchmarks,
+                                   save_results)
+from benchmarks.StorageBenchmarks import create_storage_benchmarks
+from benchmarks.SyntheticDataset import generate_dataset
+from const import DATABASE_TABLES
+from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
+
+# Benchmarks slower than in the baseline by more than 20% are regressions
+DEFAULT_THRESHOLD = 0.2
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--expenses", type=int, default=10000,
+                        help="number of Expenses of a generated database")
+    parser.add_argument("--database",
+                        help="database to benchmark, generated if it doesn't exist")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the generated database")
+    parser.add_argument("--baseline", help="JSON results to compare with")
+    parser.add_argument("--save", help="JSON file to save the results to")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown against the baseline")
+    parser.add_argument("--only", default="",
+                        help="regular expression of benchmark names to run")
+    parser.add_argument("--skip-routes", action="store_true",
+                        help="don't run the route benchmarks")
+
+    return parser.parse_args(arguments)
+
+def print_result(name, result):
+    if "error" in result:
+        print("{:70} {}".format(name, result["error"]))
+    else:
+        print("{:70} {:12.6f}s (min {:.6f}s, {} calls)".format(
+            name, result["median"], result["min"], result["calls"]))
+
+def run_storage_benchmarks(database_path, scratch_path, only):
+    """Returns results of the storage benchmarks writing to the scratch database"""
+    benchmarks = create_storage_benchmarks(
+        SqliteDatabaseConnectionProvider(database_path, DATABASE_TABLES),
+        SqliteDatabaseConnectionProvider(scratch_path, DATABASE_TABLES))
+    benchmarks = {name: benchmark for name, benchmark in benchmarks.items()
+                  if re.search(only, name)}
+    results = {}
+
+    def on_measured(name, result):
+        results[name] = result
+
+        with contextlib.redirect_stdout(sys.__stdout__):
+            print_result(name, result)
+
+    # Persisters print what they write
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        run_benchmarks(benchmarks, on_measured)
+
+    return results
+
+def run_route_benchmarks(database_path, only):
+    """
+    Returns results of the route benchmarks run in a separate process,
+    they write to the database
+    """
+    environment = dict(os.environ, DATABASE_TYPE="sqlite",
+                       DATABASE_FILE=database_path)
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.RouteBenchmarks", only],
+        env=environment, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        check=True).stdout
+    results = json.loads(output)
+
+    for name, result in results.items():
+        print_result(name, result)
+
+    return results
+
+def main(arguments):
+    arguments = parse_arguments(arguments)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = arguments.database or os.path.join(directory, "expenses.db")
+
+        if not os.path.exists(database_path):
+            print("Generating {} expenses in {}".format(arguments.expenses,
+                                                        database_path))
+            # Closing checkpoints the write-ahead log before the copies
+            generate_dataset(database_path, arguments.expenses,
+                             arguments.seed).close()
+
+        scratch_path = os.path.join(directory, "scratch.db")
+        shutil.copy(database_path, scratch_path)
+        results = run_storage_benchmarks(database_path, scratch_path, arguments.only)
+
+        if not arguments.skip_routes:
+            # A fresh copy, the scratch database has write-ahead log files
+            routes_path = os.path.join(directory, "routes.db")
+            shutil.copy(database_path, routes_path)
+            results.update(run_route_benchmarks(routes_path, arguments.only))
+
+        expenses_count = SqliteDatabaseConnectionProvider(
+            database_path, DATABASE_TABLES).execute_query(
+                "SELECT COUNT(*) FROM {}".format(DATABASE_TABLES["expenses"]))[0][0]
+
+    dataset = {"expenses": expenses_count, "seed": arguments.seed}
+
+    if arguments.save:
+        save_results(arguments.save, results, dataset)
+
+    errors = [name for name, result in results.items() if "error" in result]
+    regressions = find_regressions(results, load_results(arguments.baseline),
+                                   arguments.threshold) \
+        if arguments.baseline else []
+
+    for name, baseline_median, median in regressions:
+        print("Regression of {}: {:.6f}s -> {:.6f}s".format(
+            name, baseline_median, median))
+
+    return 1 if errors or regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,78 @@
+"""Measures benchmarks and compares their results with baselines"""
+import json
+import statistics
+import time
+
+# A benchmark is repeated until it ran this many times and this long
+MIN_REPEAT = 3
+MIN_SECONDS = 0.2
+MAX_REPEAT = 1000
+
+def measure(benchmark):
+    """
+    Calls the benchmark (a function) repeatedly, returns the median
+    and the minimum of its durations in seconds with the number of calls
+    """
+    durations = []
+    started = time.perf_counter()
+
+    while len(durations) < MAX_REPEAT and (len(durations) < MIN_REPEAT or
+                                           time.perf_counter() - started < MIN_SECONDS):
+        start = time.perf_counter()
+        benchmark()
+        durations.append(time.perf_counter() - start)
+
+    return {
+        "median": statistics.median(durations),
+        "min": min(durations),
+        "calls": len(durations)
+    }
+
+def run_benchmarks(benchmarks, on_measured=None):
+    """
+    Measures name -> benchmark function pairs, returns name -> result
+    (or the error) dictionary
+    """
+    results = {}
+
+    for name, benchmark in benchmarks.items():
+        try:
+            results[name] = measure(benchmark)
+        except Exception as exception:
+            results[name] = {"error": "{}: {}".format(type(exception).__name__,
+                                                      exception)}
+
+        if on_measured:
+            on_measured(name, results[name])
+
+    return results
+
+def find_regressions(results, baseline, threshold):
+    """
+    Returns (name, baseline median, median) of benchmarks slower than
+    in the baseline by more than the threshold (0.2 means 20%)
+    """
+    regressions = []
+
+    for name, result in sorted(results.items()):
+        baseline_result = baseline.get(name)
+
+        if not baseline_result or "median" not in baseline_result or \
+                "median" not in result:
+            continue
+
+        if result["median"] > baseline_result["median"] * (1 + threshold):
+            regressions.append((name, baseline_result["median"], result["median"]))
+
+    return regressions
+
+def load_results(path):
+    """Returns benchmark results saved in the JSON file"""
+    with open(path) as results_file:
+        return json.load(results_file)["results"]
+
+def save_results(path, results, dataset):
+    """Saves benchmark results with the description of their dataset"""
+    with open(path, "w") as results_file:
+        json.dump({"dataset": dataset, "results": results}, results_file,
+                  indent=2, sort_keys=True)
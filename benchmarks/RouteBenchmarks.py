@@ -0,0 +1,123 @@
+"""
+Benchmarks of every REST route called through the Flask test client.
+The application reads the database from environment variables, so run it
+in a separate process on a copy of the benchmarked database with:
+DATABASE_TYPE=sqlite DATABASE_FILE=<database path> python -m benchmarks.RouteBenchmarks [regex]
+It prints name -> result JSON of the benchmarks
+"""
+import itertools
+import json
+import os
+import re
+import sys
+from urllib.parse import quote
+
+from benchmarks.Benchmarks import run_benchmarks
+from benchmarks.StorageBenchmarks import get_dataset_facts
+from date_utils import format_timestamp_as_date, get_period
+
+def get_route_calls(facts):
+    """
+    Returns (method, rule, URL factory, JSON factory) of the routes,
+    every call of a factory returns arguments of another request
+    """
+    month, name = facts["month"], facts["name"]
+    first_id = facts["first_expense_id"]
+    first_date, last_date = get_period(month, 12)
+    counter = itertools.count()
+    deleted_ids = itertools.count(facts["last_expense_id"], -1)
+    category = {"id": facts["category_id"], "name": None}
+
+    def create_expense():
+        index = next(counter)
+
+        return {"name": "Benchmark {}".format(index), "cost": 100 + index % 7,
+                "date": "2017-07-14", "category": category,
+                "tags": [{"name": "benchmark"}][:index % 2]}
+
+    return [
+        ("GET", "/", lambda: "/", None),
+        ("GET", "/analytics/shares/<latest_month>/<number_of_months>",
+         lambda: "/analytics/shares/{}/12".format(month), None),
+        ("GET", "/analytics/trends/<latest_month>/<number_of_months>",
+         lambda: "/analytics/trends/{}/120".format(month), None),
+        ("GET", "/categories", lambda: "/categories", None),
+        ("POST", "/categories", lambda: "/categories",
+         lambda: {"name": "Benchmark {}".format(next(counter))}),
+        ("GET", "/cost/<expense_name>", lambda: "/cost/" + quote(name), None),
+        ("POST", "/expense", lambda: "/expense", create_expense),
+        ("GET", "/expense-names/<name>",
+         lambda: "/expense-names/" + quote(name[:3]), None),
+        ("GET", "/expense/<expense_id>",
+         lambda: "/expense/{}".format(first_id), None),
+        ("PATCH", "/expense/<expense_id>",
+         lambda: "/expense/{}".format(first_id),
+         lambda: {"cost": 100 + next(counter) % 7}),
+        ("DELETE", "/expense/<expense_id>",
+         lambda: "/expense/{}".format(next(deleted_ids)), None),
+        ("POST", "/expenses/bulk", lambda: "/expenses/bulk",
+         lambda: [create_expense() for _ in range(100)]),
+        ("GET", "/expenses/<starting_month>/<number_of_months>",
+         lambda: "/expenses/{}/1".format(month), None),
+        ("GET", "/filter/<expense_name>",
+         lambda: "/filter/{}?limit=50".format(quote(name)), None),
+        ("GET", "/months", lambda: "/months", None),
+        ("GET", "/stats/query-cache", lambda: "/stats/query-cache", None),
+        ("GET", "/suggestions/<month>",
+         lambda: "/suggestions/{}".format(month), None),
+        ("POST", "/suggestions/refresh", lambda: "/suggestions/refresh", None),
+        ("GET", "/summary/<starting_month>/<number_of_months>",
+         lambda: "/summary/{}/12".format(month), None),
+        ("GET", "/tags", lambda: "/tags", None),
+        ("POST", "/tags", lambda: "/tags",
+         lambda: ["benchmark {}".format(next(counter)), "benchmark"]),
+        ("GET", "/totals", lambda: "/totals?from={}&to={}".format(
+            format_timestamp_as_date(first_date),
+            format_timestamp_as_date(last_date)), None)
+    ]
+
+def create_request(client, method, get_url, get_json):
+    """Returns a benchmark function sending the request to the client"""
+    def send():
+        response = client.open(get_url(), method=method,
+                               json=get_json() if get_json else None)
+
+        if response.status_code >= 400:
+            raise ValueError("{} {} answered {}".format(
+                method, response.request.path, response.status_code))
+
+    return send
+
+def create_route_benchmarks(app, connection_provider):
+    """
+    Returns name -> benchmark function pairs of the app's routes,
+    they write to the database of the connection provider
+    """
+    facts = get_dataset_facts(connection_provider)
+    client = app.test_client()
+
+    return {
+        "route.{} {}".format(method, rule): create_request(client, method,
+                                                           get_url, get_json)
+        for method, rule, get_url, get_json in get_route_calls(facts)
+    }
+
+if __name__ == "__main__":
+    from const import DATABASE_TABLES
+    from rest.routes import app
+    from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
+
+    only = sys.argv[1] if len(sys.argv) > 1 else ""
+    benchmarks = create_route_benchmarks(app, SqliteDatabaseConnectionProvider(
+        os.environ["DATABASE_FILE"], DATABASE_TABLES))
+    benchmarks = {name: benchmark for name, benchmark in benchmarks.items()
+                  if re.search(only, name)}
+    # Persisters print what they write, keep stdout for the results
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    try:
+        results = run_benchmarks(benchmarks)
+    finally:
+        sys.stdout = stdout
+
+    json.dump(results, sys.stdout)
@@ -0,0 +1,162 @@
+"""
+Benchmarks of every SqliteExpensesRetriever and SqliteExpensesPersister
+method called with arguments matching the benchmarked database
+"""
+import collections.abc
+import itertools
+
+from const import DATABASE_TABLES
+from date_utils import format_timestamp_as_date, get_month_of_timestamp, get_period
+from expense.Category import Category
+from expense.Expense import Expense
+from expense.Shop import Shop
+from expense.Tag import Tag
+from storage.InMemoryIndexes import InMemoryIndexes
+from storage.SqliteExpensesPersister import SqliteExpensesPersister
+from storage.SqliteExpensesRetriever import SqliteExpensesRetriever
+
+def get_dataset_facts(connection_provider):
+    """
+    Returns the latest month, the most frequent expense name, ids of
+    the first and the last Expense and a category id of the database
+    """
+    first_id, last_id, last_date = connection_provider.execute_query(
+        "SELECT MIN(expense_id), MAX(expense_id), MAX(purchase_date) "
+        "FROM {}".format(DATABASE_TABLES["expenses"]))[0]
+    name, category_id = connection_provider.execute_query(
+        "SELECT name, category_id FROM {} GROUP BY name, category_id "
+        "ORDER BY COUNT(*) DESC LIMIT 1".format(DATABASE_TABLES["expenses"]))[0]
+
+    return {
+        "month": get_month_of_timestamp(last_date),
+        "name": name,
+        "first_expense_id": first_id,
+        "last_expense_id": last_id,
+        "category_id": category_id
+    }
+
+def get_retriever_calls(facts):
+    """Returns (method name, arguments factory) of the retriever methods"""
+    month, name = facts["month"], facts["name"]
+    expense = Expense(facts["first_expense_id"], name, 0, 0, None, [])
+    first_date, last_date = get_period(month, 12)
+
+    return [
+        ("filter_expenses", lambda: (name, 50)),
+        ("filter_expenses_page", lambda: (name, 50)),
+        ("get_query_cache_stats", lambda: ()),
+        ("iterate_expenses", lambda: (month, 1)),
+        ("retrieve_categories", lambda: ()),
+        ("retrieve_category_shares", lambda: (month, 12)),
+        ("retrieve_common_expense_cost", lambda: (name,)),
+        ("retrieve_daily_totals", lambda: ()),
+        ("retrieve_expense", lambda: (facts["first_expense_id"],)),
+        ("retrieve_expense_columns", lambda: (first_date, last_date)),
+        ("retrieve_expense_cost_statistics", lambda: (name,)),
+        ("retrieve_expense_costs", lambda: ()),
+        ("retrieve_expense_name_counts", lambda: ()),
+        ("retrieve_expense_snapshot_rows", lambda: ()),
+        ("retrieve_expense_suggestions", lambda: (month,)),
+        ("retrieve_expense_tags", lambda: (expense,)),
+        ("retrieve_expenses", lambda: (month, 1)),
+        ("retrieve_expenses_page", lambda: (month, 12, 50)),
+        ("retrieve_month_counts", lambda: ()),
+        ("retrieve_months", lambda: ()),
+        ("retrieve_months_with_counts", lambda: ()),
+        ("retrieve_similar_expense_names", lambda: (name[:3], 10)),
+        ("retrieve_summary", lambda: (month, 12)),
+        ("retrieve_tags", lambda: ()),
+        ("retrieve_total", lambda: (format_timestamp_as_date(first_date),
+                                    format_timestamp_as_date(last_date))),
+        ("retrieve_trends", lambda: (month, 120))
+    ]
+
+def get_persister_calls(facts):
+    """
+    Returns (method name, arguments factory) of the persister methods,
+    every call of a factory returns arguments of another write
+    """
+    counter = itertools.count()
+    deleted_ids = itertools.count(facts["last_expense_id"], -1)
+    category = Category(facts["category_id"], None)
+    tags = [Tag(None, "benchmark"), Tag(None, "benchmark-other")]
+
+    def create_expense(index, expense_id=None):
+        return Expense(expense_id, "Benchmark {}".format(index), 100 + index % 7,
+                       1500000000 + index * 86400, category,
+                       tags[:index % 3])
+
+    return [
+        ("add_category", lambda: (Category(None, "Benchmark {}".format(
+            next(counter))),)),
+        ("add_expense", lambda: (create_expense(next(counter)),)),
+        ("add_expenses", lambda: ([create_expense(next(counter))
+                                   for _ in range(100)],)),
+        ("delete_expense", lambda: (next(deleted_ids),)),
+        ("persist_expense_tags", lambda: (create_expense(
+            next(counter), facts["first_expense_id"]),)),
+        ("persist_expenses_tags", lambda: ([
+            create_expense(next(counter), facts["first_expense_id"] + index)
+            for index in range(100)],)),
+        ("persist_shop", lambda: (Shop(None, "Benchmark {}".format(
+            next(counter))),)),
+        ("persist_tags", lambda: ([Tag(None, "benchmark {}".format(next(counter))),
+                                   tags[0]],)),
+        ("update_expense", lambda: (facts["first_expense_id"],
+                                    {"cost": 100 + next(counter) % 7}))
+    ]
+
+def consume(result):
+    """Reads lazily returned results, so their reading is measured"""
+    if isinstance(result, tuple):
+        for item in result:
+            consume(item)
+    elif isinstance(result, collections.abc.Iterator):
+        collections.deque(result, maxlen=0)
+
+def create_call(target, method_name, get_args, before_call=None):
+    """Returns a benchmark function calling the method of the target"""
+    method = getattr(target, method_name)
+
+    def call():
+        if before_call:
+            before_call()
+
+        consume(method(*get_args()))
+
+    return call
+
+def create_storage_benchmarks(connection_provider, scratch_connection_provider):
+    """
+    Returns name -> benchmark function pairs of retriever methods reading
+    the database (directly and through in-memory indexes with an empty
+    query cache) and of persister methods writing to the scratch database
+    """
+    facts = get_dataset_facts(connection_provider)
+    retriever = SqliteExpensesRetriever(DATABASE_TABLES, connection_provider)
+    in_memory_indexes = InMemoryIndexes()
+    indexed_retriever = SqliteExpensesRetriever(
+        DATABASE_TABLES, connection_provider, in_memory_indexes)
+    scratch_indexes = InMemoryIndexes()
+    persister = SqliteExpensesPersister(
+        DATABASE_TABLES, scratch_connection_provider,
+        in_memory_indexes=scratch_indexes)
+
+    in_memory_indexes.ensure_built(indexed_retriever)
+    scratch_indexes.ensure_built(SqliteExpensesRetriever(
+        DATABASE_TABLES, scratch_connection_provider, scratch_indexes))
+
+    benchmarks = {}
+
+    for method_name, get_args in get_retriever_calls(facts):
+        benchmarks["retriever." + method_name] = create_call(
+            retriever, method_name, get_args)
+        benchmarks["indexed_retriever." + method_name] = create_call(
+            indexed_retriever, method_name, get_args,
+            in_memory_indexes.get_query_cache().clear)
+
+    for method_name, get_args in get_persister_calls(facts):
+        benchmarks["persister." + method_name] = create_call(
+            persister, method_name, get_args)
+
+    return benchmarks
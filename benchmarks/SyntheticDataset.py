@@ -0,0 +1,147 @@
+"""
+Generates a synthetic Sqlite database of Expenses for benchmarks, run it with:
+python -m benchmarks.SyntheticDataset <database path> [number of expenses]
+"""
+import calendar
+import itertools
+import random
+import sys
+
+from const import DATABASE_TABLES
+from date_utils import add_months, parse_month
+from storage.ExpenseSuggestionsJob import ExpenseSuggestionsJob
+from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
+from storage.SqliteDbQueryProvider import SqliteDbQueryProvider
+
+CATEGORY_NAMES = ["Groceries", "Transport", "Bills", "Restaurants", "Health",
+                  "Clothes", "Entertainment", "Home", "Gifts", "Travel",
+                  "Education", "Other"]
+NAME_WORDS = ["Bread", "Milk", "Coffee", "Petrol", "Ticket", "Pizza", "Żurek",
+              "Shoes", "Cinema", "Book", "Pharmacy", "Lunch", "Taxi", "Cheese",
+              "Apples", "Gift card", "Jacket", "Concert", "Paint", "Course"]
+TAG_NAMES = ["work", "family", "holiday", "weekend", "online", "cash",
+             "card", "shared", "urgent", "planned", "sale", "refund"]
+# Monthly and yearly bills, which the suggestions job detects
+RECURRING_EXPENSES = [("Rent", "Bills", 250000, 1), ("Internet", "Bills", 6000, 1),
+                      ("Gym", "Health", 12000, 1), ("Insurance", "Bills", 90000, 12),
+                      ("Car service", "Transport", 70000, 12)]
+# Part of Expenses with tags and the most tags an Expense has
+TAGGED_RATIO = 0.3
+MAX_TAGS = 3
+BATCH_SIZE = 50000
+
+def get_number_of_names(number_of_expenses):
+    """Returns how many distinct names Expenses of the dataset have"""
+    return max(len(NAME_WORDS), min(20000, number_of_expenses // 100))
+
+def create_names(rng, number_of_expenses):
+    """
+    Returns (name, category index, usual cost) of the dataset's names,
+    the most frequently bought first
+    """
+    names = []
+
+    for index in range(get_number_of_names(number_of_expenses)):
+        word = NAME_WORDS[index % len(NAME_WORDS)]
+        name = word if index < len(NAME_WORDS) else \
+            "{} {}".format(word, index // len(NAME_WORDS))
+
+        names.append((name, rng.randrange(len(CATEGORY_NAMES)),
+                      int(rng.lognormvariate(7, 1))))
+
+    return names
+
+def get_day_timestamps(last_month, years):
+    """Returns midnight timestamps of every day of years ending with last_month"""
+    year, month = add_months(*parse_month(last_month), 1)
+    last_timestamp = calendar.timegm((year, month, 1, 0, 0, 0))
+    first_timestamp = calendar.timegm((year - years, month, 1, 0, 0, 0))
+
+    return list(range(first_timestamp, last_timestamp, 86400))
+
+def generate_expenses(rng, number_of_expenses, last_month, years):
+    """
+    Yields (name, cost, purchase date, category id) rows: recurring bills
+    and Expenses of Zipf distributed names, mostly bought for their usual cost
+    """
+    year, month = parse_month(last_month)
+    recurring_rows = []
+
+    for name, category_name, cost, interval in RECURRING_EXPENSES:
+        for months_ago in range(0, years * 12, interval):
+            month_start = calendar.timegm(
+                add_months(year, month, -months_ago) + (1, 0, 0, 0))
+
+            recurring_rows.append((name, cost, month_start + 86400 * 9,
+                                   CATEGORY_NAMES.index(category_name) + 1))
+
+    recurring_rows = recurring_rows[:number_of_expenses // 10]
+
+    yield from recurring_rows
+
+    names = create_names(rng, number_of_expenses)
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(names))))
+    days = get_day_timestamps(last_month, years)
+
+    for _ in range(number_of_expenses - len(recurring_rows)):
+        name, category_index, cost = rng.choices(names, cum_weights=weights)[0]
+
+        if rng.random() > 0.7:
+            cost = int(cost * rng.uniform(0.8, 1.3))
+
+        yield (name, cost, rng.choice(days), category_index + 1)
+
+def generate_dataset(database_path, number_of_expenses, seed=0,
+                     last_month="2023-12", years=10):
+    """
+    Fills an empty Sqlite database with categories, tags, number_of_expenses
+    Expenses (some tagged) and suggestions of the recurring ones,
+    the same ones for the same arguments
+    """
+    rng = random.Random(seed)
+    provider = SqliteDatabaseConnectionProvider(database_path, DATABASE_TABLES)
+    query_provider = SqliteDbQueryProvider(DATABASE_TABLES)
+
+    provider.ensure_necessary_tables_exist()
+
+    with provider.transaction() as transaction:
+        transaction.execute_many(
+            "INSERT INTO {} (category_id, name) VALUES (?, ?)".format(
+                DATABASE_TABLES["categories"]),
+            list(enumerate(CATEGORY_NAMES, start=1)))
+        transaction.execute_many(
+            "INSERT INTO {} (tag_id, name) VALUES (?, ?)".format(
+                DATABASE_TABLES["tags"]),
+            [("tag-{}".format(index), name) for index, name in enumerate(TAG_NAMES)])
+
+    rows = generate_expenses(rng, number_of_expenses, last_month, years)
+    expense_ids = itertools.count(1)
+
+    while True:
+        batch = [(next(expense_ids),) + row
+                 for row in itertools.islice(rows, BATCH_SIZE)]
+
+        if not batch:
+            break
+
+        tag_links = [(str(row[0]), "tag-{}".format(tag_index))
+                     for row in batch if rng.random() < TAGGED_RATIO
+                     for tag_index in rng.sample(range(len(TAG_NAMES)),
+                                                 rng.randint(1, MAX_TAGS))]
+
+        with provider.transaction() as transaction:
+            transaction.execute_many(
+                "INSERT INTO {} (expense_id, name, cost, purchase_date, " \
+                "category_id) VALUES (?, ?, ?, ?, ?)".format(
+                    DATABASE_TABLES["expenses"]), batch)
+            transaction.execute_many(
+                "INSERT INTO {} (expense_id, tag_id) VALUES (?, ?)".format(
+                    DATABASE_TABLES["expense_tags"]), tag_links)
+
+    ExpenseSuggestionsJob(provider, query_provider).run(parse_month(last_month)[0])
+    provider.execute_query("ANALYZE")
+
+    return provider
+
+if __name__ == "__main__":
+    generate_dataset(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
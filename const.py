@@ -11,7 +11,8 @@ DATABASE_TYPES = {
 }
 
 DATABASE_PATH = "/dbs/expenses-tracker.db"
-FULL_DATABASE_PATH = str(Path("{DIR_PATH}{DATABASE_PATH}".format(**locals())))
+FULL_DATABASE_PATH = os.environ.get("DATABASE_FILE") or \
+    str(Path("{DIR_PATH}{DATABASE_PATH}".format(**locals())))
 
 DATABASE_TABLES = {
     "categories": "categories",
@@ -19,11 +20,24 @@ DATABASE_TABLES = {
     "expense_tags": "expense_tags",
     "tags": "tags",
     "shops": "shops",
-    "suggestions": "expense_suggestions"
+    "suggestions": "expense_suggestions",
+    "monthly_totals": "monthly_totals"
 }
 
-DATABASE_TYPE = DATABASE_TYPES["mariadb"]
+DATABASE_TYPE = DATABASE_TYPES[os.environ.get("DATABASE_TYPE", "mariadb")]
 
 EXPENSES_TABLE_NAME = DATABASE_TABLES["expenses"]
 CATEGORIES_TABLE_NAME = DATABASE_TABLES["categories"]
 TAGS_TABLE_NAME = DATABASE_TABLES["tags"]
+
+DATABASE_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", 5))
+DATABASE_POOL_MAX_IDLE_TIME = int(os.environ.get("DATABASE_POOL_MAX_IDLE_TIME", 300))
+
+BULK_EXPENSES_LIMIT = int(os.environ.get("BULK_EXPENSES_LIMIT", 10000))
+
+# The number of models (e.g. Expenses) kept by the retrievers' query cache
+QUERY_CACHE_MAX_ITEMS = int(os.environ.get("QUERY_CACHE_MAX_ITEMS", 20000))
+
+# Keeps a columnar snapshot of all Expenses in memory to serve periods
+# of Expenses without database queries ("0" disables it)
+EXPENSE_SNAPSHOT_ENABLED = os.environ.get("EXPENSE_SNAPSHOT_ENABLED", "1") != "0"
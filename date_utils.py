@@ -0,0 +1,108 @@
+"""
+The module contains conversions between dates, months and timestamps
+(seconds since epoch). All of them use UTC.
+"""
+import calendar
+import time
+from datetime import date
+from functools import lru_cache
+
+def get_current_month():
+    """Returns the current month (YYYY-MM)"""
+    return time.strftime("%Y-%m", time.gmtime())
+
+def get_current_year():
+    """Returns the current year"""
+    return time.gmtime().tm_year
+
+@lru_cache(maxsize=4096)
+def convert_date_string_to_timestamp(date_string):
+    """Converts date (YYYY-MM-DD) to a timestamp of its midnight"""
+    try:
+        year, month, day = map(int, date_string.split("-"))
+
+        # Validates the day of the month, which timegm doesn't check
+        date(year, month, day)
+    except Exception as exception:
+        raise ValueError(exception)
+
+    return calendar.timegm((year, month, day, 0, 0, 0))
+
+@lru_cache(maxsize=4096)
+def format_timestamp_as_date(timestamp):
+    """Returns the date (YYYY-MM-DD) of the timestamp"""
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+def get_date_of_timestamp(timestamp) -> date:
+    """Returns the date of the timestamp"""
+    return date(*time.gmtime(timestamp)[:3])
+
+def get_month_of_timestamp(timestamp):
+    """Returns the month (YYYY-MM) of the timestamp"""
+    return format_timestamp_as_date(int(timestamp))[0:7]
+
+def parse_month(month_string):
+    """
+    Returns (year, month number) of a YYYY-MM month
+    (the day of a YYYY-MM-DD date is ignored)
+    """
+    try:
+        year, month = map(int, month_string.split("-")[0:2])
+    except (AttributeError, ValueError):
+        year, month = None, None
+
+    if not year or month not in range(1, 13):
+        raise ValueError("InvalidArgument: month must be a YYYY-MM month, "
+                         "got {}".format(month_string))
+
+    return year, month
+
+def add_months(year, month, number_of_months):
+    """Returns (year, month number) shifted by the number of months"""
+    year, month_index = divmod(year * 12 + month - 1 + number_of_months, 12)
+
+    return year, month_index + 1
+
+def format_month(year, month):
+    """Returns the month as YYYY-MM"""
+    return "{:04d}-{:02d}".format(year, month)
+
+@lru_cache(maxsize=1024)
+def get_period_months(latest_month, number_of_months):
+    """
+    Returns the first and the last month (YYYY-MM) of the period
+    of number_of_months ending with the latest_month
+    """
+    year, month = parse_month(latest_month)
+
+    return (format_month(*add_months(year, month, 1 - number_of_months)),
+            format_month(year, month))
+
+@lru_cache(maxsize=1024)
+def get_period(latest_month, number_of_months):
+    """
+    Returns timestamps of the first and the last second of the period
+    of number_of_months ending with the latest_month
+    """
+    year, month = parse_month(latest_month)
+    first_year, first_month = add_months(year, month, 1 - number_of_months)
+    next_year, next_month = add_months(year, month, 1)
+
+    return (calendar.timegm((first_year, first_month, 1, 0, 0, 0)),
+            calendar.timegm((next_year, next_month, 1, 0, 0, 0)) - 1)
+
+def get_month_boundaries(month_string):
+    """Returns timestamps of the first and the last second of the month"""
+    return get_period(month_string, 1)
+
+def get_months_between(first_month, last_month):
+    """Returns the list of months from first_month up to last_month"""
+    year, month = parse_month(first_month)
+    last_year, last_month_number = parse_month(last_month)
+    months = []
+
+    while (year, month) <= (last_year, last_month_number):
+        months.append(format_month(year, month))
+        year, month = add_months(year, month, 1)
+
+    return months
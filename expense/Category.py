@@ -1,8 +1,14 @@
 """The module contains Category class"""
 import uuid
+import weakref
 
 class Category:
     """The class is a model for Categories"""
+    __slots__ = ("__category_id", "__name", "__weakref__")
+
+    # Shared instances of Categories read from the database
+    __instances = weakref.WeakValueDictionary()
+
     def __init__(self, category_id, name):
         self.__category_id = category_id
         self.__name = name
@@ -26,6 +32,21 @@ class Category:
         """Returns a string representation of the Category"""
         return "{} ({})".format(self.get_name(), self.get_category_id())
 
+    @classmethod
+    def get_shared(cls, category_id, name):
+        """
+        Returns the Category shared by everyone who uses the same id and name
+        while it is referenced, so repeated rows don't allocate new ones
+        """
+        key = (category_id, name)
+        category = cls.__instances.get(key)
+
+        if category is None:
+            category = cls(category_id, name)
+            cls.__instances[key] = category
+
+        return category
+
     @classmethod
     def from_json(cls, json):
         return Category(json["id"] if "id" in json else str(uuid.uuid4()), json["name"])
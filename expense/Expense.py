@@ -1,13 +1,17 @@
 """The module contains Expense class"""
 import uuid
-from datetime import date, datetime
+from datetime import datetime
 from expense.Category import Category
 from expense.Tag import Tag
-import pendulum
+from date_utils import convert_date_string_to_timestamp, format_timestamp_as_date
+from validation_utils import validate_dict_keys, validate_non_empty_string
 
 class Expense:
     """The class is a model for a single Expense"""
 
+    __slots__ = ("__expense_id", "__name", "__cost", "__date", "__category",
+                 "__tags", "__date_string")
+
     def __init__(self, expense_id, name, cost, date, category, tags):
         self.__expense_id = expense_id
         self.__name = name
@@ -15,6 +19,7 @@ class Expense:
         self.__date = date if date else (datetime.today() - datetime(1970,1,1)).total_seconds()
         self.__category = category
         self.__tags = tags
+        self.__date_string = None
 
     def get_expense_id(self):
         """Returns the id of the Expense"""
@@ -42,7 +47,10 @@ class Expense:
 
     def get_purchase_date_string(self):
         """Returns the date in form of user-friendly string"""
-        return date.fromtimestamp(self.__date).strftime("%Y-%m-%d")
+        if self.__date_string is None:
+            self.__date_string = format_timestamp_as_date(self.__date)
+
+        return self.__date_string
 
     def to_json(self):
         """Returns a dictionary which can be used for JSON output"""
@@ -71,11 +79,34 @@ class Expense:
                        convert_date_string_to_timestamp(json["date"]),
                        category, tags)
 
-def convert_date_string_to_timestamp(date_string):
-    """Converts date (YYYY-MM-DD) to a number"""
+def validate_expense_json(json, parameter_name):
+    """Raises ValueError if the dictionary can't be read by Expense.from_json"""
+    validate_dict_keys(json, parameter_name,
+                       ["name", "cost", "date", "category", "tags"])
+    validate_non_empty_string(json["name"], parameter_name + ".name")
+
+    if (not isinstance(json["cost"], (int, float)) or
+            isinstance(json["cost"], bool)):
+        raise ValueError("InvalidArgument: {}.cost must be a number"
+                         .format(parameter_name))
+
+    validate_non_empty_string(json["date"], parameter_name + ".date")
+
     try:
-        year, month, day = map(int, date_string.split("-"))
+        convert_date_string_to_timestamp(json["date"])
+    except ValueError:
+        raise ValueError("InvalidArgument: {}.date must be a YYYY-MM-DD date"
+                         .format(parameter_name))
+
+    validate_dict_keys(json["category"], parameter_name + ".category",
+                       ["id", "name"])
+
+    if not isinstance(json["tags"], list):
+        raise ValueError("InvalidArgument: {}.tags must be a list"
+                         .format(parameter_name))
+
+    for index, tag in enumerate(json["tags"]):
+        tag_name = "{}.tags[{}]".format(parameter_name, index)
 
-        return pendulum.datetime(year, month, day).int_timestamp
-    except Exception as exception:
-        raise ValueError(exception)
+        validate_dict_keys(tag, tag_name, ["name"])
+        validate_non_empty_string(tag["name"], tag_name + ".name")
@@ -2,6 +2,8 @@
 
 class Shop:
     """The class is a model for Shops"""
+    __slots__ = ("__shop_id", "__name")
+
     def __init__(self, shop_id, name):
         self.__shop_id = shop_id if shop_id else None
         self.__name = name
@@ -26,10 +28,13 @@ class Shop:
         return "{} ({})".format(self.get_name(), self.get_shop_id())
 
     def __eq__(self, other):
+        if not isinstance(other, Shop):
+            return NotImplemented
+
         return self.__name == other.get_name()
 
     def __hash__(self):
-        return int("".join([str(ord(ch)) for ch in self.__name]))
+        return hash(self.__name)
 
     @classmethod
     def from_json(cls, json):
@@ -1,8 +1,14 @@
 """The module contains Tag class"""
 import uuid
+import weakref
 
 class Tag:
-    """The class is a model for Categories"""
+    """The class is a model for Tags (equal if their names are equal)"""
+    __slots__ = ("__tag_id", "__name", "__weakref__")
+
+    # Shared instances of Tags read from the database
+    __instances = weakref.WeakValueDictionary()
+
     def __init__(self, tag_id, name):
         self.__tag_id = tag_id if tag_id else str(uuid.uuid4())
         self.__name = name
@@ -27,10 +33,28 @@ class Tag:
         return "{} ({})".format(self.get_name(), self.get_tag_id())
 
     def __eq__(self, other):
+        if not isinstance(other, Tag):
+            return NotImplemented
+
         return self.__name == other.get_name()
 
     def __hash__(self):
-        return int("".join([str(ord(ch)) for ch in self.__tag_id][:17]))
+        return hash(self.__name)
+
+    @classmethod
+    def get_shared(cls, tag_id, name):
+        """
+        Returns the Tag shared by everyone who uses the same id and name
+        while it is referenced, so repeated rows don't allocate new ones
+        """
+        key = (tag_id, name)
+        tag = cls.__instances.get(key)
+
+        if tag is None:
+            tag = cls(tag_id, name)
+            cls.__instances[key] = tag
+
+        return tag
 
     @classmethod
     def from_json(cls, json):
@@ -3,6 +3,7 @@ from waitress import serve
 from rest.routes import app
 from const import DATABASE_TYPE, DEBUG_MODE
 from storage.DatabaseConnectionProviderFactory import DatabaseConnectionProviderFactory
+from storage.ExpensesRetrieverFactory import ExpensesRetrieverFactory
 
 def run_server(debug = False):
     if debug:
@@ -17,4 +18,6 @@ if __name__ == "__main__":
     connection_provider = DatabaseConnectionProviderFactory.create(DATABASE_TYPE)
 
     connection_provider.ensure_necessary_tables_exist()
+    # Builds in-memory indexes before the first request is served
+    ExpensesRetrieverFactory.create(DATABASE_TYPE)
     run_server(DEBUG_MODE)
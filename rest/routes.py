@@ -1,13 +1,23 @@
-from flask import Flask, jsonify, render_template, request, make_response
+import json
+from functools import wraps
+
+from flask import (Flask, Response, jsonify, render_template, request,
+                   make_response, stream_with_context)
 from flask_cors import CORS
 from flask_restful import Resource, Api
 
 from expense.Category import Category
 from expense.Tag import Tag
-from expense.Expense import Expense, convert_date_string_to_timestamp
+from expense.Expense import Expense, validate_expense_json
+from storage.DatabaseConnectionProviderFactory import DatabaseConnectionProviderFactory
+from storage.DbQueryProviderFactory import DbQueryProviderFactory
+from storage.ExpenseSuggestionsJob import ExpenseSuggestionsJob
 from storage.ExpensesPersisterFactory import ExpensesPersisterFactory
 from storage.ExpensesRetrieverFactory import ExpensesRetrieverFactory
-from const import DATABASE_TYPE
+from storage.InMemoryIndexesFactory import InMemoryIndexesFactory
+from storage.DataVersions import CATEGORIES, EXPENSES, SUGGESTIONS, TAGS
+from date_utils import get_current_month, get_period
+from const import BULK_EXPENSES_LIMIT, DATABASE_TYPE, DATABASE_TYPES
 
 app = Flask(__name__)
 CORS(app)
@@ -28,9 +38,67 @@ def get_expenses_retriever():
 def get_expenses_persister():
     return ExpensesPersisterFactory.create(DATABASE_TYPE)
 
+def get_data_versions():
+    return InMemoryIndexesFactory.create(DATABASE_TYPE).get_data_versions()
+
+def versioned(*tables, get_extra_tag=None):
+    """
+    Tags GET responses with an ETag of the tables' data versions (and
+    the extra tag of data not kept in tables) and answers 304 Not Modified
+    without calling the view if the client has the response already
+    """
+    def decorator(view):
+        @wraps(view)
+        def versioned_view(*args, **kwargs):
+            if request.method != "GET":
+                return view(*args, **kwargs)
+
+            # Read before the view, so a concurrent write can't be missed
+            etag = get_data_versions().get_etag(*tables)
+
+            if get_extra_tag:
+                etag += "-" + get_extra_tag()
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+
+            return response
+
+        return versioned_view
+
+    return decorator
+
 def convert_models_to_json(models):
     return list(map(lambda model: model.to_json(), models))
 
+def stream_models_as_json(models, batch_size=100):
+    """Yields a JSON array of the models in chunks of batch_size models"""
+    yield "["
+
+    batch = []
+    separator = ""
+
+    for model in models:
+        batch.append(json.dumps(model.to_json()))
+
+        if len(batch) == batch_size:
+            yield separator + ",".join(batch)
+
+            batch = []
+            separator = ","
+
+    if batch:
+        yield separator + ",".join(batch)
+
+    yield "]"
+
 def group_expenses_by_months(expenses):
     grouped_expenses = {}
 
@@ -38,30 +106,57 @@ def group_expenses_by_months(expenses):
         return grouped_expenses
 
     for expense in expenses:
-        month = expense.get_purchase_date_string()[0:7]
+        expense_json = expense.to_json()
 
-        if month in grouped_expenses:
-            grouped_expenses[month].append(expense.to_json())
-        else:
-            grouped_expenses[month] = [expense.to_json()]
+        grouped_expenses.setdefault(expense_json["date"][0:7], []).append(expense_json)
 
     return grouped_expenses
 
 @app.route("/cost/<expense_name>", methods=["GET"])
+@versioned(EXPENSES)
 def get_common_cost(expense_name):
+    """
+    Returns the common cost of Expenses with the name
+    (with their cost statistics if ?details=1 is given)
+    """
     if request.method == "GET":
         expenses_retriever = get_expenses_retriever()
+        common_cost = expenses_retriever.retrieve_common_expense_cost(expense_name)
 
-        return jsonify(expenses_retriever.retrieve_common_expense_cost(expense_name))
+        if request.args.get("details", 0, type=int):
+            statistics = expenses_retriever.retrieve_expense_cost_statistics(
+                expense_name)
+
+            return jsonify(dict(statistics or {"count": 0}, name=expense_name,
+                                common_cost=common_cost))
+
+        return jsonify(common_cost)
 
 @app.route("/filter/<expense_name>", methods=["GET"])
+@versioned(EXPENSES, CATEGORIES, TAGS)
 def filter_expenses(expense_name):
     if request.method == "GET":
         expenses_retriever = get_expenses_retriever()
-        expenses = expenses_retriever.filter_expenses(expense_name)
+        page_size = request.args.get("page_size", type=int)
+
+        if page_size is not None:
+            try:
+                expenses, next_cursor = expenses_retriever.filter_expenses_page(
+                    expense_name, page_size, request.args.get("cursor"))
+            except ValueError as error:
+                return jsonify({"error": str(error)}), 400
 
-        if expenses:
-            return jsonify(group_expenses_by_months(expenses))
+            return jsonify({
+                "expenses": group_expenses_by_months(expenses),
+                "next_cursor": next_cursor
+            })
+
+        expenses = expenses_retriever.filter_expenses(
+            expense_name,
+            request.args.get("limit", type=int),
+            request.args.get("offset", 0, type=int))
+
+        return jsonify(group_expenses_by_months(expenses))
 
 @app.route("/expense", methods = ["POST"])
 def add_expense():
@@ -74,21 +169,45 @@ def add_expense():
 
         return jsonify(expense.to_json())
 
+@app.route("/expenses/bulk", methods = ["POST"])
+def add_expenses():
+    """
+    Adds a JSON array of Expenses in a single transaction,
+    returns ids assigned to them
+    """
+    json_data = request.get_json(force=True)
+
+    try:
+        if not isinstance(json_data, list) or not json_data:
+            raise ValueError("InvalidArgument: expenses must be a non-empty list")
+
+        if len(json_data) > BULK_EXPENSES_LIMIT:
+            raise ValueError("InvalidArgument: at most {} expenses can be "
+                             "added at once".format(BULK_EXPENSES_LIMIT))
+
+        for index, expense_json in enumerate(json_data):
+            validate_expense_json(expense_json, "expenses[{}]".format(index))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    expenses = [Expense.from_json(expense_json) for expense_json in json_data]
+    expense_ids = get_expenses_persister().add_expenses(expenses)
+
+    return jsonify({"ids": expense_ids})
+
 @app.route("/expense/<expense_id>", methods = ["GET", "PATCH", "DELETE"])
+@versioned(EXPENSES, CATEGORIES, TAGS)
 def update_expense(expense_id):
     if request.method == "PATCH":
         persister = get_expenses_persister()
-        expenses_retriever = get_expenses_retriever()
-        expense = expenses_retriever.retrieve_expense(expense_id)
 
-        if expense:
-            json_data = request.get_json(force=True)
-
-            if "date" in json_data:
-                json_data["date"] = convert_date_string_to_timestamp(json_data["date"])
-
-            expense = persister.update_expense(expense_id, json_data)
+        try:
+            expense = persister.update_expense(expense_id,
+                                               request.get_json(force=True))
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
 
+        if expense:
             return jsonify(expense.to_json())
 
     if request.method == "GET":
@@ -98,30 +217,147 @@ def update_expense(expense_id):
         if expense:
             return jsonify(expense.to_json())
 
+    if request.method == "DELETE":
+        persister = get_expenses_persister()
+        expense = persister.delete_expense(expense_id)
+
+        if expense:
+            return jsonify(expense.to_json())
+
+    return jsonify({"error": "Expense {} not found".format(expense_id)}), 404
+
 @app.route("/expenses/<starting_month>/<number_of_months>", methods = ["GET"])
+@versioned(EXPENSES, CATEGORIES, TAGS)
 def retrieve_expenses(starting_month, number_of_months):
     """Returns a JSON with all Expenses for the selected period"""
     if request.method != "GET":
         return None
 
     retriever = get_expenses_retriever()
-    expenses = retriever.retrieve_expenses(starting_month, int(number_of_months))
-    expenses_as_json = convert_models_to_json(expenses)
+    page_size = request.args.get("page_size", type=int)
+
+    if page_size is not None:
+        try:
+            expenses, next_cursor = retriever.retrieve_expenses_page(
+                starting_month, int(number_of_months), page_size,
+                request.args.get("cursor"))
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+
+        return jsonify({
+            "expenses": convert_models_to_json(expenses),
+            "next_cursor": next_cursor
+        })
+
+    # Errors raised by the stream can't change its status anymore
+    try:
+        get_period(starting_month, int(number_of_months))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    expenses = retriever.iterate_expenses(starting_month, int(number_of_months))
+
+    return Response(stream_with_context(stream_models_as_json(expenses)),
+                    mimetype="application/json")
+
+@app.route("/summary/<starting_month>/<number_of_months>", methods = ["GET"])
+@versioned(EXPENSES, CATEGORIES)
+def retrieve_summary(starting_month, number_of_months):
+    """Returns a JSON with Expense totals per month and category"""
+    if request.method != "GET":
+        return None
+
+    retriever = get_expenses_retriever()
+
+    try:
+        return jsonify(retriever.retrieve_summary(starting_month,
+                                                  int(number_of_months)))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+@app.route("/analytics/trends/<latest_month>/<number_of_months>",
+           methods = ["GET"])
+@versioned(EXPENSES, CATEGORIES)
+def retrieve_trends(latest_month, number_of_months):
+    """
+    Returns a JSON with monthly totals, 3 and 12 months averages and
+    year-over-year deltas of all Expenses and per category
+    """
+    retriever = get_expenses_retriever()
+
+    try:
+        return jsonify(retriever.retrieve_trends(latest_month,
+                                                 int(number_of_months)))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+@app.route("/analytics/shares/<latest_month>/<number_of_months>",
+           methods = ["GET"])
+@versioned(EXPENSES, CATEGORIES)
+def retrieve_category_shares(latest_month, number_of_months):
+    """Returns a JSON with totals and shares of spending per category"""
+    retriever = get_expenses_retriever()
 
-    return jsonify(expenses_as_json)
+    try:
+        return jsonify(retriever.retrieve_category_shares(
+            latest_month, int(number_of_months)))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+@app.route("/totals", methods = ["GET"])
+@versioned(EXPENSES)
+def retrieve_total():
+    """
+    Returns a JSON with the total cost of Expenses purchased between
+    the ?from= and ?to= dates (YYYY-MM-DD, both optional) of all
+    categories or of the ?category= id
+    """
+    first_date = request.args.get("from")
+    last_date = request.args.get("to")
+    category_id = request.args.get("category")
+
+    if category_id is not None:
+        if not category_id.lstrip("-").isdigit():
+            return jsonify({"error": "InvalidArgument: category must be "
+                            "an integer id, got {}".format(category_id)}), 400
+
+        category_id = int(category_id)
+
+    try:
+        total = get_expenses_retriever().retrieve_total(first_date, last_date,
+                                                        category_id)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    return jsonify({"from": first_date, "to": last_date,
+                    "category": category_id, "total": total})
 
 @app.route("/months", methods = ["GET"])
+@versioned(EXPENSES, get_extra_tag=get_current_month)
 def retrieve_months():
-    """Returns a JSON array with all available months"""
+    """
+    Returns a JSON array with all available months
+    (with numbers of Expenses if ?counts=1 is given)
+    """
     if request.method != "GET":
         return None
 
     retriever = get_expenses_retriever()
+
+    if request.args.get("counts", 0, type=int):
+        return jsonify(retriever.retrieve_months_with_counts())
+
     months = retriever.retrieve_months()
 
     return jsonify(months)
 
+@app.route("/stats/query-cache", methods = ["GET"])
+def retrieve_query_cache_stats():
+    """Returns a JSON with statistics of the query results cache"""
+    return jsonify(get_expenses_retriever().get_query_cache_stats())
+
 @app.route("/tags", methods = ["GET"])
+@versioned(TAGS)
 def retrieve_tags():
     """Returns a JSON array with all the tags from database"""
     if request.method != "GET":
@@ -150,16 +386,19 @@ def add_tags():
     return None
 
 class ExpenseNames(Resource):
+    @versioned(EXPENSES, CATEGORIES)
     def get(self, name):
         if not name:
             return jsonify([])
 
         expenses_retriever = get_expenses_retriever()
-        expense_names = expenses_retriever.retrieve_similar_expense_names(name)
+        expense_names = expenses_retriever.retrieve_similar_expense_names(
+            name, request.args.get("limit", type=int))
 
         return jsonify(expense_names)
 
 class Categories(Resource):
+    @versioned(CATEGORIES)
     def get(self):
         expenses_retriever = get_expenses_retriever()
         categories = expenses_retriever.retrieve_categories()
@@ -180,13 +419,34 @@ class Categories(Resource):
 
         return jsonify(categories_as_json)
 
+@app.route("/suggestions/refresh", methods = ["POST"])
+def refresh_suggestions():
+    """
+    Replaces expense suggestions with the recurring Expenses,
+    returns numbers of added, updated and deleted suggestions
+    """
+    if DATABASE_TYPE != DATABASE_TYPES["sqlite"]:
+        return jsonify({"error": "Suggestions require Sqlite database"}), 501
+
+    added, updated, deleted = ExpenseSuggestionsJob(
+        DatabaseConnectionProviderFactory.create(DATABASE_TYPE),
+        DbQueryProviderFactory.create(DATABASE_TYPE),
+        InMemoryIndexesFactory.create(DATABASE_TYPE)).run()
+
+    return jsonify({"added": added, "updated": updated, "deleted": deleted})
+
 class ExpenseSugestions(Resource):
+    @versioned(EXPENSES, CATEGORIES, SUGGESTIONS)
     def get(self, month):
         if not month:
             return jsonify([])
 
         expenses_retriever = get_expenses_retriever()
-        suggestions = expenses_retriever.retrieve_expense_suggestions(month)
+
+        try:
+            suggestions = expenses_retriever.retrieve_expense_suggestions(month)
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
 
         return jsonify(convert_models_to_json(suggestions))
 
@@ -7,5 +7,5 @@ setup(name='Expenses Tracker Backend',
       author='Kobonk',
       author_email='kobonk@kobonk.com',
       license='MIT',
-      packages=['expense', 'rest', 'storage', 'tests'],
+      packages=['benchmarks', 'expense', 'rest', 'storage', 'tests'],
       zip_safe=False)
@@ -0,0 +1,201 @@
+"""Provides a thread-safe pool of reusable database connections"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+class ConnectionPool:
+    """
+    Keeps up to `size` open connections and hands them out to callers.
+    Connections are health-checked on checkout and closed after staying
+    idle for longer than `max_idle_time` seconds (None disables eviction).
+    """
+
+    def __init__(self, create_connection, size=5, max_idle_time=None,
+                 check_connection=None):
+        if not callable(create_connection):
+            raise ValueError("InvalidArgument: create_connection must be "
+                             "callable")
+
+        if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+            raise ValueError("InvalidArgument: size must be a positive "
+                             "integer")
+
+        self.__create_connection = create_connection
+        self.__size = size
+        self.__max_idle_time = max_idle_time
+        self.__check_connection = check_connection
+        self.__idle_connections = deque()
+        self.__open_connections = 0
+        self.__condition = threading.Condition()
+        self.__closed = False
+
+    def get_size(self):
+        """Returns the maximal number of open connections"""
+        return self.__size
+
+    def get_open_connections_count(self):
+        """Returns the number of currently open connections"""
+        with self.__condition:
+            return self.__open_connections
+
+    def get_idle_connections_count(self):
+        """Returns the number of open connections waiting for checkout"""
+        with self.__condition:
+            return len(self.__idle_connections)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Checks out a connection for the duration of the with block"""
+        connection = self.checkout(timeout)
+        healthy = True
+
+        try:
+            yield connection
+        except Exception:
+            healthy = self.__is_healthy(connection)
+
+            raise
+        finally:
+            self.checkin(connection, discard=not healthy)
+
+    def checkout(self, timeout=None):
+        """
+        Returns a healthy connection from the pool, opening a new one if
+        there is room for it. Blocks up to `timeout` seconds (forever if None)
+        when all connections are in use.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            connection = self.__take_idle_connection_or_slot(deadline)
+
+            if connection is None:
+                return self.__open_connection()
+
+            if self.__is_healthy(connection):
+                return connection
+
+            self.__discard(connection)
+
+    def checkin(self, connection, discard=False):
+        """Returns the connection to the pool (or closes it if discarded)"""
+        if discard:
+            self.__discard(connection)
+
+            return None
+
+        with self.__condition:
+            if self.__closed:
+                self.__open_connections -= 1
+                self.__close(connection)
+            else:
+                self.__idle_connections.append((connection, time.monotonic()))
+
+            self.__condition.notify()
+
+    def evict_idle_connections(self):
+        """Closes connections which stayed idle for too long"""
+        with self.__condition:
+            expired = self.__pop_expired_connections()
+
+        for connection in expired:
+            self.__close(connection)
+
+    def close(self):
+        """Closes all idle connections and the ones returned from now on"""
+        with self.__condition:
+            self.__closed = True
+            idle_connections = [c for c, _ in self.__idle_connections]
+            self.__idle_connections.clear()
+            self.__open_connections -= len(idle_connections)
+            self.__condition.notify_all()
+
+        for connection in idle_connections:
+            self.__close(connection)
+
+    def __take_idle_connection_or_slot(self, deadline):
+        """
+        Returns the most recently used idle connection or None when the caller
+        got a free slot for opening a new connection
+        """
+        expired = []
+
+        try:
+            with self.__condition:
+                while True:
+                    if self.__closed:
+                        raise RuntimeError("ConnectionPool is closed")
+
+                    expired.extend(self.__pop_expired_connections())
+
+                    if self.__idle_connections:
+                        connection, _ = self.__idle_connections.pop()
+
+                        return connection
+
+                    if self.__open_connections < self.__size:
+                        self.__open_connections += 1
+
+                        return None
+
+                    remaining = None if deadline is None \
+                        else deadline - time.monotonic()
+
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("ConnectionPool: no connection "
+                                           "available within timeout")
+
+                    self.__condition.wait(remaining)
+        finally:
+            for connection in expired:
+                self.__close(connection)
+
+    def __pop_expired_connections(self):
+        """Removes expired connections from idle ones (the lock must be held)"""
+        if self.__max_idle_time is None:
+            return []
+
+        expired = []
+        now = time.monotonic()
+
+        while (self.__idle_connections and
+               now - self.__idle_connections[0][1] > self.__max_idle_time):
+            connection, _ = self.__idle_connections.popleft()
+            expired.append(connection)
+
+        self.__open_connections -= len(expired)
+
+        return expired
+
+    def __open_connection(self):
+        try:
+            return self.__create_connection()
+        except Exception:
+            self.__release_slot()
+
+            raise
+
+    def __is_healthy(self, connection):
+        if not self.__check_connection:
+            return True
+
+        try:
+            return self.__check_connection(connection) is not False
+        except Exception:
+            return False
+
+    def __discard(self, connection):
+        self.__release_slot()
+        self.__close(connection)
+
+    def __release_slot(self):
+        with self.__condition:
+            self.__open_connections -= 1
+            self.__condition.notify()
+
+    def __close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,126 @@
+"""The module contains in-memory statistics of Expense costs"""
+import threading
+
+from storage.ExpenseNamesIndex import normalize_name
+
+# The number of Expenses with the same cost which make it the common cost
+COMMON_COST_MIN_COUNT = 5
+
+def get_median(cost_counts, count):
+    """Returns the median of costs with their counts (count in total)"""
+    lower_index, upper_index = (count - 1) // 2, count // 2
+    lower_cost = None
+    position = 0
+
+    for cost in sorted(cost_counts):
+        position += cost_counts[cost]
+
+        if lower_cost is None and position > lower_index:
+            lower_cost = cost
+
+        if position > upper_index:
+            return lower_cost if lower_cost == cost else (lower_cost + cost) / 2
+
+def create_statistics(purchases):
+    """Returns statistics of (purchase date, cost) -> count purchases"""
+    cost_counts = {}
+
+    for (_, cost), count in purchases.items():
+        cost_counts[cost] = cost_counts.get(cost, 0) + count
+
+    count = sum(cost_counts.values())
+    # The most frequent cost, the lowest one on a tie
+    modal_cost = min(cost_counts, key=lambda cost: (-cost_counts[cost], cost))
+    # The cost of the latest purchase, the highest one on the same day
+    _, last_cost = max(purchases)
+
+    return {
+        "count": count,
+        "modal_cost": modal_cost,
+        "modal_count": cost_counts[modal_cost],
+        "last_cost": last_cost,
+        "median_cost": get_median(cost_counts, count),
+        "min_cost": min(cost_counts),
+        "max_cost": max(cost_counts)
+    }
+
+class CostStatistics:
+    """
+    Keeps costs of Expenses per name (matched case-insensitively) as counts
+    of (purchase date, cost) pairs, so Expenses can be removed as easily
+    as added. Statistics of a name are computed once after it changes.
+    """
+
+    def __init__(self):
+        self.__purchases = {}
+        self.__statistics = {}
+        self.__lock = threading.RLock()
+
+    def build(self, rows):
+        """Replaces the content with (name, purchase date, cost, count) rows"""
+        with self.__lock:
+            self.__purchases = {}
+            self.__statistics = {}
+
+            for name, purchase_date, cost, count in rows:
+                self.add(name, purchase_date, cost, count)
+
+    def add(self, name, purchase_date, cost, count=1):
+        """Adds purchases of the Expense with the name"""
+        key = normalize_name(name)
+
+        if not key or count <= 0:
+            return None
+
+        with self.__lock:
+            purchases = self.__purchases.setdefault(key, {})
+            purchases[(purchase_date, cost)] = \
+                purchases.get((purchase_date, cost), 0) + count
+            self.__statistics.pop(key, None)
+
+    def remove(self, name, purchase_date, cost, count=1):
+        """Removes purchases of the Expense with the name"""
+        key = normalize_name(name)
+
+        with self.__lock:
+            purchases = self.__purchases.get(key)
+
+            if not purchases or (purchase_date, cost) not in purchases:
+                return None
+
+            purchases[(purchase_date, cost)] -= count
+
+            if purchases[(purchase_date, cost)] <= 0:
+                del purchases[(purchase_date, cost)]
+
+            if not purchases:
+                del self.__purchases[key]
+
+            self.__statistics.pop(key, None)
+
+    def get_statistics(self, name):
+        """
+        Returns count, modal (with its count), last, median, min and max
+        cost of Expenses with the name or None if there are none
+        """
+        key = normalize_name(name)
+
+        with self.__lock:
+            if key not in self.__statistics:
+                purchases = self.__purchases.get(key)
+
+                if not purchases:
+                    return None
+
+                self.__statistics[key] = create_statistics(purchases)
+
+            return dict(self.__statistics[key])
+
+    def get_common_cost(self, name):
+        """Returns the modal cost if it is common enough or 0"""
+        statistics = self.get_statistics(name)
+
+        if not statistics or statistics["modal_count"] < COMMON_COST_MIN_COUNT:
+            return 0
+
+        return statistics["modal_cost"]
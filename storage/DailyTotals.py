@@ -0,0 +1,189 @@
+"""The module contains in-memory cumulative costs of Expenses per day"""
+import calendar
+import threading
+
+import numpy as np
+
+from date_utils import convert_date_string_to_timestamp
+from storage.ExpenseSnapshot import convert_cost
+
+SECONDS_PER_DAY = 86400
+# Bounds of purchase dates of ranges without the first or the last date
+MIN_TIMESTAMP = -2 ** 62
+MAX_TIMESTAMP = 2 ** 62
+
+def get_date_range(first_date=None, last_date=None):
+    """
+    Returns timestamps of the first second of first_date and the last
+    second of last_date (YYYY-MM-DD), the widest bounds for missing dates
+    """
+    return (convert_date_string_to_timestamp(first_date)
+            if first_date else MIN_TIMESTAMP,
+            convert_date_string_to_timestamp(last_date) + SECONDS_PER_DAY - 1
+            if last_date else MAX_TIMESTAMP)
+
+def get_day(timestamp):
+    """Returns the number of days since epoch of the timestamp"""
+    return int(timestamp) // SECONDS_PER_DAY
+
+# Days the dense matrix can span, costs of other days are kept sparse,
+# so a single outlier date doesn't allocate a column for every day
+MIN_DENSE_DAY = get_day(calendar.timegm((1900, 1, 1, 0, 0, 0)))
+MAX_DENSE_DAY = get_day(calendar.timegm((2100, 12, 31, 0, 0, 0)))
+
+def is_dense_day(day):
+    return MIN_DENSE_DAY <= day <= MAX_DENSE_DAY
+
+class DailyTotals:
+    """
+    Keeps costs of Expenses per (category, day) in a dense matrix and
+    their cumulative sums, so the total of any range of days (of all
+    Expenses or of a category) is a difference of two lookups. Writes
+    change a single cell; the sums are computed again on the next read.
+    Costs of days outside MIN_DENSE_DAY and MAX_DENSE_DAY are summed
+    from a (category id, day) -> cost dictionary.
+    """
+
+    def __init__(self):
+        self.__lock = threading.RLock()
+        self.__first_day = 0
+        self.__category_indexes = {}
+        self.__costs = np.zeros((0, 0))
+        self.__cumulative_costs = None
+        self.__outlier_costs = {}
+
+    def build(self, rows):
+        """Replaces the content with (day, category id, total cost) rows"""
+        with self.__lock:
+            self.__first_day = 0
+            self.__category_indexes = {}
+            self.__costs = np.zeros((0, 0))
+            self.__cumulative_costs = None
+            self.__outlier_costs = {}
+
+            rows = list(rows)
+
+            for day, category_id, cost in rows:
+                if not is_dense_day(int(day)):
+                    self.__add_outlier_cost(int(day), category_id, cost)
+
+            rows = [row for row in rows if is_dense_day(int(row[0]))]
+
+            if not rows:
+                return None
+
+            days, category_ids, costs = (np.array(column) for column in zip(*rows))
+            days = days.astype(np.int64)
+            category_values, category_codes = np.unique(category_ids,
+                                                        return_inverse=True)
+
+            self.__first_day = int(days.min())
+            self.__category_indexes = {
+                category_id: index
+                for index, category_id in enumerate(category_values.tolist())}
+            self.__costs = np.zeros((len(category_values),
+                                     int(days.max()) - self.__first_day + 1))
+            np.add.at(self.__costs,
+                      (category_codes.reshape(-1), days - self.__first_day),
+                      costs.astype(np.float64))
+
+    def add(self, purchase_date, category_id, cost):
+        """Adds the cost of an Expense purchased at the timestamp"""
+        with self.__lock:
+            day = get_day(purchase_date)
+
+            if not is_dense_day(day):
+                self.__add_outlier_cost(day, category_id, cost)
+
+                return None
+
+            self.__ensure_cell_exists(day, category_id)
+            self.__costs[self.__category_indexes[category_id],
+                         day - self.__first_day] += cost
+            self.__cumulative_costs = None
+
+    def remove(self, purchase_date, category_id, cost):
+        """Removes the cost of an Expense purchased at the timestamp"""
+        self.add(purchase_date, category_id, -cost)
+
+    def get_total(self, first_date=None, last_date=None, category_id=None):
+        """
+        Returns the total cost of Expenses (of the category if it's given)
+        purchased from the day of first_date to the day of last_date
+        """
+        with self.__lock:
+            total = self.__get_dense_total(first_date, last_date, category_id) + \
+                self.__get_outlier_total(first_date, last_date, category_id)
+
+        return convert_cost(round(total, 2))
+
+    def __get_dense_total(self, first_date, last_date, category_id):
+        if category_id is not None and category_id not in self.__category_indexes:
+            return 0
+
+        if self.__cumulative_costs is None:
+            # Sums of days before every day with the total of all
+            # categories in the last row
+            self.__cumulative_costs = np.zeros(
+                (self.__costs.shape[0] + 1, self.__costs.shape[1] + 1))
+            np.cumsum(self.__costs, axis=1,
+                      out=self.__cumulative_costs[:-1, 1:])
+            self.__cumulative_costs[-1] = \
+                self.__cumulative_costs[:-1].sum(axis=0)
+
+        row = self.__cumulative_costs[-1 if category_id is None else
+                                      self.__category_indexes[category_id]]
+        start = 0 if first_date is None else min(
+            max(get_day(first_date) - self.__first_day, 0), len(row) - 1)
+        end = len(row) - 1 if last_date is None else min(
+            max(get_day(last_date) - self.__first_day + 1, 0), len(row) - 1)
+
+        return float(row[end] - row[start]) if end > start else 0
+
+    def __get_outlier_total(self, first_date, last_date, category_id):
+        first_day = None if first_date is None else get_day(first_date)
+        last_day = None if last_date is None else get_day(last_date)
+
+        return sum(cost for (cost_category_id, day), cost
+                   in self.__outlier_costs.items()
+                   if (category_id is None or cost_category_id == category_id) and
+                   (first_day is None or day >= first_day) and
+                   (last_day is None or day <= last_day))
+
+    def __add_outlier_cost(self, day, category_id, cost):
+        key = (category_id, day)
+        self.__outlier_costs[key] = self.__outlier_costs.get(key, 0) + cost
+
+        if not self.__outlier_costs[key]:
+            del self.__outlier_costs[key]
+
+    def __ensure_cell_exists(self, day, category_id):
+        rows, days = self.__costs.shape
+
+        if not days:
+            self.__first_day = day
+
+        first_day, last_day = self.__first_day, self.__first_day + days - 1
+
+        # Grows by half of the days at least (within the dense days), so
+        # adding Expenses of the following days doesn't copy the matrix
+        # every time
+        if day < first_day:
+            first_day = max(min(day, first_day - days // 2), MIN_DENSE_DAY)
+
+        if day > last_day:
+            last_day = min(max(day, last_day + days // 2), MAX_DENSE_DAY)
+
+        if category_id not in self.__category_indexes:
+            self.__category_indexes[category_id] = rows
+
+        if last_day - first_day + 1 == days and \
+                len(self.__category_indexes) == rows:
+            return None
+
+        costs = np.zeros((len(self.__category_indexes), last_day - first_day + 1))
+        offset = self.__first_day - first_day
+        costs[:rows, offset:offset + days] = self.__costs
+
+        self.__first_day = first_day
+        self.__costs = costs
@@ -0,0 +1,38 @@
+"""The module contains in-memory versions of the database tables"""
+import threading
+import uuid
+
+EXPENSES = "expenses"
+CATEGORIES = "categories"
+TAGS = "tags"
+SUGGESTIONS = "suggestions"
+
+class DataVersions:
+    """
+    Counts writes to the tables, so responses built from them can be tagged
+    with a version and recognized as unchanged without querying the database.
+    The boot token makes versions of different processes distinct.
+    """
+
+    def __init__(self, boot_token=None):
+        self.__boot_token = boot_token or uuid.uuid4().hex[:12]
+        self.__versions = {}
+        self.__lock = threading.Lock()
+
+    def bump(self, *tables):
+        """Marks the tables as changed (call once the write is committed)"""
+        with self.__lock:
+            for table in tables:
+                self.__versions[table] = self.__versions.get(table, 0) + 1
+
+    def get_version(self, table):
+        """Returns the number of writes to the table"""
+        with self.__lock:
+            return self.__versions.get(table, 0)
+
+    def get_etag(self, *tables):
+        """Returns an ETag of data read from the tables"""
+        with self.__lock:
+            versions = [str(self.__versions.get(table, 0)) for table in tables]
+
+        return "-".join([self.__boot_token] + versions)
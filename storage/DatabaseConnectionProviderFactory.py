@@ -1,18 +1,50 @@
+import threading
+
+from storage.DbQueryProviderFactory import DbQueryProviderFactory
 from storage.MariaDbDatabaseConnectionProvider import MariaDbDatabaseConnectionProvider
-from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
+from storage.SqliteDatabaseConnectionProvider import (
+    SqliteDatabaseConnectionProvider, get_statement_cache_size)
 from validation_utils import validate_non_empty_string
-from const import DATABASE_TABLES, DATABASE_TYPES, FULL_DATABASE_PATH
+from const import (DATABASE_POOL_MAX_IDLE_TIME, DATABASE_POOL_SIZE,
+                   DATABASE_TABLES, DATABASE_TYPES, FULL_DATABASE_PATH)
 
 class DatabaseConnectionProviderFactory:
+    """
+    Creates connection providers. A provider owns a connection pool,
+    so a single instance per database type is shared by the whole process.
+    """
+    __providers = {}
+    __lock = threading.Lock()
+
     @staticmethod
     def create(type):
         validate_non_empty_string(type, "type")
 
+        with DatabaseConnectionProviderFactory.__lock:
+            providers = DatabaseConnectionProviderFactory.__providers
+
+            if type not in providers:
+                provider = DatabaseConnectionProviderFactory.__create_provider(type)
+
+                if provider is None:
+                    return None
+
+                providers[type] = provider
+
+            return providers[type]
+
+    @classmethod
+    def __create_provider(cls, type):
         if type is DATABASE_TYPES["sqlite"]:
+            query_provider = DbQueryProviderFactory.create(type)
+
             return SqliteDatabaseConnectionProvider(
-                FULL_DATABASE_PATH, DATABASE_TABLES)
+                FULL_DATABASE_PATH, DATABASE_TABLES,
+                DATABASE_POOL_SIZE, DATABASE_POOL_MAX_IDLE_TIME,
+                get_statement_cache_size(query_provider.get_queries_count()))
 
         if type is DATABASE_TYPES["mariadb"]:
-          return MariaDbDatabaseConnectionProvider(DATABASE_TABLES)
+          return MariaDbDatabaseConnectionProvider(
+              DATABASE_TABLES, DATABASE_POOL_SIZE, DATABASE_POOL_MAX_IDLE_TIME)
 
         return None
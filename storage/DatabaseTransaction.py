@@ -0,0 +1,37 @@
+"""The module contains DatabaseTransaction class"""
+
+class DatabaseTransaction:
+    """
+    Executes queries on a single connection, so they are committed
+    (or rolled back) together by the connection provider
+    """
+
+    def __init__(self, connection):
+        self.__connection = connection
+        self.__last_row_id = None
+
+    def execute_query(self, query, params = ()):
+        """Executes the query and returns fetched rows (if any)"""
+        cursor = self.__connection.cursor()
+
+        try:
+            cursor.execute(query, params)
+            self.__last_row_id = cursor.lastrowid
+
+            return cursor.fetchall() if cursor.description else []
+        finally:
+            cursor.close()
+
+    def execute_many(self, query, params_list):
+        """Executes the query once for every params of params_list"""
+        cursor = self.__connection.cursor()
+
+        try:
+            cursor.executemany(query, params_list)
+            self.__last_row_id = cursor.lastrowid
+        finally:
+            cursor.close()
+
+    def get_last_row_id(self):
+        """Returns id of the row inserted by the last executed query"""
+        return self.__last_row_id
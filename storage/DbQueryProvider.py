@@ -1,11 +1,91 @@
 from enum import Enum
 
+from const import DATABASE_TABLES
+
 class DbQueryType(Enum):
   SAVE_EXPENSE = 'SAVE_EXPENSE'
+  SELECT_LAST_INSERT_ID = 'SELECT_LAST_INSERT_ID'
+  SELECT_AUTO_INCREMENT_SETTINGS = 'SELECT_AUTO_INCREMENT_SETTINGS'
+  SELECT_EXPENSE = 'SELECT_EXPENSE'
+  SELECT_EXPENSE_ROW = 'SELECT_EXPENSE_ROW'
+  UPDATE_EXPENSE = 'UPDATE_EXPENSE'
+  DELETE_EXPENSE = 'DELETE_EXPENSE'
+  SELECT_EXPENSES_IN_PERIOD = 'SELECT_EXPENSES_IN_PERIOD'
+  SELECT_EXPENSES_PAGE_IN_PERIOD = 'SELECT_EXPENSES_PAGE_IN_PERIOD'
+  SELECT_EXPENSES_PAGE_IN_PERIOD_AFTER = 'SELECT_EXPENSES_PAGE_IN_PERIOD_AFTER'
+  FILTER_EXPENSES = 'FILTER_EXPENSES'
+  FILTER_EXPENSES_PAGE = 'FILTER_EXPENSES_PAGE'
+  FILTER_EXPENSES_PAGE_AFTER = 'FILTER_EXPENSES_PAGE_AFTER'
+  SEARCH_EXPENSES = 'SEARCH_EXPENSES'
+  SEARCH_EXPENSES_PAGE = 'SEARCH_EXPENSES_PAGE'
+  SEARCH_EXPENSES_PAGE_AFTER = 'SEARCH_EXPENSES_PAGE_AFTER'
+  SELECT_ANY_SEARCH_MATCH = 'SELECT_ANY_SEARCH_MATCH'
+  SELECT_COMMON_EXPENSE_COST = 'SELECT_COMMON_EXPENSE_COST'
+  SELECT_SIMILAR_EXPENSE_NAMES = 'SELECT_SIMILAR_EXPENSE_NAMES'
+  SELECT_EXPENSE_NAME_COUNTS = 'SELECT_EXPENSE_NAME_COUNTS'
+  SELECT_EXPENSE_COSTS = 'SELECT_EXPENSE_COSTS'
+  SELECT_EXPENSE_COSTS_OF_NAME = 'SELECT_EXPENSE_COSTS_OF_NAME'
+  SELECT_EXPENSE_COLUMNS_IN_PERIOD = 'SELECT_EXPENSE_COLUMNS_IN_PERIOD'
+  SELECT_DAILY_TOTALS = 'SELECT_DAILY_TOTALS'
+  SELECT_TOTAL_IN_PERIOD = 'SELECT_TOTAL_IN_PERIOD'
+  SELECT_EXPENSE_SUGGESTIONS = 'SELECT_EXPENSE_SUGGESTIONS'
+  SELECT_EXPENSE_HISTORY = 'SELECT_EXPENSE_HISTORY'
+  SELECT_EXPENSE_SNAPSHOT = 'SELECT_EXPENSE_SNAPSHOT'
+  SELECT_EXPENSE_SNAPSHOT_TAGS = 'SELECT_EXPENSE_SNAPSHOT_TAGS'
+  SELECT_SUGGESTIONS = 'SELECT_SUGGESTIONS'
+  SAVE_SUGGESTION = 'SAVE_SUGGESTION'
+  UPDATE_SUGGESTION = 'UPDATE_SUGGESTION'
+  DELETE_SUGGESTION = 'DELETE_SUGGESTION'
+  SELECT_SUMMARY = 'SELECT_SUMMARY'
+  SELECT_MONTH_COUNTS = 'SELECT_MONTH_COUNTS'
+  UPSERT_MONTHLY_TOTALS = 'UPSERT_MONTHLY_TOTALS'
+  DELETE_EMPTY_MONTHLY_TOTALS = 'DELETE_EMPTY_MONTHLY_TOTALS'
+  SAVE_CATEGORY = 'SAVE_CATEGORY'
+  SELECT_CATEGORIES = 'SELECT_CATEGORIES'
+  SAVE_SHOP = 'SAVE_SHOP'
+  SAVE_TAG = 'SAVE_TAG'
+  SELECT_TAGS = 'SELECT_TAGS'
+  SELECT_TAG_IDS_BY_NAMES = 'SELECT_TAG_IDS_BY_NAMES'
+  SELECT_EXPENSE_TAGS = 'SELECT_EXPENSE_TAGS'
+  SELECT_EXPENSE_TAG_LINKS = 'SELECT_EXPENSE_TAG_LINKS'
+  SAVE_EXPENSE_TAG_LINK = 'SAVE_EXPENSE_TAG_LINK'
+  DELETE_EXPENSE_TAG_LINK = 'DELETE_EXPENSE_TAG_LINK'
+  DELETE_EXPENSE_TAG_LINKS = 'DELETE_EXPENSE_TAG_LINKS'
 
 class DbQueryProvider():
-  """Creates database queries"""
+  """
+  Creates database queries. Every query is a parameterized template
+  formatted with table names once, so the same SQL text is reused
+  (and can be cached as a prepared statement) on every call.
+  """
+
+  def __init__(self, database_tables=None):
+    tables = dict(DATABASE_TABLES, **(database_tables or {}))
 
-  def create_query(type: DbQueryType) -> str:
+    self.__queries = {
+      type: template.format(**self.get_template_arguments(tables))
+      for type, template in self.get_query_templates().items()
+    }
+
+  def create_query(self, type: DbQueryType) -> str:
     """Returns a database query of requested type"""
+    if type not in self.__queries:
+      raise NotImplementedError("Query {} not implemented!".format(type.value))
+
+    return self.__queries[type]
+
+  def is_returning_supported(self) -> bool:
+    """Returns True if UPDATE_EXPENSE returns the updated Expense row"""
+    return False
+
+  def get_queries_count(self) -> int:
+    """Returns the number of queries in the catalog"""
+    return len(self.__queries)
+
+  def get_query_templates(self):
+    """Returns a DbQueryType -> query template dictionary"""
     raise NotImplementedError("Method not implemented!")
+
+  def get_template_arguments(self, database_tables):
+    """Returns names which can be used in query templates"""
+    return database_tables
@@ -0,0 +1,42 @@
+import threading
+
+from storage.DbQueryProvider import DbQueryProvider
+from storage.MariaDbQueryProvider import MariaDbQueryProvider
+from storage.SqliteDbQueryProvider import SqliteDbQueryProvider
+from validation_utils import validate_non_empty_string
+from const import DATABASE_TABLES, DATABASE_TYPES
+
+class DbQueryProviderFactory:
+    """
+    Creates query providers. A provider holds the formatted query catalog,
+    so a single instance per database type is shared by the whole process.
+    """
+    __providers = {}
+    __lock = threading.Lock()
+
+    @staticmethod
+    def create(type) -> DbQueryProvider:
+        validate_non_empty_string(type, "type")
+
+        with DbQueryProviderFactory.__lock:
+            providers = DbQueryProviderFactory.__providers
+
+            if type not in providers:
+                provider = DbQueryProviderFactory.__create_provider(type)
+
+                if provider is None:
+                    return None
+
+                providers[type] = provider
+
+            return providers[type]
+
+    @classmethod
+    def __create_provider(cls, type):
+        if type is DATABASE_TYPES["sqlite"]:
+            return SqliteDbQueryProvider(DATABASE_TABLES)
+
+        if type is DATABASE_TYPES["mariadb"]:
+            return MariaDbQueryProvider(DATABASE_TABLES)
+
+        return None
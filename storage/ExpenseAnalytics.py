@@ -0,0 +1,152 @@
+"""
+Computes spending trends and category shares with NumPy
+over purchase date, cost and category id columns of Expenses
+"""
+import numpy as np
+
+from date_utils import add_months, format_month, parse_month
+from storage.ExpenseSnapshot import convert_cost
+
+# Months of the trailing averages
+AVERAGE_WINDOWS = (3, 12)
+# History needed before the first month for averages and year-over-year deltas
+HISTORY_MONTHS = 12
+
+def convert_rows_to_columns(rows):
+    """
+    Returns purchase dates, costs and category ids arrays
+    of (purchase date, cost, category id) rows
+    """
+    if not rows:
+        return (np.array([], dtype=np.int64), np.array([], dtype=np.float64),
+                np.array([], dtype=np.int64))
+
+    purchase_dates, costs, category_ids = zip(*rows)
+
+    return (np.array(purchase_dates, dtype=np.int64),
+            np.array(costs, dtype=np.float64),
+            np.array(category_ids, dtype=np.int64))
+
+def validate_number_of_months(number_of_months):
+    """Raises ValueError unless number_of_months is a positive integer"""
+    if not isinstance(number_of_months, int) or number_of_months < 1:
+        raise ValueError("InvalidArgument: number_of_months must be "
+                         "a positive integer, got {}".format(number_of_months))
+
+def get_month_number(year, month):
+    """Returns the number of months since January 1970"""
+    return (year - 1970) * 12 + month - 1
+
+def get_month_numbers(purchase_dates):
+    """Returns the numbers of months since January 1970 of UTC timestamps"""
+    return purchase_dates.astype("datetime64[s]").astype("datetime64[M]") \
+        .astype(np.int64)
+
+def get_history_start(latest_month, number_of_months):
+    """
+    Returns (year, month) of the first month of history needed
+    for trends of the period
+    """
+    return add_months(*parse_month(latest_month),
+                      1 - number_of_months - HISTORY_MONTHS)
+
+def create_monthly_totals(columns, first_month_number, number_of_months):
+    """
+    Returns category ids and a (category, month) matrix of costs
+    of the months starting with first_month_number
+    """
+    purchase_dates, costs, category_ids = columns
+    month_offsets = get_month_numbers(purchase_dates) - first_month_number
+    in_months = (month_offsets >= 0) & (month_offsets < number_of_months)
+    category_values, category_codes = np.unique(category_ids[in_months],
+                                                return_inverse=True)
+    totals = np.bincount(
+        category_codes.reshape(-1) * number_of_months + month_offsets[in_months],
+        weights=costs[in_months],
+        minlength=len(category_values) * number_of_months)
+
+    return category_values, totals.reshape(len(category_values), number_of_months)
+
+def get_trailing_averages(totals, window):
+    """Returns averages of the window of months ending with every month"""
+    sums = np.cumsum(totals, axis=-1)
+    sums[..., window:] = sums[..., window:] - sums[..., :-window]
+
+    return sums / window
+
+def convert_category_to_json(category_id, categories_by_id):
+    """Returns JSON of the Category with the id (without a name if unknown)"""
+    category = categories_by_id.get(category_id)
+
+    return {"id": category_id, "name": category.get_name() if category else None}
+
+def convert_costs(costs):
+    """Returns a list of costs of the array"""
+    return [convert_cost(round(cost, 2)) for cost in costs.tolist()]
+
+def create_trend(totals):
+    """
+    Returns monthly totals, trailing averages and year-over-year deltas
+    of the period (the last columns of totals with history before them)
+    """
+    period = slice(HISTORY_MONTHS, None)
+    trend = {"totals": convert_costs(totals[period])}
+
+    for window in AVERAGE_WINDOWS:
+        trend["average_{}".format(window)] = convert_costs(
+            get_trailing_averages(totals, window)[period])
+
+    trend["year_over_year"] = convert_costs(
+        totals[HISTORY_MONTHS:] - totals[:-HISTORY_MONTHS])
+
+    return trend
+
+def create_trends(columns, categories, latest_month, number_of_months):
+    """
+    Returns monthly totals, 3 and 12 months trailing averages and
+    year-over-year deltas of all Expenses and per Category (the most
+    expensive one first) of the period ending with latest_month
+    """
+    history_start = get_history_start(latest_month, number_of_months)
+    category_ids, totals = create_monthly_totals(
+        columns, get_month_number(*history_start),
+        number_of_months + HISTORY_MONTHS)
+    period_totals = totals[:, HISTORY_MONTHS:].sum(axis=1)
+    categories_by_id = {category.get_category_id(): category
+                        for category in categories}
+
+    return dict(create_trend(totals.sum(axis=0)), months=[
+        format_month(*add_months(*history_start, HISTORY_MONTHS + index))
+        for index in range(number_of_months)
+    ], categories=[
+        dict(create_trend(totals[index]),
+             category=convert_category_to_json(category_id, categories_by_id))
+        for index, category_id in
+        sorted(enumerate(category_ids.tolist()),
+               key=lambda item: -period_totals[item[0]])
+    ])
+
+def create_category_shares(columns, categories):
+    """
+    Returns totals, counts and shares of all spending per Category
+    (the most expensive one first)
+    """
+    _, costs, category_ids = columns
+    category_values, category_codes = np.unique(category_ids,
+                                                return_inverse=True)
+    category_codes = category_codes.reshape(-1)
+    totals = np.bincount(category_codes, weights=costs,
+                         minlength=len(category_values))
+    counts = np.bincount(category_codes, minlength=len(category_values))
+    total = totals.sum()
+    shares = totals / total if total else np.zeros(len(totals))
+    categories_by_id = {category.get_category_id(): category
+                        for category in categories}
+
+    return [{
+        "category": convert_category_to_json(category_id, categories_by_id),
+        "total": convert_cost(round(totals[index], 2)),
+        "count": int(counts[index]),
+        "share": round(float(shares[index]), 4)
+    } for index, category_id in sorted(enumerate(category_values.tolist()),
+                                       key=lambda item: -totals[item[0]])]
@@ -0,0 +1,67 @@
+"""Converts requested Expense changes into expenses table columns"""
+from date_utils import convert_date_string_to_timestamp
+from validation_utils import validate_non_empty_string
+
+def convert_date_to_timestamp(value, parameter_name):
+    """Returns a timestamp of a YYYY-MM-DD string or a number"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+
+    try:
+        return convert_date_string_to_timestamp(value)
+    except (ValueError, TypeError):
+        raise ValueError("InvalidArgument: {} must be a YYYY-MM-DD date"
+                         .format(parameter_name))
+
+def convert_cost(value, parameter_name):
+    """Returns the cost if it is a number"""
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise ValueError("InvalidArgument: {} must be a number"
+                         .format(parameter_name))
+
+    return value
+
+def convert_name(value, parameter_name):
+    """Returns the name if it is a non-empty string"""
+    validate_non_empty_string(value, parameter_name)
+
+    return value
+
+def convert_category(value, parameter_name):
+    """Returns the category id of a Category JSON or the id itself"""
+    category_id = value.get("id") if isinstance(value, dict) else value
+
+    if category_id is None or isinstance(category_id, bool):
+        raise ValueError("InvalidArgument: {} must be a category or its id"
+                         .format(parameter_name))
+
+    return category_id
+
+COLUMNS_BY_CHANGE = {
+    "name": ("name", convert_name),
+    "cost": ("cost", convert_cost),
+    "date": ("purchase_date", convert_date_to_timestamp),
+    "purchase_date": ("purchase_date", convert_date_to_timestamp),
+    "category": ("category_id", convert_category),
+    "category_id": ("category_id", convert_category)
+}
+
+def convert_expense_changes(changes):
+    """
+    Returns a column -> value dictionary of the changes,
+    raises ValueError for changes of unknown or read-only fields
+    """
+    if not changes or not isinstance(changes, dict):
+        raise ValueError("InvalidArgument: changes must be a non-empty "
+                         "dictionary")
+
+    columns = {}
+
+    for key, value in changes.items():
+        if key not in COLUMNS_BY_CHANGE:
+            raise ValueError("InvalidArgument: {} can't be changed".format(key))
+
+        column, convert = COLUMNS_BY_CHANGE[key]
+        columns[column] = convert(value, "changes.{}".format(key))
+
+    return columns
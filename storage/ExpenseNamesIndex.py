@@ -0,0 +1,137 @@
+"""The module contains in-memory autocomplete index of expense names"""
+import heapq
+import html
+import threading
+
+MAX_GRAM_LENGTH = 3
+
+def normalize_name(name):
+    """Returns the form of the name used for matching"""
+    return (name or "").casefold()
+
+def get_pair(name, category):
+    """
+    Returns the (name, category) pair as the index keeps it, unescaped
+    like the models, since category names are escaped in the database
+    """
+    return tuple(html.unescape(text) if text else text for text in (name, category))
+
+def get_grams(text, length):
+    """Returns the set of all substrings of text with the given length"""
+    return {text[i:i + length] for i in range(len(text) - length + 1)}
+
+class ExpenseNamesIndex:
+    """
+    Keeps distinct (name, category) pairs with their usage counts and answers
+    substring queries ranked by usage. Pairs are indexed by every substring
+    of up to MAX_GRAM_LENGTH characters, so a query only checks the pairs
+    sharing its least frequent gram.
+    """
+
+    def __init__(self):
+        self.__counts = {}
+        self.__pairs_by_gram = {}
+        self.__lock = threading.RLock()
+
+    def build(self, rows):
+        """Replaces index content with (name, category, count) rows"""
+        with self.__lock:
+            self.__counts = {}
+            self.__pairs_by_gram = {}
+
+            for name, category, count in rows:
+                self.add(name, category, count)
+
+    def add(self, name, category, count=1):
+        """Increases the usage count of the (name, category) pair"""
+        if not name or count <= 0:
+            return None
+
+        pair = get_pair(name, category)
+        name = pair[0]
+
+        with self.__lock:
+            if pair not in self.__counts:
+                self.__counts[pair] = 0
+
+                for gram in self.__get_name_grams(name):
+                    self.__pairs_by_gram.setdefault(gram, set()).add(pair)
+
+            self.__counts[pair] += count
+
+    def remove(self, name, category, count=1):
+        """Decreases the usage count of the (name, category) pair"""
+        pair = get_pair(name, category)
+        name = pair[0]
+
+        with self.__lock:
+            if pair not in self.__counts:
+                return None
+
+            self.__counts[pair] -= count
+
+            if self.__counts[pair] > 0:
+                return None
+
+            del self.__counts[pair]
+
+            for gram in self.__get_name_grams(name):
+                pairs = self.__pairs_by_gram.get(gram)
+
+                if pairs is None:
+                    continue
+
+                pairs.discard(pair)
+
+                if not pairs:
+                    del self.__pairs_by_gram[gram]
+
+    def get_count(self, name, category):
+        """Returns the usage count of the (name, category) pair"""
+        with self.__lock:
+            return self.__counts.get(get_pair(name, category), 0)
+
+    def search(self, fragment, limit=None):
+        """
+        Returns a list of {name, category} dictionaries whose name contains
+        the fragment, the most used first
+        """
+        query = normalize_name(fragment)
+
+        if not query:
+            return []
+
+        with self.__lock:
+            candidates = self.__get_candidates(query)
+            matches = [(pair, self.__counts[pair]) for pair in candidates
+                       if query in normalize_name(pair[0])]
+
+        def get_rank(match):
+            (name, category), count = match
+
+            return (-count, not normalize_name(name).startswith(query),
+                    name, category or "")
+
+        if limit is None:
+            ranked = sorted(matches, key=get_rank)
+        else:
+            ranked = heapq.nsmallest(limit, matches, key=get_rank)
+
+        return [{"name": name, "category": category}
+                for (name, category), _count in ranked]
+
+    def __get_candidates(self, query):
+        length = min(len(query), MAX_GRAM_LENGTH)
+        postings = [self.__pairs_by_gram.get(gram, set())
+                    for gram in get_grams(query, length)]
+
+        return min(postings, key=len)
+
+    def __get_name_grams(self, name):
+        normalized = normalize_name(name)
+        grams = set()
+
+        for length in range(1, MAX_GRAM_LENGTH + 1):
+            grams |= get_grams(normalized, length)
+
+        return grams
@@ -0,0 +1,285 @@
+"""The module contains a columnar in-memory snapshot of Expenses"""
+import html
+import threading
+
+import numpy as np
+
+from expense.Category import Category
+from expense.Expense import Expense
+from expense.Tag import Tag
+
+def convert_cost(cost):
+    """
+    Returns a cost of the float column as the database returns it
+    (an integer unless it has a fraction)
+    """
+    cost = float(cost)
+
+    return int(cost) if cost.is_integer() else cost
+
+class ExpenseSnapshot:
+    """
+    Keeps Expenses as NumPy columns sorted by purchase date (and id),
+    so Expenses and totals of a date range are found with two binary
+    searches. Names, Categories and Tags are kept once in dictionaries.
+
+    Added Expenses are buffered and merged into the columns by the next
+    read. Any write the snapshot can't apply makes it stale until it is
+    built again.
+    """
+
+    def __init__(self):
+        self.__lock = threading.RLock()
+        self.__built = False
+        # Bumped by every write, so a build from rows read before
+        # a concurrent write doesn't make the snapshot up to date
+        self.__generation = 0
+        self.__set_columns([], [], [], [], [])
+        self.__names = []
+        self.__name_ids = {}
+        self.__categories = []
+        self.__category_indexes = {}
+        self.__tags = {}
+        self.__pending_rows = []
+        self.__removed_ids = set()
+
+    def is_built(self):
+        """Returns True if the snapshot mirrors all the Expenses"""
+        return self.__built
+
+    def get_generation(self):
+        """Returns the number of writes, to be passed to build"""
+        return self.__generation
+
+    def build(self, expense_rows, tag_rows, categories, generation=None):
+        """
+        Replaces the content with (expense id, name, cost, purchase date,
+        category id) rows, (expense id, tag name, tag id) rows and Categories.
+        The snapshot stays stale if there were writes since the generation.
+        """
+        with self.__lock:
+            if generation is not None and generation != self.__generation:
+                return False
+
+            self.__names = []
+            self.__name_ids = {}
+            self.__categories = []
+            self.__category_indexes = {}
+            self.__tags = {}
+            self.__pending_rows = []
+            self.__removed_ids = set()
+
+            for category in categories:
+                self.__get_category_index(category)
+
+            expense_ids, names, costs, purchase_dates, category_ids = \
+                list(zip(*expense_rows)) or [()] * 5
+            # Distinct categories and names are converted once
+            category_values, category_codes = np.unique(
+                np.array(category_ids, dtype=np.int64), return_inverse=True)
+            category_indexes = np.array(
+                [self.__get_category_index(Category.get_shared(category_id, None))
+                 for category_id in category_values.tolist()], dtype=np.int32)
+            name_ids = {name: self.__get_name_id(html.unescape(name))
+                        for name in set(names)}
+
+            self.__set_columns(expense_ids, purchase_dates, costs,
+                               category_indexes[category_codes].reshape(-1),
+                               [name_ids[name] for name in names])
+
+            for expense_id, tag_name, tag_id in tag_rows:
+                self.__tags.setdefault(expense_id, []).append(
+                    Tag.get_shared(tag_id, html.unescape(tag_name)))
+
+            self.__sort_columns()
+            self.__built = True
+
+            return True
+
+    def invalidate(self):
+        """Makes the snapshot stale"""
+        with self.__lock:
+            self.__generation += 1
+            self.__built = False
+
+    def add(self, expense: Expense):
+        """
+        Adds a persisted Expense (with its id, the ids of its Tags
+        and a known Category), otherwise makes the snapshot stale
+        """
+        with self.__lock:
+            self.__generation += 1
+
+            if not self.__built:
+                return None
+
+            category = expense.get_category()
+            category_index = self.__category_indexes.get(
+                category.get_category_id() if category else None)
+
+            if expense.get_expense_id() is None or category_index is None or \
+                    any(tag.get_tag_id() is None for tag in expense.get_tags()):
+                self.__built = False
+                return None
+
+            self.__pending_rows.append((
+                expense.get_expense_id(), expense.get_purchase_date(),
+                expense.get_cost(), category_index,
+                self.__get_name_id(expense.get_name())))
+
+            self.__set_tags(expense.get_expense_id(), expense.get_tags())
+
+    def set_tags(self, expense_id, tags):
+        """Replaces Tags (with their ids) of the Expense with the id"""
+        with self.__lock:
+            self.__generation += 1
+
+            if not self.__built:
+                return None
+
+            self.__set_tags(expense_id, tags)
+
+    def remove(self, expense: Expense):
+        """Removes the Expense with the same id"""
+        with self.__lock:
+            self.__generation += 1
+
+            if not self.__built:
+                return None
+
+            expense_id = expense.get_expense_id()
+
+            self.__removed_ids.add(expense_id)
+            self.__pending_rows = [row for row in self.__pending_rows
+                                   if row[0] != expense_id]
+            self.__tags.pop(expense_id, None)
+
+    def get_expenses(self, first_date, last_date):
+        """
+        Returns Expenses purchased between the timestamps (inclusive),
+        the latest first
+        """
+        with self.__lock:
+            start, end = self.__find_range(first_date, last_date)
+            expense_ids = self.__expense_ids[start:end].tolist()
+            purchase_dates = self.__purchase_dates[start:end].tolist()
+            costs = self.__costs[start:end].tolist()
+            category_indexes = self.__category_indexes_column[start:end].tolist()
+            name_ids = self.__name_ids_column[start:end].tolist()
+            names, categories, tags = self.__names, self.__categories, self.__tags
+
+        return [Expense(expense_ids[index], names[name_ids[index]],
+                        convert_cost(costs[index]), purchase_dates[index],
+                        categories[category_indexes[index]],
+                        list(tags.get(expense_ids[index], ())))
+                for index in range(len(expense_ids) - 1, -1, -1)]
+
+    def get_columns(self, first_date=None, last_date=None):
+        """
+        Returns purchase dates, costs and category ids arrays
+        of Expenses purchased between the timestamps (inclusive)
+        """
+        with self.__lock:
+            start, end = self.__find_range(first_date, last_date)
+            category_ids = np.array(
+                [category.get_category_id() for category in self.__categories],
+                dtype=np.int64)
+
+            return (self.__purchase_dates[start:end], self.__costs[start:end],
+                    category_ids[self.__category_indexes_column[start:end]])
+
+    def get_total(self, first_date, last_date):
+        """Returns the total cost of Expenses purchased between the timestamps"""
+        with self.__lock:
+            start, end = self.__find_range(first_date, last_date)
+
+            return convert_cost(self.__costs[start:end].sum())
+
+    def get_category_totals(self, first_date, last_date):
+        """
+        Returns a category id -> total cost dictionary of Expenses
+        purchased between the timestamps
+        """
+        with self.__lock:
+            start, end = self.__find_range(first_date, last_date)
+            totals = np.bincount(self.__category_indexes_column[start:end],
+                                 weights=self.__costs[start:end],
+                                 minlength=len(self.__categories))
+
+            return {category.get_category_id(): convert_cost(total)
+                    for category, total in zip(self.__categories, totals)
+                    if total}
+
+    def __find_range(self, first_date, last_date):
+        self.__merge_writes()
+
+        start = 0 if first_date is None else \
+            self.__purchase_dates.searchsorted(first_date, "left")
+        end = len(self.__purchase_dates) if last_date is None else \
+            self.__purchase_dates.searchsorted(last_date, "right")
+
+        return start, end
+
+    def __merge_writes(self):
+        if not self.__pending_rows and not self.__removed_ids:
+            return None
+
+        # Added Expenses replace the ones with the same id, which a build
+        # may have read from the database before they were added
+        replaced_ids = self.__removed_ids.union(row[0] for row in self.__pending_rows)
+        kept = ~np.isin(self.__expense_ids,
+                        np.array(list(replaced_ids), dtype=np.int64))
+        columns = [self.__expense_ids[kept], self.__purchase_dates[kept],
+                   self.__costs[kept], self.__category_indexes_column[kept],
+                   self.__name_ids_column[kept]]
+
+        if self.__pending_rows:
+            columns = [np.concatenate((column, values)) for column, values in
+                       zip(columns, zip(*self.__pending_rows))]
+
+        self.__pending_rows = []
+        self.__removed_ids = set()
+        self.__set_columns(*columns)
+        self.__sort_columns()
+
+    def __set_columns(self, expense_ids, purchase_dates, costs,
+                      category_indexes, name_ids):
+        self.__expense_ids = np.asarray(expense_ids, dtype=np.int64)
+        self.__purchase_dates = np.asarray(purchase_dates, dtype=np.int64)
+        self.__costs = np.asarray(costs, dtype=np.float64)
+        self.__category_indexes_column = np.asarray(category_indexes,
+                                                    dtype=np.int32)
+        self.__name_ids_column = np.asarray(name_ids, dtype=np.int32)
+
+    def __sort_columns(self):
+        order = np.lexsort((self.__expense_ids, self.__purchase_dates))
+
+        if np.all(order[1:] > order[:-1]):
+            return None
+
+        self.__set_columns(self.__expense_ids[order], self.__purchase_dates[order],
+                           self.__costs[order], self.__category_indexes_column[order],
+                           self.__name_ids_column[order])
+
+    def __set_tags(self, expense_id, tags):
+        if tags:
+            self.__tags[expense_id] = list(tags)
+        else:
+            self.__tags.pop(expense_id, None)
+
+    def __get_name_id(self, name):
+        if name not in self.__name_ids:
+            self.__name_ids[name] = len(self.__names)
+            self.__names.append(name)
+
+        return self.__name_ids[name]
+
+    def __get_category_index(self, category):
+        """Returns the index of the Category, adding it unless its id is known"""
+        category_id = category.get_category_id()
+
+        if category_id not in self.__category_indexes:
+            self.__category_indexes[category_id] = len(self.__categories)
+            self.__categories.append(category)
+
+        return self.__category_indexes[category_id]
@@ -0,0 +1,97 @@
+"""
+Fills the expense suggestions table with recurring Expenses,
+run it with: python -m storage.ExpenseSuggestionsJob
+"""
+from const import DATABASE_TABLES, FULL_DATABASE_PATH
+from date_utils import get_current_year
+from storage.DbQueryProvider import DbQueryProvider, DbQueryType
+from storage.RecurringExpenses import (convert_rows_to_columns,
+                                       detect_recurring_expenses)
+from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
+from storage.SqliteDbQueryProvider import SqliteDbQueryProvider
+
+def format_months(months):
+    """Returns months as the comma separated list stored with suggestions"""
+    return ",".join(str(month) for month in months)
+
+class ExpenseSuggestionsJob:
+    """
+    Detects recurring Expenses in the whole expense history and makes them
+    the only suggestions, changing only the suggestions which differ
+    """
+
+    def __init__(self, connection_provider, query_provider: DbQueryProvider = None,
+                 in_memory_indexes=None):
+        self.__connection_provider = connection_provider
+        self.__query_provider = query_provider or SqliteDbQueryProvider()
+        self.__in_memory_indexes = in_memory_indexes
+
+    def run(self, reference_year=None):
+        """
+        Rewrites the suggestions, returns the numbers of added,
+        updated and deleted ones. Expenses recur up to the reference_year
+        (the current year by default).
+        """
+        recurring_expenses = detect_recurring_expenses(*convert_rows_to_columns(
+            self.__execute_query(DbQueryType.SELECT_EXPENSE_HISTORY)),
+            reference_year or get_current_year())
+        expected = {(name, category_id): (cost, format_months(months))
+                    for name, category_id, cost, months in recurring_expenses}
+
+        with self.__connection_provider.transaction() as transaction:
+            current = {}
+            obsolete_ids = []
+
+            for suggestion_id, name, category_id, cost, months in \
+                    transaction.execute_query(
+                        self.__create_query(DbQueryType.SELECT_SUGGESTIONS)):
+                if (name, category_id) in expected and \
+                        (name, category_id) not in current:
+                    current[(name, category_id)] = (suggestion_id, cost, months)
+                else:
+                    obsolete_ids.append((suggestion_id,))
+
+            new_suggestions = [(name, category_id) + values
+                               for (name, category_id), values in expected.items()
+                               if (name, category_id) not in current]
+            changed_suggestions = [
+                expected[key] + (suggestion_id,)
+                for key, (suggestion_id, cost, months) in current.items()
+                if expected[key] != (cost, months)]
+
+            if obsolete_ids:
+                transaction.execute_many(
+                    self.__create_query(DbQueryType.DELETE_SUGGESTION), obsolete_ids)
+
+            if changed_suggestions:
+                transaction.execute_many(
+                    self.__create_query(DbQueryType.UPDATE_SUGGESTION),
+                    changed_suggestions)
+
+            if new_suggestions:
+                transaction.execute_many(
+                    self.__create_query(DbQueryType.SAVE_SUGGESTION), new_suggestions)
+
+        if self.__in_memory_indexes and \
+                (new_suggestions or changed_suggestions or obsolete_ids):
+            self.__in_memory_indexes.on_suggestions_changed()
+
+        return len(new_suggestions), len(changed_suggestions), len(obsolete_ids)
+
+    def __create_query(self, query_type):
+        return self.__query_provider.create_query(query_type)
+
+    def __execute_query(self, query_type, params=()):
+        return self.__connection_provider.execute_query(
+            self.__create_query(query_type), params)
+
+if __name__ == "__main__":
+    provider = SqliteDatabaseConnectionProvider(FULL_DATABASE_PATH, DATABASE_TABLES)
+
+    provider.ensure_necessary_tables_exist()
+
+    added, updated, deleted = ExpenseSuggestionsJob(
+        provider, SqliteDbQueryProvider(DATABASE_TABLES)).run()
+
+    print("Suggestions added: {}, updated: {}, deleted: {}".format(
+        added, updated, deleted))
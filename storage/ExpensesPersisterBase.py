@@ -2,9 +2,15 @@ class ExpensesPersisterBase():
     def add_expense(self, expense):
         raise NotImplementedError("Method not implemented!")
 
+    def add_expenses(self, expenses):
+        raise NotImplementedError("Method not implemented!")
+
     def update_expense(self, expense_id, changes):
         raise NotImplementedError("Method not implemented!")
 
+    def delete_expense(self, expense_id):
+        raise NotImplementedError("Method not implemented!")
+
     def add_category(self, category):
         raise NotImplementedError("Method not implemented!")
 
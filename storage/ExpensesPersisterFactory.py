@@ -1,11 +1,10 @@
-from storage.MariaDbDatabaseConnectionProvider import MariaDbDatabaseConnectionProvider
+from storage.DatabaseConnectionProviderFactory import DatabaseConnectionProviderFactory
+from storage.DbQueryProviderFactory import DbQueryProviderFactory
+from storage.InMemoryIndexesFactory import InMemoryIndexesFactory
 from storage.MariaDbExpensesPersister import MariaDbExpensesPersister
-from storage.MariaDbQueryProvider import MariaDbQueryProvider
-from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
 from storage.SqliteExpensesPersister import SqliteExpensesPersister
-from storage.SqliteDbQueryProvider import SqliteDbQueryProvider
 from validation_utils import validate_non_empty_string
-from const import DATABASE_TABLES, DATABASE_TYPES, FULL_DATABASE_PATH
+from const import DATABASE_TABLES, DATABASE_TYPES
 
 class ExpensesPersisterFactory:
     @staticmethod
@@ -22,17 +21,16 @@ class ExpensesPersisterFactory:
     def __create_sqlite_persister(cls):
         return SqliteExpensesPersister(
             DATABASE_TABLES,
-            SqliteDatabaseConnectionProvider(
-                FULL_DATABASE_PATH,
-                DATABASE_TABLES
-            ),
-            SqliteDbQueryProvider()
+            DatabaseConnectionProviderFactory.create(DATABASE_TYPES["sqlite"]),
+            DbQueryProviderFactory.create(DATABASE_TYPES["sqlite"]),
+            InMemoryIndexesFactory.create(DATABASE_TYPES["sqlite"])
         )
 
     @classmethod
     def __create_mariadb_persister(cls):
         return MariaDbExpensesPersister(
             DATABASE_TABLES,
-            MariaDbDatabaseConnectionProvider(DATABASE_TABLES),
-            MariaDbQueryProvider()
+            DatabaseConnectionProviderFactory.create(DATABASE_TYPES["mariadb"]),
+            DbQueryProviderFactory.create(DATABASE_TYPES["mariadb"]),
+            InMemoryIndexesFactory.create(DATABASE_TYPES["mariadb"])
         )
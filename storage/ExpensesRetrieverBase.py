@@ -5,9 +5,27 @@ class ExpensesRetrieverBase():
     def retrieve_expenses(self):
         raise NotImplementedError("Method not implemented!")
 
+    def iterate_expenses(self):
+        raise NotImplementedError("Method not implemented!")
+
+    def retrieve_summary(self):
+        raise NotImplementedError("Method not implemented!")
+
+    def retrieve_trends(self):
+        raise NotImplementedError("Method not implemented!")
+
+    def retrieve_category_shares(self):
+        raise NotImplementedError("Method not implemented!")
+
+    def retrieve_total(self):
+        raise NotImplementedError("Method not implemented!")
+
     def retrieve_months(self):
         raise NotImplementedError("Method not implemented!")
 
+    def retrieve_months_with_counts(self):
+        raise NotImplementedError("Method not implemented!")
+
     def retrieve_categories(self):
         raise NotImplementedError("Method not implemented!")
 
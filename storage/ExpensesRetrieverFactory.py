@@ -1,10 +1,11 @@
 from storage.ExpensesRetrieverBase import ExpensesRetrieverBase
-from storage.MariaDbDatabaseConnectionProvider import MariaDbDatabaseConnectionProvider
+from storage.DatabaseConnectionProviderFactory import DatabaseConnectionProviderFactory
+from storage.DbQueryProviderFactory import DbQueryProviderFactory
+from storage.InMemoryIndexesFactory import InMemoryIndexesFactory
 from storage.MariaDbExpensesRetriever import MariaDbExpensesRetriever
-from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
 from storage.SqliteExpensesRetriever import SqliteExpensesRetriever
 from validation_utils import validate_non_empty_string
-from const import DATABASE_TABLES, DATABASE_TYPES, FULL_DATABASE_PATH
+from const import DATABASE_TABLES, DATABASE_TYPES
 
 class ExpensesRetrieverFactory:
     @staticmethod
@@ -21,19 +22,28 @@ class ExpensesRetrieverFactory:
 
     @classmethod
     def __create_sqlite_retriever(cls):
-        return SqliteExpensesRetriever(
+        in_memory_indexes = InMemoryIndexesFactory.create(DATABASE_TYPES["sqlite"])
+        retriever = SqliteExpensesRetriever(
             DATABASE_TABLES,
-            SqliteDatabaseConnectionProvider(
-                FULL_DATABASE_PATH,
-                DATABASE_TABLES
-            )
+            DatabaseConnectionProviderFactory.create(DATABASE_TYPES["sqlite"]),
+            in_memory_indexes,
+            DbQueryProviderFactory.create(DATABASE_TYPES["sqlite"])
         )
 
+        in_memory_indexes.ensure_built(retriever)
+
+        return retriever
+
     @classmethod
     def __create_mariadb_retriever(cls):
-        return MariaDbExpensesRetriever(
+        in_memory_indexes = InMemoryIndexesFactory.create(DATABASE_TYPES["mariadb"])
+        retriever = MariaDbExpensesRetriever(
             DATABASE_TABLES,
-            MariaDbDatabaseConnectionProvider(
-                DATABASE_TABLES
-            )
+            DatabaseConnectionProviderFactory.create(DATABASE_TYPES["mariadb"]),
+            in_memory_indexes,
+            DbQueryProviderFactory.create(DATABASE_TYPES["mariadb"])
         )
+
+        in_memory_indexes.ensure_built(retriever)
+
+        return retriever
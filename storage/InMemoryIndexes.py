@@ -0,0 +1,234 @@
+"""The module contains InMemoryIndexes class"""
+import threading
+
+from const import EXPENSE_SNAPSHOT_ENABLED
+from date_utils import get_month_of_timestamp
+from storage.CostStatistics import CostStatistics
+from storage.DailyTotals import DailyTotals
+from storage.DataVersions import (DataVersions, CATEGORIES, EXPENSES,
+                                  SUGGESTIONS, TAGS)
+from storage.ExpenseNamesIndex import ExpenseNamesIndex
+from storage.ExpenseSnapshot import ExpenseSnapshot
+from storage.MonthsIndex import MonthsIndex
+from storage.QueryCache import QueryCache
+from storage.TagDictionary import TagDictionary
+
+def get_category_name(expense):
+    category = expense.get_category()
+
+    return category.get_name() if category else None
+
+def get_month(expense):
+    return get_month_of_timestamp(expense.get_purchase_date())
+
+def convert_id(value):
+    """Returns an id (also one sent as a string) as the database stores it"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+def get_category_id(expense):
+    """Returns the category id as the database stores it"""
+    category = expense.get_category()
+
+    return convert_id(category.get_category_id() if category else None)
+
+def add_daily_cost(daily_totals, expense):
+    daily_totals.add(expense.get_purchase_date(), get_category_id(expense),
+                     expense.get_cost())
+
+def remove_daily_cost(daily_totals, expense):
+    daily_totals.remove(expense.get_purchase_date(), get_category_id(expense),
+                        expense.get_cost())
+
+def add_cost(cost_statistics, expense):
+    cost_statistics.add(expense.get_name(), expense.get_purchase_date(),
+                        expense.get_cost())
+
+def remove_cost(cost_statistics, expense):
+    cost_statistics.remove(expense.get_name(), expense.get_purchase_date(),
+                           expense.get_cost())
+
+class InMemoryIndexes:
+    """
+    Holds in-memory structures built once from the database and kept
+    up to date by persisters, so retrievers can answer without queries
+    """
+
+    def __init__(self, expense_snapshot_enabled=EXPENSE_SNAPSHOT_ENABLED):
+        self.__lock = threading.RLock()
+        self.__expense_snapshot_lock = threading.Lock()
+        self.__built = False
+        self.__expense_names_index = ExpenseNamesIndex()
+        self.__expense_snapshot = ExpenseSnapshot() \
+            if expense_snapshot_enabled else None
+        self.__cost_statistics = CostStatistics()
+        self.__daily_totals = DailyTotals()
+        self.__months_index = MonthsIndex()
+        self.__tag_dictionary = TagDictionary()
+        self.__data_versions = DataVersions()
+        self.__query_cache = QueryCache(self.__data_versions)
+
+    def is_built(self):
+        """Returns True if the indexes were loaded from the database"""
+        return self.__built
+
+    def ensure_built(self, retriever):
+        """Loads the indexes with data read by the retriever (only once)"""
+        with self.__lock:
+            if self.__built:
+                return None
+
+            self.__expense_names_index.build(
+                retriever.retrieve_expense_name_counts())
+            self.__months_index.build(retriever.retrieve_month_counts())
+            self.__cost_statistics.build(retriever.retrieve_expense_costs())
+            self.__daily_totals.build(retriever.retrieve_daily_totals())
+
+            if hasattr(retriever, "retrieve_tags"):
+                self.__tag_dictionary.build(retriever.retrieve_tags())
+
+            self.__built = True
+
+        self.ensure_expense_snapshot_built(retriever)
+
+    def ensure_expense_snapshot_built(self, retriever):
+        """
+        Loads the snapshot of Expenses with rows read by the retriever
+        unless it is up to date, returns it (None if it is not available)
+        """
+        snapshot = self.__expense_snapshot
+
+        if not snapshot or not hasattr(retriever, "retrieve_expense_snapshot_rows"):
+            return None
+
+        if snapshot.is_built():
+            return snapshot
+
+        # Concurrent readers wait for a single reload of all the Expenses
+        with self.__expense_snapshot_lock:
+            if not snapshot.is_built():
+                generation = snapshot.get_generation()
+
+                if not snapshot.build(*retriever.retrieve_expense_snapshot_rows(),
+                                      generation=generation):
+                    return None
+
+        return snapshot
+
+    def get_expense_names_index(self) -> ExpenseNamesIndex:
+        """Returns the autocomplete index of expense names"""
+        return self.__expense_names_index
+
+    def get_expense_snapshot(self) -> ExpenseSnapshot:
+        """Returns the columnar snapshot of Expenses (None if disabled)"""
+        return self.__expense_snapshot
+
+    def get_cost_statistics(self) -> CostStatistics:
+        """Returns the statistics of Expense costs per name"""
+        return self.__cost_statistics
+
+    def get_daily_totals(self) -> DailyTotals:
+        """Returns the cumulative costs of Expenses per day"""
+        return self.__daily_totals
+
+    def get_months_index(self) -> MonthsIndex:
+        """Returns the index of months with Expenses"""
+        return self.__months_index
+
+    def get_tag_dictionary(self) -> TagDictionary:
+        """Returns the dictionary of persisted tag ids"""
+        return self.__tag_dictionary
+
+    def get_data_versions(self) -> DataVersions:
+        """Returns versions of the tables changed by persisters"""
+        return self.__data_versions
+
+    def get_query_cache(self) -> QueryCache:
+        """Returns the cache of retrieved query results"""
+        return self.__query_cache
+
+    def on_category_added(self):
+        """Marks categories as changed"""
+        self.__on_tables_changed(CATEGORIES)
+
+    def on_tags_added(self):
+        """Marks tags as changed"""
+        self.__on_tables_changed(TAGS)
+
+    def on_suggestions_changed(self):
+        """Marks expense suggestions as changed"""
+        self.__on_tables_changed(SUGGESTIONS)
+
+    def on_expense_tags_changed(self, expense_tags):
+        """
+        Updates the indexes with (expense id, persisted Tags) pairs
+        of Expenses whose tag relations were replaced
+        """
+        self.__on_tables_changed(EXPENSES)
+
+        if self.__expense_snapshot:
+            for expense_id, tags in expense_tags:
+                self.__expense_snapshot.set_tags(convert_id(expense_id), tags)
+
+    def on_expense_added(self, expense):
+        """Updates the indexes with a newly added Expense"""
+        self.__on_tables_changed(EXPENSES)
+
+        if self.__expense_snapshot:
+            self.__expense_snapshot.add(expense)
+
+        with self.__lock:
+            if not self.__built:
+                return None
+
+            self.__expense_names_index.add(expense.get_name(),
+                                           get_category_name(expense))
+            self.__months_index.add(get_month(expense))
+            add_cost(self.__cost_statistics, expense)
+            add_daily_cost(self.__daily_totals, expense)
+
+    def on_expense_updated(self, previous_expense, expense):
+        """Updates the indexes with changes of the Expense"""
+        self.__on_tables_changed(EXPENSES)
+
+        if self.__expense_snapshot:
+            self.__expense_snapshot.remove(previous_expense)
+            self.__expense_snapshot.add(expense)
+
+        with self.__lock:
+            if not self.__built:
+                return None
+
+            self.__expense_names_index.remove(previous_expense.get_name(),
+                                              get_category_name(previous_expense))
+            self.__expense_names_index.add(expense.get_name(),
+                                           get_category_name(expense))
+            self.__months_index.remove(get_month(previous_expense))
+            self.__months_index.add(get_month(expense))
+            remove_cost(self.__cost_statistics, previous_expense)
+            add_cost(self.__cost_statistics, expense)
+            remove_daily_cost(self.__daily_totals, previous_expense)
+            add_daily_cost(self.__daily_totals, expense)
+
+    def on_expense_deleted(self, expense):
+        """Removes the deleted Expense from the indexes"""
+        self.__on_tables_changed(EXPENSES)
+
+        if self.__expense_snapshot:
+            self.__expense_snapshot.remove(expense)
+
+        with self.__lock:
+            if not self.__built:
+                return None
+
+            self.__expense_names_index.remove(expense.get_name(),
+                                              get_category_name(expense))
+            self.__months_index.remove(get_month(expense))
+            remove_cost(self.__cost_statistics, expense)
+            remove_daily_cost(self.__daily_totals, expense)
+
+    def __on_tables_changed(self, *tables):
+        self.__data_versions.bump(*tables)
+        self.__query_cache.invalidate(*tables)
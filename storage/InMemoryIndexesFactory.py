@@ -0,0 +1,28 @@
+import threading
+
+from storage.InMemoryIndexes import InMemoryIndexes
+from validation_utils import validate_non_empty_string
+from const import DATABASE_TYPES
+
+class InMemoryIndexesFactory:
+    """
+    Creates InMemoryIndexes. They mirror the database content,
+    so a single instance per database type is shared by the whole process.
+    """
+    __indexes = {}
+    __lock = threading.Lock()
+
+    @staticmethod
+    def create(type) -> InMemoryIndexes:
+        validate_non_empty_string(type, "type")
+
+        if type not in DATABASE_TYPES.values():
+            return None
+
+        with InMemoryIndexesFactory.__lock:
+            indexes = InMemoryIndexesFactory.__indexes
+
+            if type not in indexes:
+                indexes[type] = InMemoryIndexes()
+
+            return indexes[type]
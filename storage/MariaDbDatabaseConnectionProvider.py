@@ -1,27 +1,40 @@
 """Provides a connection to Sqlite database"""
 import mariadb
 import json
+from contextlib import contextmanager
 
+from storage.ConnectionPool import ConnectionPool
+from storage.DatabaseTransaction import DatabaseTransaction
 from validation_utils import validate_dict, validate_non_empty_string
 
 def create_columns_schema(columns):
     return ", ".join("{} {}".format(name, schema) for name, schema in columns)
 
+def check_connection(connection):
+    connection.ping()
+
 class MariaDbDatabaseConnectionProvider:
-    __connection = None
+    __pool = None
     __settings = None
 
     """Exposes methods for connecting and disconnecting with database"""
-    def __init__(self, database_tables):
+    def __init__(self, database_tables, pool_size=5, max_idle_time=None):
         self.__validate_database_tables(database_tables)
-        self.__settings = json.load(open('settings.json'))
-        self.__database_tables = database_tables
 
-        self.__connection = self.__get_connection()
+        with open('settings.json') as settings_file:
+            self.__settings = json.load(settings_file)
+
+        self.__database_tables = database_tables
+        self.__pool = ConnectionPool(self.__get_connection, pool_size,
+                                     max_idle_time, check_connection)
 
     def __del__(self):
-        if self.__connection:
-            self.__connection.close()
+        if self.__pool:
+            self.__pool.close()
+
+    def close(self):
+        """Closes all pooled connections"""
+        self.__pool.close()
 
     def __get_connection(self):
         """Connects to Sqlite database and returns the connection"""
@@ -40,35 +53,118 @@ class MariaDbDatabaseConnectionProvider:
         if they have necessary columns and adds them if they don't.
         """
 
-        cursor = self.__connection.cursor()
-
-        cursor.execute('SHOW TABLES')
-        self.__connection.commit()
-
-        tables = cursor.fetchall()
+        tables = self.execute_query('SHOW TABLES')
 
         if tables == None or len(tables) == 0:
           self.__ensure_categories_table_exists()
           self.__ensure_expenses_table_exists()
 
+        self.__ensure_monthly_totals_table_exists(tables or [])
+        self.__ensure_tags_tables_exist()
+
+    def rebuild_monthly_totals(self):
+        """Recalculates expense totals per month and category from scratch"""
+        with self.transaction() as transaction:
+            transaction.execute_query("DELETE FROM {}".format(
+                self.__get_monthly_totals_table_name()))
+            transaction.execute_query("INSERT INTO {totals} " \
+                "(month, category_id, total, count) " \
+                "SELECT DATE_FORMAT(CONVERT_TZ(FROM_UNIXTIME(purchase_date), " \
+                "@@session.time_zone, '+00:00'), '%Y-%m') AS month, " \
+                "category_id, SUM(cost), COUNT(*) FROM {expenses} " \
+                "GROUP BY month, category_id".format(
+                    totals=self.__get_monthly_totals_table_name(),
+                    expenses=self.__database_tables["expenses"]))
+
     def execute_query(self, query, params = ()):
         """Makes a request to the database"""
-        cursor = self.__connection.cursor()
+        with self.__pool.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                cursor.execute(query, params)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                cursor.close()
 
-        cursor.execute(query, params)
-        self.__connection.commit()
+                raise
 
-        result = None
+            result = None
 
-        try:
-          result = cursor.fetchall()
-        except Exception as ex:
-          print(ex)
+            try:
+              result = cursor.fetchall()
+            except Exception as ex:
+              print(ex)
 
-        cursor.close()
+            cursor.close()
 
         return result
 
+    @contextmanager
+    def transaction(self):
+        """
+        Yields a DatabaseTransaction whose queries are committed together
+        at the end of the with block or rolled back on error
+        """
+        with self.__pool.connection() as connection:
+            try:
+                yield DatabaseTransaction(connection)
+
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+
+                raise
+
+    def iterate_query(self, query, params = (), batch_size = 500):
+        """
+        Makes a read-only request to the database and yields the rows,
+        fetching them in batches. The connection stays checked out
+        until the generator is exhausted or closed.
+        """
+        with self.__pool.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                cursor.execute(query, params)
+
+                rows = cursor.fetchmany(batch_size)
+
+                while rows:
+                    yield from rows
+
+                    rows = cursor.fetchmany(batch_size)
+            finally:
+                cursor.close()
+                # Ends the transaction, so the next read sees fresh data
+                connection.commit()
+
+    def __ensure_monthly_totals_table_exists(self, tables):
+        totals = self.__get_monthly_totals_table_name()
+
+        if (totals,) in [tuple(table) for table in tables]:
+            return None
+
+        self.execute_query("CREATE TABLE IF NOT EXISTS {} (" \
+            "month CHAR(7) NOT NULL, category_id INT NOT NULL, " \
+            "total INT NOT NULL DEFAULT 0, count INT NOT NULL DEFAULT 0, " \
+            "PRIMARY KEY (month, category_id))".format(totals))
+        self.rebuild_monthly_totals()
+
+    def __ensure_tags_tables_exist(self):
+        self.execute_query("CREATE TABLE IF NOT EXISTS {} (" \
+            "tag_id VARCHAR(36) PRIMARY KEY, " \
+            "name VARCHAR(100) UNIQUE NOT NULL)".format(
+                self.__database_tables.get("tags", "tags")))
+        self.execute_query("CREATE TABLE IF NOT EXISTS {} (" \
+            "expense_id INT NOT NULL, tag_id VARCHAR(36) NOT NULL, " \
+            "PRIMARY KEY (expense_id, tag_id), INDEX (tag_id))".format(
+                self.__database_tables.get("expense_tags", "expense_tags")))
+
+    def __get_monthly_totals_table_name(self):
+        return self.__database_tables.get("monthly_totals", "monthly_totals")
+
     def __ensure_expenses_table_exists(self):
         columns = [
             ("expense_id", "INT PRIMARY KEY AUTO_INCREMENT"),
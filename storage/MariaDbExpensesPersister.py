@@ -1,28 +1,43 @@
 """Uses MariaDb to save and update Expenses in the database"""
 from typing import Tuple
 import html
-from datetime import date
+import json
+import uuid
 
-from const import DATABASE_TYPE
+from date_utils import get_date_of_timestamp, get_month_of_timestamp
 from validation_utils import validate_dict, validate_non_empty_string
-from expense.Expense import Expense, convert_date_string_to_timestamp
-from storage.ExpensesRetrieverFactory import ExpensesRetrieverFactory
+from expense.Category import Category
+from expense.Expense import Expense
+from expense.Tag import Tag
+from storage.ExpenseChanges import convert_expense_changes
 from storage.ExpensesPersisterBase import ExpensesPersisterBase
+from storage.InMemoryIndexes import get_category_id
 from storage.DbQueryProvider import DbQueryProvider, DbQueryType
+from storage.MariaDbQueryProvider import MariaDbQueryProvider
 
 SaveExpenseParams = Tuple[str, int, int, str, int, int, int]
 
+# Rows inserted by a single multi-row INSERT of add_expenses
+BULK_INSERT_ROWS = 1000
+
+def create_multi_row_insert(query, number_of_rows):
+    """Repeats the VALUES of a single row INSERT query for number_of_rows rows"""
+    columns, values = query.rsplit(" VALUES ", 1)
+
+    return columns + " VALUES " + ", ".join([values] * number_of_rows)
+
 class MariaDbExpensesPersister(ExpensesPersisterBase):
     """Persists Expenses data in a database"""
 
-    def __init__(self, database_tables, connection_provider, query_provider: DbQueryProvider):
+    def __init__(self, database_tables, connection_provider,
+                 query_provider: DbQueryProvider = None, in_memory_indexes=None):
         self.__validate_database_tables(database_tables)
         self.__validate_connection_provider(connection_provider)
 
-        self.__categories_table_name = database_tables["categories"]
-        self.__expenses_table_name = database_tables["expenses"]
         self.__connection_provider = connection_provider
-        self.__query_provider = query_provider
+        self.__query_provider = query_provider or \
+            MariaDbQueryProvider(database_tables)
+        self.__in_memory_indexes = in_memory_indexes
 
     def add_expense(self, expense : Expense):
         """Adds a new Expense to database"""
@@ -30,68 +45,286 @@ class MariaDbExpensesPersister(ExpensesPersisterBase):
             return None
 
         query = self.__query_provider.create_query(DbQueryType.SAVE_EXPENSE)
-        purchase_date = date.fromtimestamp(expense.get_purchase_date())
+        params = self.__get_save_expense_params(expense)
 
-        params: SaveExpenseParams = (
-          expense.get_name(),
-          expense.get_cost(),
-          expense.get_purchase_date(),
-          expense.get_category().get_category_id(),
-          purchase_date.day,
-          purchase_date.month,
-          purchase_date.year
-        )
+        with self.__connection_provider.transaction() as transaction:
+            transaction.execute_query(query, params)
+            expense_id = transaction.get_last_row_id()
+            tag_ids = self.__add_expense_tags(transaction,
+                                              [(expense_id, expense.get_tags())])
+            self.__add_to_monthly_totals(transaction, expense.get_purchase_date(),
+                                         expense.get_category().get_category_id(),
+                                         expense.get_cost(), 1)
 
-        self.__connection_provider.execute_query(query, params)
+        if self.__in_memory_indexes:
+            self.__in_memory_indexes.on_expense_added(
+                self.__create_persisted_expense(expense, expense_id, tag_ids))
 
         print("Added: {}".format(expense))
 
+        return expense_id
+
+    def add_expenses(self, expenses):
+        """
+        Adds Expenses with their tags to the database in a single
+        transaction, returns the list of ids assigned to them
+        """
+        if not expenses:
+            return []
+
+        query = self.__query_provider.create_query(DbQueryType.SAVE_EXPENSE)
+        totals = {}
+        expense_ids = []
+
+        for expense in expenses:
+            month = get_month_of_timestamp(expense.get_purchase_date())
+            key = (month, expense.get_category().get_category_id())
+            total, count = totals.get(key, (0, 0))
+            totals[key] = (total + expense.get_cost(), count + 1)
+
+        with self.__connection_provider.transaction() as transaction:
+            if self.__are_inserted_ids_consecutive(transaction):
+                for start in range(0, len(expenses), BULK_INSERT_ROWS):
+                    batch = expenses[start:start + BULK_INSERT_ROWS]
+
+                    transaction.execute_query(
+                        create_multi_row_insert(query, len(batch)),
+                        [param for expense in batch
+                         for param in self.__get_save_expense_params(expense)])
+
+                    # LAST_INSERT_ID() is the id of the first row
+                    # of a multi-row INSERT
+                    first_id = transaction.execute_query(self.__create_query(
+                        DbQueryType.SELECT_LAST_INSERT_ID))[0][0]
+                    expense_ids.extend(range(first_id, first_id + len(batch)))
+            else:
+                for expense in expenses:
+                    transaction.execute_query(
+                        query, self.__get_save_expense_params(expense))
+                    expense_ids.append(transaction.get_last_row_id())
+
+            tag_ids = self.__add_expense_tags(
+                transaction, [(expense_id, expense.get_tags()) for expense, expense_id
+                              in zip(expenses, expense_ids)])
+            transaction.execute_many(
+                self.__create_query(DbQueryType.UPSERT_MONTHLY_TOTALS),
+                                     [(month, category_id, total, count)
+                                      for (month, category_id), (total, count)
+                                      in totals.items()])
+
+        if self.__in_memory_indexes:
+            for expense, expense_id in zip(expenses, expense_ids):
+                self.__in_memory_indexes.on_expense_added(
+                    self.__create_persisted_expense(expense, expense_id, tag_ids))
+
+        print("Added {} expenses".format(len(expenses)))
+
+        return expense_ids
+
     def update_expense(self, expense_id, changes):
-        """Updates existing Expense in the database"""
+        """
+        Updates existing Expense in the database, returns the updated
+        Expense or None if it doesn't exist
+        """
+
+        columns = convert_expense_changes(changes)
 
-        updates = []
+        if "purchase_date" in columns:
+            purchase_date = get_date_of_timestamp(columns["purchase_date"])
 
-        for key, value in changes.items():
-          if key == 'purchase_date':
-            timestamp = convert_date_string_to_timestamp(value)
-            purchase_date = date.fromtimestamp(timestamp)
+            columns["day"] = purchase_date.day
+            columns["month"] = purchase_date.month
+            columns["year"] = purchase_date.year
 
-            updates.append("{} = '{}'".format(key, timestamp))
-            updates.append("day = '{}'".format(purchase_date.day))
-            updates.append("month = '{}'".format(purchase_date.month))
-            updates.append("year = '{}'".format(purchase_date.year))
-          elif key == 'cost':
-            updates.append("{} = {}".format(key, value))
-          else:
-            updates.append("{} = '{}'".format(key, value))
+        params = tuple(columns.get(column) for column in
+                       ["name", "cost", "purchase_date", "category_id", "day",
+                        "month", "year"])
 
-        query = "UPDATE {} SET {}  WHERE expense_id = {}".format(
-                self.__expenses_table_name,
-                ", ".join(updates),
-                expense_id)
+        # UPDATE ... RETURNING is not supported, so the row is read
+        # before and after the update within the same transaction
+        with self.__connection_provider.transaction() as transaction:
+            previous_expense = self.__read_expense(transaction, expense_id)
 
-        print(query)
+            if not previous_expense:
+                return None
 
-        self.__connection_provider.execute_query(query)
+            transaction.execute_query(
+                self.__create_query(DbQueryType.UPDATE_EXPENSE),
+                params + (expense_id,))
+            expense = self.__read_expense(transaction, expense_id)
 
-        retriever = ExpensesRetrieverFactory.create(DATABASE_TYPE)
-        expense = retriever.retrieve_expense(expense_id)
+            self.__add_to_monthly_totals(
+                transaction, previous_expense.get_purchase_date(),
+                previous_expense.get_category().get_category_id(),
+                -previous_expense.get_cost(), -1)
+            self.__add_to_monthly_totals(
+                transaction, expense.get_purchase_date(),
+                expense.get_category().get_category_id(), expense.get_cost(), 1)
+
+        if self.__in_memory_indexes:
+            self.__in_memory_indexes.on_expense_updated(previous_expense, expense)
 
         print("Updated: {}".format(expense))
 
         return expense
 
+    def delete_expense(self, expense_id):
+        """
+        Deletes the Expense from the database,
+        returns the deleted Expense or None if it doesn't exist
+        """
+
+        with self.__connection_provider.transaction() as transaction:
+            expense = self.__read_expense(transaction, expense_id)
+
+            if not expense:
+                return None
+
+            transaction.execute_query(
+                self.__create_query(DbQueryType.DELETE_EXPENSE),
+                (expense.get_expense_id(),))
+            self.__add_to_monthly_totals(transaction, expense.get_purchase_date(),
+                                         expense.get_category().get_category_id(),
+                                         -expense.get_cost(), -1)
+
+        if self.__in_memory_indexes:
+            self.__in_memory_indexes.on_expense_deleted(expense)
+
+        print("Deleted: {}".format(expense))
+
+        return expense
+
     def add_category(self, category):
         """Adds a new Category to the database"""
 
-        query = "INSERT INTO {} (name) VALUES ('{}', '{}')".format(
-                    self.__categories_table_name,
-                    html.escape(category.get_name()))
+        self.__connection_provider.execute_query(
+            self.__create_query(DbQueryType.SAVE_CATEGORY),
+            (html.escape(category.get_name()),))
 
-        self.__connection_provider.execute_query(query)
+        if self.__in_memory_indexes:
+            self.__in_memory_indexes.on_category_added()
 
         print("Added: {}".format(category))
 
+    def __add_to_monthly_totals(self, transaction, purchase_date, category_id,
+                                cost, count):
+        """Adds cost and count (negative to subtract) to the monthly totals"""
+        month = get_month_of_timestamp(purchase_date)
+
+        transaction.execute_query(
+            self.__create_query(DbQueryType.UPSERT_MONTHLY_TOTALS),
+            (month, category_id, cost, count))
+
+        if count < 0:
+            transaction.execute_query(
+                self.__create_query(DbQueryType.DELETE_EMPTY_MONTHLY_TOTALS),
+                (month, category_id))
+
+    def __add_expense_tags(self, transaction, expense_tags):
+        """
+        Links new Expenses with their Tags given as (expense id, Tags) pairs,
+        returns the name to tag id mapping of all the Tags
+        """
+        tag_ids = self.__resolve_tag_ids(
+            transaction, [tag for _, tags in expense_tags for tag in tags])
+        links = {(expense_id, tag_ids[tag.get_name()])
+                 for expense_id, tags in expense_tags for tag in tags}
+
+        if links:
+            transaction.execute_many(
+                self.__create_query(DbQueryType.SAVE_EXPENSE_TAG_LINK),
+                sorted(links))
+
+        return tag_ids
+
+    def __resolve_tag_ids(self, transaction, tags):
+        """
+        Returns the name to tag id mapping of the Tags, adding the ones
+        missing in the database (matched by the unique tag name)
+        """
+        if not tags:
+            return {}
+
+        tag_ids_by_name = {}
+
+        for tag in tags:
+            tag_ids_by_name.setdefault(tag.get_name(), tag.get_tag_id())
+
+        tag_ids = self.__insert_tags(transaction, tag_ids_by_name)
+        # A tag id taken by another name makes the insert ignored
+        conflicting_names = [name for name in tag_ids_by_name if name not in tag_ids]
+
+        if conflicting_names:
+            tag_ids.update(self.__insert_tags(
+                transaction, {name: str(uuid.uuid4()) for name in conflicting_names}))
+
+        return tag_ids
+
+    def __insert_tags(self, transaction, tag_ids_by_name):
+        transaction.execute_many(self.__create_query(DbQueryType.SAVE_TAG),
+            [(tag_id, name) for name, tag_id in tag_ids_by_name.items()])
+
+        return dict(transaction.execute_query(
+            self.__create_query(DbQueryType.SELECT_TAG_IDS_BY_NAMES),
+            (json.dumps(list(tag_ids_by_name)),)))
+
+    def __create_persisted_expense(self, expense, expense_id, tag_ids):
+        """Returns the added Expense as it is read from the database"""
+        category = expense.get_category()
+        category_name = category.get_name() if category else None
+
+        return Expense(
+            expense_id=expense_id,
+            name=html.unescape(expense.get_name()),
+            cost=expense.get_cost(),
+            date=expense.get_purchase_date(),
+            category=Category.get_shared(
+                get_category_id(expense),
+                html.unescape(category_name) if category_name else None),
+            tags=list(dict.fromkeys(
+                Tag.get_shared(tag_ids[tag.get_name()], html.unescape(tag.get_name()))
+                for tag in expense.get_tags())))
+
+    def __are_inserted_ids_consecutive(self, transaction):
+        """
+        Returns True if rows of a multi-row INSERT get consecutive ids,
+        which interleaved auto-increment locking (innodb_autoinc_lock_mode 2)
+        and auto_increment_increment above 1 don't guarantee
+        """
+        lock_mode, increment = transaction.execute_query(
+            self.__create_query(DbQueryType.SELECT_AUTO_INCREMENT_SETTINGS))[0]
+
+        return lock_mode < 2 and increment == 1
+
+    def __create_query(self, query_type):
+        return self.__query_provider.create_query(query_type)
+
+    def __get_save_expense_params(self, expense) -> SaveExpenseParams:
+        purchase_date = get_date_of_timestamp(expense.get_purchase_date())
+
+        return (
+          expense.get_name(),
+          expense.get_cost(),
+          expense.get_purchase_date(),
+          expense.get_category().get_category_id(),
+          purchase_date.day,
+          purchase_date.month,
+          purchase_date.year
+        )
+
+    def __read_expense(self, transaction, expense_id):
+        rows = transaction.execute_query(
+            self.__create_query(DbQueryType.SELECT_EXPENSE), (expense_id,))
+
+        if not rows:
+            return None
+
+        expense_id, name, cost, purchase_date, category_id, category_name = rows[0]
+
+        return Expense(expense_id, html.unescape(name), cost, purchase_date,
+                       Category.get_shared(category_id, html.unescape(category_name)
+                                           if category_name else None), [])
+
     def __validate_connection_provider(self, connection_provider):
         if not connection_provider:
             raise ValueError("InvalidArgument: connection_provider must be "
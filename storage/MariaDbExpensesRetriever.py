@@ -1,53 +1,86 @@
 import html
-import pendulum
+import re
+from date_utils import get_period, get_period_months
 from validation_utils import validate_dict, validate_non_empty_string
 from expense.Expense import Expense
 from expense.Category import Category
 from expense.Tag import Tag
+from storage.CostStatistics import CostStatistics
+from storage.DataVersions import CATEGORIES, EXPENSES, TAGS
+from storage.DailyTotals import get_date_range
+from storage.DbQueryProvider import DbQueryProvider, DbQueryType
+from storage.ExpenseNamesIndex import get_pair
+from storage.ExpenseAnalytics import (HISTORY_MONTHS, convert_rows_to_columns,
+                                      create_category_shares, create_trends,
+                                      validate_number_of_months)
+from storage.ExpenseSnapshot import convert_cost
 from storage.ExpensesRetrieverBase import ExpensesRetrieverBase
+from storage.MariaDbQueryProvider import MariaDbQueryProvider
+from storage.MonthsIndex import MonthsIndex
+from storage.PageCursor import (decode_page_cursor, encode_page_cursor,
+                                validate_page_size)
+
+# MariaDb has no LIMIT value meaning "all rows"
+NO_LIMIT = 2 ** 63 - 1
+
+def escape_like_pattern(text):
+    """Escapes LIKE wildcards so the text is matched literally"""
+    return re.sub(r"([\\%_])", r"\\\1", text or "")
 
 class MariaDbExpensesRetriever(ExpensesRetrieverBase):
 
-    def __init__(self, database_tables, connection_provider):
+    def __init__(self, database_tables, connection_provider,
+                 in_memory_indexes=None, query_provider: DbQueryProvider = None):
         self.__validate_database_tables(database_tables)
         self.__validate_connection_provider(connection_provider)
 
-        self.__expenses_table_name = database_tables["expenses"]
-        self.__categories_table_name = database_tables["categories"]
         self.__connection_provider = connection_provider
+        self.__in_memory_indexes = in_memory_indexes
+        self.__query_provider = query_provider or \
+            MariaDbQueryProvider(database_tables)
 
-    def filter_expenses(self, expense_name):
+    def filter_expenses(self, expense_name, limit=None, offset=0):
         """Returns a list of Expenses with matching expense_name"""
 
-        selection = """SELECT {ex_table}.expense_id, {ex_table}.name,
-                    {ex_table}.cost, {ex_table}.purchase_date,
-                    {cat_table}.category_id,
-                    {cat_table}.name AS 'category_name'
-                    FROM {ex_table}
-                    LEFT JOIN {cat_table} ON
-                    {ex_table}.category_id = {cat_table}.category_id
-                    WHERE {ex_table}.name COLLATE UTF8_GENERAL_CI LIKE '%{expense_name}%'""".format(
-                        ex_table=self.__expenses_table_name,
-                        cat_table=self.__categories_table_name,
-                        expense_name=expense_name)
-
-        rows = self.__execute_query(selection)
+        pattern = "%{}%".format(escape_like_pattern(expense_name))
+        rows = self.__execute_query(DbQueryType.FILTER_EXPENSES, (
+            pattern, NO_LIMIT if limit is None else limit, offset))
 
         return self.__get_models_array(rows, "expense")
 
     def retrieve_common_expense_cost(self, expense_name):
         """Returns the most common price for provided Expense name"""
-        selection = """SELECT name, cost, COUNT(name) as 'counter'
-                    FROM {ex_table}
-                    WHERE name LIKE '{ex_name}'
-                    GROUP BY name, cost
-                    ORDER BY COUNT(name) DESC
-                    LIMIT 1""".format(
-                        ex_table=self.__expenses_table_name,
-                        ex_name=expense_name
-                    )
-
-        rows = self.__execute_query(selection)
+        if self.__in_memory_indexes and self.__in_memory_indexes.is_built():
+            return self.__in_memory_indexes.get_cost_statistics().get_common_cost(
+                expense_name)
+
+        return self.__get_cached(
+            "retrieve_common_expense_cost", (expense_name,), (EXPENSES,),
+            lambda: self.__retrieve_common_expense_cost(expense_name))
+
+    def retrieve_expense_cost_statistics(self, expense_name):
+        """
+        Returns count, modal, last, median, min and max cost of Expenses
+        with provided name or None if there are none
+        """
+        if self.__in_memory_indexes and self.__in_memory_indexes.is_built():
+            return self.__in_memory_indexes.get_cost_statistics().get_statistics(
+                expense_name)
+
+        cost_statistics = CostStatistics()
+        cost_statistics.build(self.__execute_query(
+            DbQueryType.SELECT_EXPENSE_COSTS_OF_NAME,
+            (escape_like_pattern(expense_name),)))
+
+        return cost_statistics.get_statistics(expense_name)
+
+    def retrieve_expense_costs(self):
+        """Returns (expense name, purchase date, cost, number of expenses) rows"""
+        return self.__execute_query(DbQueryType.SELECT_EXPENSE_COSTS)
+
+    def __retrieve_common_expense_cost(self, expense_name):
+        rows = self.__execute_query(DbQueryType.SELECT_COMMON_EXPENSE_COST,
+                                    (expense_name,))
 
         if not rows or rows[0][2] < 5:
             return 0
@@ -57,19 +90,8 @@ class MariaDbExpensesRetriever(ExpensesRetrieverBase):
     def retrieve_expense(self, expense_id):
         """Returns an Expense from the database"""
 
-        expense_query = """SELECT {ex_table}.expense_id, {ex_table}.name,
-                    {ex_table}.cost, {ex_table}.purchase_date,
-                    {cat_table}.category_id,
-                    {cat_table}.name AS 'category_name'
-                    FROM {ex_table}
-                    LEFT JOIN {cat_table} ON
-                    {ex_table}.category_id = {cat_table}.category_id
-                    WHERE {ex_table}.expense_id = '{expense_id}'""".format(
-                        ex_table=self.__expenses_table_name,
-                        cat_table=self.__categories_table_name,
-                        expense_id=expense_id)
-
-        expense_rows = self.__execute_query(expense_query)
+        expense_rows = self.__execute_query(DbQueryType.SELECT_EXPENSE,
+                                            (expense_id,))
 
         if not expense_rows:
             return None
@@ -78,86 +100,226 @@ class MariaDbExpensesRetriever(ExpensesRetrieverBase):
 
     def retrieve_expenses(self, latest_month, number_of_months):
         """Returns the list of Expenses for certain period of time"""
+        return list(self.iterate_expenses(latest_month, number_of_months))
+
+    def iterate_expenses(self, latest_month, number_of_months):
+        """
+        Yields Expenses for certain period of time (the latest first)
+        while they are read from the database
+        """
+
+        period = get_period(latest_month, number_of_months)
+
+        return self.__iterate_cached(
+            "iterate_expenses", period, (EXPENSES, CATEGORIES, TAGS),
+            lambda: self.__iterate_expenses(
+                DbQueryType.SELECT_EXPENSES_IN_PERIOD, period))
+
+    def retrieve_expenses_page(self, latest_month, number_of_months,
+                               page_size, cursor=None):
+        """
+        Returns a (list of Expenses, next page cursor) tuple with up to
+        page_size Expenses of the period following the cursor position
+        """
+
+        return self.__retrieve_expenses_page(
+            DbQueryType.SELECT_EXPENSES_PAGE_IN_PERIOD,
+            DbQueryType.SELECT_EXPENSES_PAGE_IN_PERIOD_AFTER,
+            get_period(latest_month, number_of_months), page_size, cursor)
+
+    def filter_expenses_page(self, expense_name, page_size, cursor=None):
+        """
+        Returns a (list of Expenses, next page cursor) tuple with up to
+        page_size Expenses with matching expense_name (the latest first)
+        """
+
+        return self.__retrieve_expenses_page(
+            DbQueryType.FILTER_EXPENSES_PAGE,
+            DbQueryType.FILTER_EXPENSES_PAGE_AFTER,
+            ("%{}%".format(escape_like_pattern(expense_name)),),
+            page_size, cursor)
+
+    def __retrieve_expenses_page(self, query_type, after_cursor_query_type,
+                                 params, page_size, cursor):
+        validate_page_size(page_size)
+
+        if cursor:
+            purchase_date, expense_id = decode_page_cursor(cursor)
+            query_type = after_cursor_query_type
+            params = params + (purchase_date, purchase_date, expense_id)
 
-        month_end = pendulum.parse(latest_month).add(months=1).subtract(seconds=1)
-        month_start = month_end.subtract(months=number_of_months).add(seconds=1)
+        expenses = list(self.__iterate_expenses(query_type,
+                                                params + (page_size + 1,)))
 
-        expenses_query = """SELECT {ex_table}.expense_id, {ex_table}.name,
-                    {ex_table}.cost, {ex_table}.purchase_date,
-                    {cat_table}.category_id,
-                    {cat_table}.name AS 'category_name'
-                    FROM {ex_table}
-                    LEFT JOIN {cat_table} ON
-                    {ex_table}.category_id = {cat_table}.category_id
-                    WHERE {ex_table}.purchase_date
-                    BETWEEN {start_date} AND {end_date}
-                    ORDER BY purchase_date DESC""".format(
-                        ex_table=self.__expenses_table_name,
-                        cat_table=self.__categories_table_name,
-                        start_date=month_start.int_timestamp,
-                        end_date=month_end.int_timestamp)
+        if len(expenses) <= page_size:
+            return expenses, None
 
-        expense_rows = self.__execute_query(expenses_query)
+        last_expense = expenses[page_size - 1]
 
-        return self.__get_models_array(expense_rows, "expense")
+        return expenses[:page_size], encode_page_cursor(
+            last_expense.get_purchase_date(), last_expense.get_expense_id())
+
+    def __iterate_expenses(self, query_type, params):
+        """Yields Expenses read with the query while they are fetched"""
+
+        rows = self.__connection_provider.iterate_query(
+            self.__query_provider.create_query(query_type), params)
+
+        for row in rows:
+            yield self.__convert_table_row_to_expense(row)
+
+    def retrieve_summary(self, latest_month, number_of_months):
+        """
+        Returns totals and counts of Expenses per month and category
+        for certain period of time (the latest month first)
+        """
+
+        rows = self.__execute_query(DbQueryType.SELECT_SUMMARY,
+                                    get_period_months(latest_month, number_of_months))
+
+        return [{
+            "month": month,
+            "category": {
+                "id": category_id,
+                "name": html.unescape(category_name) if category_name else None
+            },
+            "total": total,
+            "count": count
+        } for month, category_id, category_name, total, count in rows]
+
+    def retrieve_trends(self, latest_month, number_of_months):
+        """
+        Returns monthly totals, trailing averages and year-over-year deltas
+        of all Expenses and per Category for certain period of time
+        """
+        validate_number_of_months(number_of_months)
+
+        return self.__get_cached(
+            "retrieve_trends", (latest_month, number_of_months),
+            (EXPENSES, CATEGORIES),
+            lambda: create_trends(
+                self.retrieve_expense_columns(*get_period(
+                    latest_month, number_of_months + HISTORY_MONTHS)),
+                self.retrieve_categories(), latest_month, number_of_months))
+
+    def retrieve_category_shares(self, latest_month, number_of_months):
+        """
+        Returns totals, counts and shares of spending per Category
+        for certain period of time
+        """
+        validate_number_of_months(number_of_months)
+
+        return self.__get_cached(
+            "retrieve_category_shares", (latest_month, number_of_months),
+            (EXPENSES, CATEGORIES),
+            lambda: create_category_shares(
+                self.retrieve_expense_columns(
+                    *get_period(latest_month, number_of_months)),
+                self.retrieve_categories()))
+
+    def retrieve_expense_columns(self, first_date, last_date):
+        """
+        Returns purchase dates, costs and category ids arrays of Expenses
+        purchased between the timestamps
+        """
+        return convert_rows_to_columns(self.__execute_query(
+            DbQueryType.SELECT_EXPENSE_COLUMNS_IN_PERIOD, (first_date, last_date)))
+
+    def retrieve_daily_totals(self):
+        """Returns (day since epoch, category id, total cost) rows"""
+        return self.__execute_query(DbQueryType.SELECT_DAILY_TOTALS)
+
+    def retrieve_total(self, first_date=None, last_date=None, category_id=None):
+        """
+        Returns the total cost of Expenses (of the category if it's given)
+        purchased from first_date to last_date (YYYY-MM-DD, both optional)
+        """
+        first_timestamp, last_timestamp = get_date_range(first_date, last_date)
+
+        if self.__in_memory_indexes and self.__in_memory_indexes.is_built():
+            return self.__in_memory_indexes.get_daily_totals().get_total(
+                first_timestamp, last_timestamp, category_id)
+
+        rows = self.__execute_query(
+            DbQueryType.SELECT_TOTAL_IN_PERIOD,
+            (first_timestamp, last_timestamp, category_id, category_id))
+
+        return convert_cost(round(rows[0][0], 2))
 
     def retrieve_months(self):
         """Returns a list of months which may have Expenses registered"""
-        oldest_timestamp = self.__execute_query("""SELECT {ex_table}.purchase_date
-                                              FROM {ex_table}
-                                              ORDER BY {ex_table}.purchase_date ASC
-                                              LIMIT 1""".format(ex_table=self.__expenses_table_name))
+        return self.__get_months_index().get_months()
+
+    def retrieve_months_with_counts(self):
+        """
+        Returns a list of {month, count} dictionaries for months which
+        may have Expenses registered
+        """
+        return self.__get_months_index().get_month_counts()
+
+    def retrieve_month_counts(self):
+        """Returns (month, number of expenses) rows"""
+        return self.__execute_query(DbQueryType.SELECT_MONTH_COUNTS)
 
-        oldest_date = pendulum.from_timestamp(int(oldest_timestamp[0][0]))
-        period = pendulum.period(oldest_date, pendulum.now())
+    def __get_months_index(self):
+        if self.__in_memory_indexes and self.__in_memory_indexes.is_built():
+            return self.__in_memory_indexes.get_months_index()
 
-        months = [month.format("YYYY-MM") for month in period.range("months")]
+        months_index = MonthsIndex()
+        months_index.build(self.retrieve_month_counts())
 
-        return months
+        return months_index
 
-    def retrieve_similar_expense_names(self, expense_name):
+    def retrieve_similar_expense_names(self, expense_name, limit=None):
         """Returns a list of expense name and category pairs
-        for the provided expense name"""
-        list_of_rows = self.__execute_query("""SELECT {ex_table}.name,
-                        {cat_table}.name AS 'category_name' FROM {ex_table}
-                        LEFT JOIN {cat_table}
-                        ON {ex_table}.category_id = {cat_table}.category_id
-                        WHERE {ex_table}.name LIKE '%{name}%'
-                        ORDER BY {ex_table}.name ASC""".format(
-                            ex_table=self.__expenses_table_name,
-                            cat_table=self.__categories_table_name,
-                            name=expense_name
-                        ))
-
-        rows = [{ "name": n, "category": c } for n, c in list_of_rows]
-        unique_rows = list(rows)
-        sorted_by_frequency = sorted(unique_rows, key=unique_rows.count, reverse=True)
-
-        return self.__leave_unique_values(sorted_by_frequency)
+        for the provided expense name, the most frequent first"""
+        if self.__in_memory_indexes and self.__in_memory_indexes.is_built():
+            return self.__in_memory_indexes.get_expense_names_index().search(
+                expense_name, limit)
+
+        list_of_rows = self.__execute_query(
+            DbQueryType.SELECT_SIMILAR_EXPENSE_NAMES,
+            ("%{}%".format(escape_like_pattern(expense_name)), limit or NO_LIMIT))
+
+        return [{ "name": name, "category": category } for name, category in
+                (get_pair(n, c) for n, c in list_of_rows)]
+
+    def retrieve_expense_name_counts(self):
+        """Returns (expense name, category name, number of expenses) rows"""
+        return self.__execute_query(DbQueryType.SELECT_EXPENSE_NAME_COUNTS)
 
     def retrieve_categories(self):
         """Returns the list of all Categories"""
-        rows = self.__execute_query("""SELECT * FROM {table_name}
-                        ORDER BY name ASC""".format(
-                            table_name=self.__categories_table_name
-                        ))
+        return self.__get_cached("retrieve_categories", (), (CATEGORIES,),
+                                 lambda: self.__get_models_array(
+                                     self.__execute_query(
+                                         DbQueryType.SELECT_CATEGORIES),
+                                     "category"))
+
+    def get_query_cache_stats(self):
+        """Returns statistics of the query results cache (None if disabled)"""
+        if not self.__in_memory_indexes:
+            return None
 
-        return self.__get_models_array(rows, "category")
+        return self.__in_memory_indexes.get_query_cache().get_stats()
 
-    def __leave_unique_values(self, list_of_values):
-        if not list:
-            return []
+    def __get_cached(self, name, args, tables, load):
+        if not self.__in_memory_indexes:
+            return load()
 
-        unique_list = []
+        return self.__in_memory_indexes.get_query_cache().get(
+            name, args, tables, load)
 
-        for value in list_of_values:
-            if not value in unique_list:
-                unique_list.append(value)
+    def __iterate_cached(self, name, args, tables, iterate):
+        if not self.__in_memory_indexes:
+            return iterate()
 
-        return unique_list
+        return self.__in_memory_indexes.get_query_cache().iterate(
+            name, args, tables, iterate)
 
-    def __execute_query(self, query):
-        return self.__connection_provider.execute_query(query)
+    def __execute_query(self, query_type, params=()):
+        return self.__connection_provider.execute_query(
+            self.__query_provider.create_query(query_type), params)
 
     def __get_models_array(self, rows, model_type, additional_rows=[]):
         models = []
@@ -190,7 +352,7 @@ class MariaDbExpensesRetriever(ExpensesRetrieverBase):
         )
 
     def __convert_table_row_to_category(self, table_row, additional_rows=[]):
-        return Category(table_row[0], html.unescape(table_row[1]))
+        return Category.get_shared(table_row[0], html.unescape(table_row[1]))
 
     def __validate_connection_provider(self, connection_provider):
         if not connection_provider:
@@ -202,6 +364,11 @@ class MariaDbExpensesRetriever(ExpensesRetrieverBase):
             raise ValueError("InvalidArgument: connection_provider must have "
                              "execute_query method")
 
+        if (not hasattr(connection_provider, "iterate_query") or
+            not callable(connection_provider.iterate_query)):
+            raise ValueError("InvalidArgument: connection_provider must have "
+                             "iterate_query method")
+
     def __validate_database_tables(self, database_tables):
         validator_map = {
             "expenses": validate_non_empty_string,
@@ -1,14 +1,114 @@
 from storage.DbQueryProvider import DbQueryProvider, DbQueryType
 
-class MariaDbQueryProvider(DbQueryProvider):
-  """Creates Sqlite database queries"""
+EXPENSE_COLUMNS = "{expenses}.expense_id, {expenses}.name, {expenses}.cost, " \
+  "{expenses}.purchase_date, {categories}.category_id, " \
+  "{categories}.name AS 'category_name'"
+
+IN_PERIOD = "{expenses}.purchase_date BETWEEN ? AND ?"
+NAME_LIKE = "{expenses}.name COLLATE UTF8_GENERAL_CI LIKE ?"
+AFTER_CURSOR = " AND ({expenses}.purchase_date < ? OR " \
+  "({expenses}.purchase_date = ? AND {expenses}.expense_id < ?))"
 
-  def create_query(self, type: DbQueryType) -> str:
-    if type == DbQueryType.SAVE_EXPENSE:
-      return self.__create_save_expense_query()
+def create_expenses_query(condition, limited=False):
+  """
+  Creates a query of Expenses matching the condition (the latest first).
+  A limited query takes the limit as the last param.
+  """
+  return "SELECT " + EXPENSE_COLUMNS + " FROM {expenses} " \
+    "LEFT JOIN {categories} ON {expenses}.category_id = {categories}.category_id " \
+    "WHERE " + condition + " " \
+    "ORDER BY {expenses}.purchase_date DESC, {expenses}.expense_id DESC" + \
+    (" LIMIT ?" if limited else "")
+
+class MariaDbQueryProvider(DbQueryProvider):
+  """Creates MariaDb database queries"""
 
-    return super().create_query()
+  QUERY_TEMPLATES = {
+    DbQueryType.SAVE_EXPENSE:
+      "INSERT INTO {expenses} (name, cost, purchase_date, category_id, day, "
+      "month, year) VALUES (?, ?, ?, ?, ?, ?, ?)",
+    DbQueryType.SELECT_LAST_INSERT_ID: "SELECT LAST_INSERT_ID()",
+    DbQueryType.SELECT_AUTO_INCREMENT_SETTINGS:
+      "SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment",
+    DbQueryType.SELECT_EXPENSE:
+      "SELECT " + EXPENSE_COLUMNS + " FROM {expenses} "
+      "LEFT JOIN {categories} ON {expenses}.category_id = {categories}.category_id "
+      "WHERE {expenses}.expense_id = ?",
+    DbQueryType.UPDATE_EXPENSE:
+      "UPDATE {expenses} SET name = COALESCE(?, name), "
+      "cost = COALESCE(?, cost), purchase_date = COALESCE(?, purchase_date), "
+      "category_id = COALESCE(?, category_id), day = COALESCE(?, day), "
+      "month = COALESCE(?, month), year = COALESCE(?, year) "
+      "WHERE expense_id = ?",
+    DbQueryType.DELETE_EXPENSE: "DELETE FROM {expenses} WHERE expense_id = ?",
+    DbQueryType.SELECT_EXPENSES_IN_PERIOD: create_expenses_query(IN_PERIOD),
+    DbQueryType.SELECT_EXPENSES_PAGE_IN_PERIOD:
+      create_expenses_query(IN_PERIOD, True),
+    DbQueryType.SELECT_EXPENSES_PAGE_IN_PERIOD_AFTER:
+      create_expenses_query(IN_PERIOD + AFTER_CURSOR, True),
+    DbQueryType.FILTER_EXPENSES:
+      "SELECT " + EXPENSE_COLUMNS + " FROM {expenses} "
+      "LEFT JOIN {categories} ON {expenses}.category_id = {categories}.category_id "
+      "WHERE " + NAME_LIKE + " "
+      "ORDER BY {expenses}.purchase_date DESC LIMIT ? OFFSET ?",
+    DbQueryType.FILTER_EXPENSES_PAGE: create_expenses_query(NAME_LIKE, True),
+    DbQueryType.FILTER_EXPENSES_PAGE_AFTER:
+      create_expenses_query(NAME_LIKE + AFTER_CURSOR, True),
+    DbQueryType.SELECT_COMMON_EXPENSE_COST:
+      "SELECT MIN(name), cost, COUNT(*) AS 'counter' FROM {expenses} "
+      "WHERE LOWER(name) = LOWER(?) GROUP BY cost "
+      "ORDER BY COUNT(*) DESC, cost ASC LIMIT 1",
+    DbQueryType.SELECT_SIMILAR_EXPENSE_NAMES:
+      "SELECT {expenses}.name, {categories}.name AS 'category_name' "
+      "FROM {expenses} LEFT JOIN {categories} "
+      "ON {expenses}.category_id = {categories}.category_id "
+      "WHERE {expenses}.name LIKE ? GROUP BY {expenses}.name, {categories}.name "
+      "ORDER BY COUNT(*) DESC, {expenses}.name ASC LIMIT ?",
+    DbQueryType.SELECT_EXPENSE_NAME_COUNTS:
+      "SELECT {expenses}.name, {categories}.name AS 'category_name', COUNT(*) "
+      "FROM {expenses} LEFT JOIN {categories} "
+      "ON {expenses}.category_id = {categories}.category_id "
+      "GROUP BY {expenses}.name, {categories}.name",
+    DbQueryType.SELECT_EXPENSE_COSTS:
+      "SELECT name, purchase_date, cost, COUNT(*) FROM {expenses} "
+      "GROUP BY name, purchase_date, cost",
+    DbQueryType.SELECT_EXPENSE_COSTS_OF_NAME:
+      "SELECT {expenses}.name, purchase_date, cost, COUNT(*) FROM {expenses} "
+      "WHERE " + NAME_LIKE + " GROUP BY {expenses}.name, purchase_date, cost",
+    DbQueryType.SELECT_EXPENSE_COLUMNS_IN_PERIOD:
+      "SELECT purchase_date, cost, category_id FROM {expenses} "
+      "WHERE " + IN_PERIOD,
+    DbQueryType.SELECT_DAILY_TOTALS:
+      "SELECT purchase_date DIV 86400 AS day, category_id, SUM(cost) FROM {expenses} "
+      "GROUP BY day, category_id",
+    DbQueryType.SELECT_TOTAL_IN_PERIOD:
+      "SELECT COALESCE(SUM(cost), 0) FROM {expenses} "
+      "WHERE " + IN_PERIOD + " AND (? IS NULL OR category_id = ?)",
+    DbQueryType.SELECT_SUMMARY:
+      "SELECT {monthly_totals}.month, {monthly_totals}.category_id, "
+      "{categories}.name AS 'category_name', {monthly_totals}.total, "
+      "{monthly_totals}.count FROM {monthly_totals} LEFT JOIN {categories} "
+      "ON {monthly_totals}.category_id = {categories}.category_id "
+      "WHERE {monthly_totals}.month BETWEEN ? AND ? "
+      "ORDER BY {monthly_totals}.month DESC, {categories}.name ASC",
+    DbQueryType.SELECT_MONTH_COUNTS:
+      "SELECT month, SUM(count) FROM {monthly_totals} GROUP BY month",
+    DbQueryType.UPSERT_MONTHLY_TOTALS:
+      "INSERT INTO {monthly_totals} (month, category_id, total, count) "
+      "VALUES (?, ?, ?, ?) ON DUPLICATE KEY UPDATE "
+      "total = total + VALUES(total), count = count + VALUES(count)",
+    DbQueryType.DELETE_EMPTY_MONTHLY_TOTALS:
+      "DELETE FROM {monthly_totals} WHERE month = ? AND category_id = ? "
+      "AND count <= 0",
+    DbQueryType.SAVE_CATEGORY: "INSERT INTO {categories} (name) VALUES (?)",
+    DbQueryType.SAVE_TAG: "INSERT IGNORE INTO {tags} (tag_id, name) VALUES (?, ?)",
+    DbQueryType.SELECT_TAG_IDS_BY_NAMES:
+      "SELECT name, tag_id FROM {tags} WHERE JSON_CONTAINS(?, JSON_QUOTE(name))",
+    DbQueryType.SAVE_EXPENSE_TAG_LINK:
+      "INSERT IGNORE INTO {expense_tags} (expense_id, tag_id) VALUES (?, ?)",
+    DbQueryType.SELECT_CATEGORIES:
+      "SELECT category_id, name FROM {categories} ORDER BY name ASC"
+  }
 
-  def __create_save_expense_query(self):
-    """Creates a query that saves an Expense in the database"""
-    return "INSERT INTO expenses (name, cost, purchase_date, category_id, day, month, year) VALUES (?, ?, ?, ?, ?, ?, ?)"
+  def get_query_templates(self):
+    return self.QUERY_TEMPLATES
@@ -0,0 +1,86 @@
+"""The module contains in-memory index of months with Expenses"""
+import threading
+
+from date_utils import get_current_month, get_months_between
+
+class MonthsIndex:
+    """
+    Keeps the number of Expenses per month and the list of months from
+    the earliest one up to the current month. The list is recomputed only
+    when the earliest month changes or the current month rolls over.
+    """
+
+    def __init__(self, current_month_provider=None):
+        self.__current_month_provider = current_month_provider
+        self.__counts = {}
+        self.__earliest_month = None
+        self.__months = None
+        self.__months_until = None
+        self.__lock = threading.RLock()
+
+    def build(self, rows):
+        """Replaces index content with (month, count) rows"""
+        with self.__lock:
+            self.__counts = {}
+
+            for month, count in rows:
+                if count > 0:
+                    self.__counts[month] = self.__counts.get(month, 0) + count
+
+            self.__set_earliest_month(min(self.__counts, default=None))
+
+    def add(self, month, count=1):
+        """Increases the number of Expenses in the month"""
+        with self.__lock:
+            self.__counts[month] = self.__counts.get(month, 0) + count
+
+            if self.__earliest_month is None or month < self.__earliest_month:
+                self.__set_earliest_month(month)
+
+    def remove(self, month, count=1):
+        """Decreases the number of Expenses in the month"""
+        with self.__lock:
+            if month not in self.__counts:
+                return None
+
+            self.__counts[month] -= count
+
+            if self.__counts[month] > 0:
+                return None
+
+            del self.__counts[month]
+
+            if month == self.__earliest_month:
+                self.__set_earliest_month(min(self.__counts, default=None))
+
+    def get_count(self, month):
+        """Returns the number of Expenses in the month"""
+        with self.__lock:
+            return self.__counts.get(month, 0)
+
+    def get_months(self):
+        """
+        Returns the list of months (YYYY-MM) from the earliest one with
+        Expenses up to the current month
+        """
+        current_month = (self.__current_month_provider or get_current_month)()
+
+        with self.__lock:
+            if self.__months is None or self.__months_until != current_month:
+                first_month = min(self.__earliest_month or current_month,
+                                  current_month)
+                self.__months = get_months_between(first_month, current_month)
+                self.__months_until = current_month
+
+            return list(self.__months)
+
+    def get_month_counts(self):
+        """Returns a list of {month, count} dictionaries for get_months()"""
+        with self.__lock:
+            return [{"month": month, "count": self.__counts.get(month, 0)}
+                    for month in self.get_months()]
+
+    def __set_earliest_month(self, month):
+        if month != self.__earliest_month:
+            self.__earliest_month = month
+            self.__months = None
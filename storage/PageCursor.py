@@ -0,0 +1,30 @@
+"""Encodes and decodes opaque keyset pagination cursors"""
+import base64
+import binascii
+import json
+
+def encode_page_cursor(purchase_date, expense_id):
+    """Returns a token pointing after the Expense with given sort keys"""
+    payload = json.dumps([purchase_date, expense_id], separators=(",", ":"))
+
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_page_cursor(cursor):
+    """Returns (purchase_date, expense_id) encoded in the token"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor.encode("ascii"))
+        purchase_date, expense_id = json.loads(payload.decode("utf-8"))
+    except (AttributeError, UnicodeError, binascii.Error, TypeError,
+            ValueError):
+        raise ValueError("InvalidArgument: cursor is malformed")
+
+    if not isinstance(purchase_date, int) or not isinstance(expense_id, int):
+        raise ValueError("InvalidArgument: cursor is malformed")
+
+    return purchase_date, expense_id
+
+def validate_page_size(page_size):
+    if (not isinstance(page_size, int) or isinstance(page_size, bool) or
+        page_size < 1):
+        raise ValueError("InvalidArgument: page_size must be a positive "
+                         "integer")
@@ -0,0 +1,128 @@
+"""The module contains LRU cache of retrieved query results"""
+import threading
+from collections import OrderedDict
+
+from const import QUERY_CACHE_MAX_ITEMS
+from storage.DataVersions import DataVersions
+
+def get_result_size(result):
+    """Returns the number of items (e.g. models) the result keeps in memory"""
+    return len(result) if isinstance(result, (list, tuple)) else 1
+
+class QueryCache:
+    """
+    Keeps the least recently used results of retriever methods, each one
+    under the method name, its arguments and versions of the tables it was
+    read from. Results are invalidated when the tables are written to and
+    the cache is bounded by the total number of items the results hold.
+    """
+
+    def __init__(self, data_versions: DataVersions,
+                 max_items=QUERY_CACHE_MAX_ITEMS):
+        self.__data_versions = data_versions
+        self.__max_items = max_items
+        self.__entries = OrderedDict()
+        self.__items_count = 0
+        self.__lock = threading.Lock()
+        self.__stats = {"hits": 0, "misses": 0, "evictions": 0,
+                        "invalidations": 0}
+
+    def get(self, name, args, tables, load):
+        """Returns the cached result or caches the one returned by load()"""
+        # Versions read before loading make results of concurrent writes stale
+        key = self.__create_key(name, args, tables)
+        result = self.__get_entry(key)
+
+        if result is not None:
+            return list(result) if isinstance(result, list) else result
+
+        result = load()
+        self.__put_entry(key, tables, result)
+
+        return list(result) if isinstance(result, list) else result
+
+    def iterate(self, name, args, tables, iterate):
+        """
+        Yields the cached items or the ones yielded by iterate(),
+        caching them once all of them were read
+        """
+        key = self.__create_key(name, args, tables)
+        result = self.__get_entry(key)
+
+        if result is not None:
+            yield from result
+
+            return None
+
+        items = []
+
+        for item in iterate():
+            if items is not None:
+                items.append(item)
+
+                if len(items) > self.__max_items:
+                    items = None
+
+            yield item
+
+        if items is not None:
+            self.__put_entry(key, tables, items)
+
+    def invalidate(self, *tables):
+        """Removes results read from any of the tables"""
+        tables = set(tables)
+
+        with self.__lock:
+            for key in [key for key, (entry_tables, _) in self.__entries.items()
+                        if tables.intersection(entry_tables)]:
+                self.__remove_entry(key)
+                self.__stats["invalidations"] += 1
+
+    def clear(self):
+        """Removes all the results"""
+        with self.__lock:
+            self.__entries.clear()
+            self.__items_count = 0
+
+    def get_stats(self):
+        """Returns hits, misses, evictions and invalidations counters"""
+        with self.__lock:
+            return dict(self.__stats, entries=len(self.__entries),
+                        items=self.__items_count, max_items=self.__max_items)
+
+    def __create_key(self, name, args, tables):
+        return (name, args, self.__data_versions.get_etag(*tables))
+
+    def __get_entry(self, key):
+        with self.__lock:
+            if key not in self.__entries:
+                self.__stats["misses"] += 1
+
+                return None
+
+            self.__entries.move_to_end(key)
+            self.__stats["hits"] += 1
+
+            return self.__entries[key][1]
+
+    def __put_entry(self, key, tables, result):
+        if result is None or get_result_size(result) > self.__max_items:
+            return None
+
+        if isinstance(result, list):
+            result = list(result)
+
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove_entry(key)
+
+            self.__entries[key] = (tuple(tables), result)
+            self.__items_count += get_result_size(result)
+
+            while self.__items_count > self.__max_items:
+                self.__remove_entry(next(iter(self.__entries)))
+                self.__stats["evictions"] += 1
+
+    def __remove_entry(self, key):
+        _, result = self.__entries.pop(key)
+        self.__items_count -= get_result_size(result)
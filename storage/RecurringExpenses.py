@@ -0,0 +1,89 @@
+"""
+Detects recurring Expenses (bought in the same months of most years)
+with NumPy group-bys over columns of the expense history
+"""
+import numpy as np
+
+# A (name, category) pair recurs in a month of the year if it was bought
+# in that month in at least MIN_YEARS different years...
+MIN_YEARS = 2
+# ...and in at least this part of the years since it was first bought...
+MIN_YEARS_RATIO = 0.5
+# ...as long as it was bought at all during the last years
+MAX_YEARS_SINCE_LAST_PURCHASE = 1
+
+# Years of get_years_and_months are counted since this one
+EPOCH_YEAR = 1970
+
+def convert_rows_to_columns(rows):
+    """
+    Returns names, category ids, costs and purchase dates arrays
+    of (name, category id, cost, purchase date) rows
+    """
+    if not rows:
+        return (np.array([], dtype=str), np.array([], dtype=np.int64),
+                np.array([], dtype=object), np.array([], dtype=np.int64))
+
+    names, category_ids, costs, purchase_dates = zip(*rows)
+
+    return (np.array(names, dtype=str), np.array(category_ids, dtype=np.int64),
+            np.array(costs, dtype=object),
+            np.array(purchase_dates, dtype=np.int64))
+
+def get_years_and_months(purchase_dates):
+    """Returns years since epoch and months (0-11) of UTC timestamps"""
+    months_since_epoch = purchase_dates.astype("datetime64[s]") \
+        .astype("datetime64[M]").astype(np.int64)
+
+    return months_since_epoch // 12, months_since_epoch % 12
+
+def detect_recurring_expenses(names, category_ids, costs, purchase_dates,
+                              reference_year):
+    """
+    Returns (name, category id, cost, months) tuples of (name, category)
+    pairs which recur in some months of the year, the months as sorted
+    numbers (1-12) and the cost of their latest purchase. Years are counted
+    and recency is checked up to the reference_year (usually the current one).
+    """
+    if not len(names):
+        return []
+
+    name_values, name_codes = np.unique(names, return_inverse=True)
+    category_values, category_codes = np.unique(category_ids, return_inverse=True)
+    pair_values, pairs = np.unique(
+        name_codes * len(category_values) + category_codes, return_inverse=True)
+    years, months = get_years_and_months(purchase_dates)
+    latest_year = reference_year - EPOCH_YEAR
+
+    # Purchases sorted by pair and date give the first and the last one of pairs
+    order = np.lexsort((purchase_dates, pairs))
+    sorted_pairs = pairs[order]
+    pair_starts = np.r_[True, sorted_pairs[1:] != sorted_pairs[:-1]]
+    pair_ends = np.r_[sorted_pairs[1:] != sorted_pairs[:-1], True]
+    first_years = years[order[pair_starts]]
+    latest_purchases = order[pair_ends]
+
+    # Distinct (pair, month, year) purchases counted per (pair, month)
+    year_offsets = years - years.min()
+    years_count = year_offsets.max() + 1
+    pair_months, month_years = np.unique(
+        np.unique((pairs * 12 + months) * years_count + year_offsets)
+        // years_count, return_counts=True)
+    month_pairs = pair_months // 12
+    possible_years = latest_year - first_years[month_pairs] + 1
+
+    recurring = (month_years >= MIN_YEARS) & \
+        (month_years >= MIN_YEARS_RATIO * possible_years) & \
+        (years[latest_purchases[month_pairs]] >=
+         latest_year - MAX_YEARS_SINCE_LAST_PURCHASE)
+
+    recurring_pairs = month_pairs[recurring]
+    recurring_months = pair_months[recurring] % 12 + 1
+    suggested_pairs, first_months = np.unique(recurring_pairs, return_index=True)
+
+    return [(str(name_values[pair_values[pair] // len(category_values)]),
+             int(category_values[pair_values[pair] % len(category_values)]),
+             costs[latest_purchases[pair]],
+             [int(month) for month in pair_months_list])
+            for pair, pair_months_list in zip(
+                suggested_pairs, np.split(recurring_months, first_months[1:]))]
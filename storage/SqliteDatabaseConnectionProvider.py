@@ -2,42 +2,105 @@
 import os
 import sqlite3
 import re
+from contextlib import contextmanager
 
+from storage.ConnectionPool import ConnectionPool
+from storage.DatabaseTransaction import DatabaseTransaction
+from storage.ExpenseNamesIndex import normalize_name
 from validation_utils import validate_dict, validate_non_empty_string
 
+# The default size of sqlite3 prepared statement cache
+DEFAULT_CACHED_STATEMENTS = 128
+
+# Statements issued by the provider itself on every connection
+# (health check, BEGIN IMMEDIATE, PRAGMAs) next to the query catalog
+PROVIDER_STATEMENTS_COUNT = 16
+
 def create_columns_schema(columns):
     return ", ".join("{} {}".format(name, schema) for name, schema in columns)
 
-def regexp(pattern, string, search=re.search):
-    return 1 if search(pattern, string) else 0
+def get_used_indexes(query_plan):
+    """Returns names of indexes mentioned in EXPLAIN QUERY PLAN details"""
+    return [match.group(1) for detail in query_plan
+            for match in [re.search(r"USING (?:COVERING )?INDEX (\S+)", detail)]
+            if match]
+
+def get_search_table_name(expenses_table_name):
+    """Returns the name of the full-text index table of expenses"""
+    return "{}_search".format(expenses_table_name)
+
+def get_monthly_totals_table_name(database_tables):
+    """Returns the name of the table with expense totals per month and category"""
+    return database_tables.get("monthly_totals", "monthly_totals")
+
+def get_suggestion_months_table_name(database_tables):
+    """Returns the name of the table with months (1-12) of every suggestion"""
+    return database_tables.get("suggestion_months",
+                               "{}_months".format(database_tables["suggestions"]))
+
+def get_statement_cache_size(queries_count):
+    """
+    Returns the size of the prepared statement cache fitting all catalog
+    queries and the few statements the provider issues itself
+    """
+    return queries_count + PROVIDER_STATEMENTS_COUNT
+
+def check_connection(connection):
+    connection.execute("SELECT 1").fetchall()
 
 class SqliteDatabaseConnectionProvider:
-    __connection = None
+    __pool = None
+    __recorded_query_plans = None
+    __full_text_search_enabled = None
 
     """Exposes methods for connecting and disconnecting with database"""
-    def __init__(self, database_path, database_tables):
+    def __init__(self, database_path, database_tables, pool_size=5,
+                 max_idle_time=None, cached_statements=DEFAULT_CACHED_STATEMENTS):
         validate_non_empty_string(database_path, "database_path")
         self.__validate_database_tables(database_tables)
 
         self.__database_path = database_path
         self.__database_tables = database_tables
+        self.__cached_statements = cached_statements
 
-        self.__connection = self.__get_connection()
+        self.__ensure_database_directory_exists()
+        self.__pool = self.__create_pool(pool_size, max_idle_time)
 
     def __del__(self):
-        if self.__connection:
-            self.__connection.close()
+        if self.__pool:
+            self.__pool.close()
+
+    def __create_pool(self, pool_size, max_idle_time):
+        if self.__is_in_memory():
+            # Every connection to :memory: opens a separate database,
+            # so the only connection must be kept for the provider lifetime
+            return ConnectionPool(self.__get_connection, 1, None,
+                                  check_connection)
+
+        return ConnectionPool(self.__get_connection, pool_size, max_idle_time,
+                              check_connection)
 
     def __get_connection(self):
         """Connects to Sqlite database and returns the connection"""
-        self.__ensure_database_directory_exists()
+        # Pooled connections are handed over between waitress worker threads,
+        # the pool guarantees only one thread uses a connection at a time
+        connection = sqlite3.connect(self.__database_path,
+                                     check_same_thread=False,
+                                     cached_statements=self.__cached_statements)
 
-        connection = sqlite3.connect(self.__database_path)
+        if not self.__is_in_memory():
+            connection.execute("PRAGMA journal_mode=WAL")
 
-        connection.create_function('regexp', 2, regexp)
+        # lower() and LIKE fold ASCII letters only, queries compare names
+        # with casefold() like the in-memory indexes do
+        connection.create_function("casefold", 1, normalize_name)
 
         return connection
 
+    def close(self):
+        """Closes all pooled connections"""
+        self.__pool.close()
+
     def ensure_necessary_tables_exist(self):
         """
         Checks if necessary tables exist in the database,
@@ -49,19 +112,175 @@ class SqliteDatabaseConnectionProvider:
         self.__ensure_expense_tags_table_exists()
         self.__ensure_shops_table_exists()
         self.__ensure_expenses_table_exists()
+        self.__ensure_expenses_search_table_exists()
+        self.ensure_necessary_indexes_exist()
+        self.__ensure_monthly_totals_table_exists()
+        self.__ensure_suggestions_tables_exist()
+
+    def is_full_text_search_enabled(self):
+        """Returns True if expenses are indexed in a FTS5 table"""
+        if self.__full_text_search_enabled is None:
+            rows = self.execute_query("SELECT name FROM sqlite_master " \
+                "WHERE type = 'table' AND name = ?", (self.__get_search_table_name(),))
+
+            self.__full_text_search_enabled = len(rows) > 0
+
+        return self.__full_text_search_enabled
+
+    def ensure_necessary_indexes_exist(self):
+        """
+        Creates indexes declared in get_necessary_indexes
+        and recreates the ones whose definition has changed.
+        """
+        existing_tables = [row[0] for row in self.execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+        for name, table_name, columns, unique in self.get_necessary_indexes():
+            if table_name in existing_tables:
+                self.__ensure_index_exists(name, table_name, columns, unique)
+
+    def get_necessary_indexes(self):
+        """Returns (name, table, columns, unique) tuples of required indexes"""
+        expenses = self.__database_tables["expenses"]
+        expense_tags = self.__database_tables["expense_tags"]
+        tags = self.__database_tables["tags"]
+        suggestions = self.__database_tables.get("suggestions")
+        monthly_totals = get_monthly_totals_table_name(self.__database_tables)
+
+        indexes = [
+            (expenses, ["purchase_date"], False),
+            (expenses, ["name", "purchase_date"], False),
+            (expenses, ["category_id"], False),
+            (expense_tags, ["expense_id", "tag_id"], True),
+            (expense_tags, ["tag_id"], False),
+            (tags, ["name"], True),
+            (monthly_totals, ["month", "category_id"], True)
+        ]
+
+        if suggestions:
+            suggestion_months = get_suggestion_months_table_name(self.__database_tables)
+
+            indexes.append((suggestions, ["name"], False))
+            indexes.append((suggestion_months, ["month", "suggestion_id"], True))
+            indexes.append((suggestion_months, ["suggestion_id"], False))
+
+        return [("{}_{}_idx".format(table, "_".join(columns)), table, columns, unique)
+                for table, columns, unique in indexes]
+
+    def rebuild_monthly_totals(self):
+        """Recalculates expense totals per month and category from scratch"""
+        with self.transaction() as transaction:
+            transaction.execute_query("DELETE FROM {}".format(
+                get_monthly_totals_table_name(self.__database_tables)))
+            transaction.execute_query("INSERT INTO {totals} " \
+                "(month, category_id, total, count) " \
+                "SELECT strftime('%Y-%m', purchase_date, 'unixepoch'), " \
+                "category_id, SUM(cost), COUNT(*) FROM {expenses} " \
+                "GROUP BY 1, 2".format(
+                    totals=get_monthly_totals_table_name(self.__database_tables),
+                    expenses=self.__database_tables["expenses"]))
+
+    def rebuild_suggestion_months(self):
+        """Recreates months of all suggestions from their months lists"""
+        suggestions = self.__database_tables["suggestions"]
+
+        with self.transaction() as transaction:
+            transaction.execute_query("DELETE FROM {}".format(
+                get_suggestion_months_table_name(self.__database_tables)))
+            transaction.execute_query(self.__create_suggestion_months_insert(
+                "{}.rowid".format(suggestions), "{}.months".format(suggestions),
+                suggestions))
+
+    def explain_query_plan(self, query, params = ()):
+        """Returns details of the query plan Sqlite uses for the query"""
+        rows = self.execute_query("EXPLAIN QUERY PLAN {}".format(query), params)
+
+        return [row[-1] for row in rows]
+
+    @contextmanager
+    def recording_query_plans(self):
+        """
+        Collects (query, query plan details) of every SELECT query
+        executed inside the with block
+        """
+        self.__recorded_query_plans = []
+
+        try:
+            yield self.__recorded_query_plans
+        finally:
+            self.__recorded_query_plans = None
 
     def execute_query(self, query, params = ()):
         """Makes a request to the database"""
-        cursor = self.__connection.cursor()
+        self.__record_query_plan(query, params)
+
+        with self.__pool.connection() as connection:
+            try:
+                cursor = connection.cursor()
 
-        cursor.execute(query, params)
-        self.__connection.commit()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                connection.commit()
+            except Exception:
+                connection.rollback()
 
-        return cursor.fetchall()
+                raise
+
+        return rows
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yields a DatabaseTransaction whose queries are committed together
+        at the end of the with block or rolled back on error
+        """
+        with self.__pool.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+
+            try:
+                yield DatabaseTransaction(connection)
+
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+
+                raise
+
+    def iterate_query(self, query, params = (), batch_size = 500):
+        """
+        Makes a read-only request to the database and yields the rows,
+        fetching them in batches. The connection stays checked out
+        until the generator is exhausted or closed.
+        """
+        self.__record_query_plan(query, params)
+
+        with self.__pool.connection() as connection:
+            cursor = connection.cursor()
+
+            try:
+                cursor.execute(query, params)
+
+                rows = cursor.fetchmany(batch_size)
+
+                while rows:
+                    yield from rows
+
+                    rows = cursor.fetchmany(batch_size)
+            finally:
+                cursor.close()
+
+    def __record_query_plan(self, query, params):
+        if self.__recorded_query_plans is not None and \
+           query.lstrip().upper().startswith(("SELECT", "WITH")):
+            self.__recorded_query_plans.append(
+                (query, self.explain_query_plan(query, params)))
+
+    def __is_in_memory(self):
+        return ":memory" in self.__database_path
 
     def __ensure_database_directory_exists(self):
         """Based on database_path creates directory if it doesn't exist"""
-        if ":memory" in self.__database_path:
+        if self.__is_in_memory():
             return True
 
         directory = os.path.dirname(self.__database_path)
@@ -81,6 +300,165 @@ class SqliteDatabaseConnectionProvider:
 
         self.__ensure_table_exists(self.__database_tables["expenses"], columns)
 
+    def __ensure_expenses_search_table_exists(self):
+        """
+        Creates FTS5 index of expense names (case and diacritics insensitive)
+        with triggers which keep it in sync with the expenses table
+        """
+        expenses = self.__database_tables["expenses"]
+        search = self.__get_search_table_name()
+        existed = self.is_full_text_search_enabled()
+
+        try:
+            self.execute_query("CREATE VIRTUAL TABLE IF NOT EXISTS {search} " \
+                "USING fts5(name, content='{expenses}', " \
+                "content_rowid='expense_id', " \
+                "tokenize='unicode61 remove_diacritics 2')".format(
+                    search=search, expenses=expenses))
+        except sqlite3.OperationalError as error:
+            print("Full-text search is not available: {}".format(error))
+
+            self.__full_text_search_enabled = False
+
+            return None
+
+        triggers = [
+            ("ai", "AFTER INSERT",
+             "INSERT INTO {search} (rowid, name) " \
+             "VALUES (new.expense_id, new.name);"),
+            ("ad", "AFTER DELETE",
+             "INSERT INTO {search} ({search}, rowid, name) " \
+             "VALUES ('delete', old.expense_id, old.name);"),
+            ("au", "AFTER UPDATE OF expense_id, name",
+             "INSERT INTO {search} ({search}, rowid, name) " \
+             "VALUES ('delete', old.expense_id, old.name); " \
+             "INSERT INTO {search} (rowid, name) " \
+             "VALUES (new.expense_id, new.name);")
+        ]
+
+        for suffix, event, statements in triggers:
+            self.execute_query("CREATE TRIGGER IF NOT EXISTS {search}_{suffix} " \
+                "{event} ON {expenses} BEGIN {statements} END".format(
+                    search=search, suffix=suffix, event=event,
+                    expenses=expenses,
+                    statements=statements.format(search=search)))
+
+        if not existed:
+            self.execute_query("INSERT INTO {search} ({search}) " \
+                "VALUES ('rebuild')".format(search=search))
+
+        self.__full_text_search_enabled = True
+
+    def __ensure_monthly_totals_table_exists(self):
+        """
+        Creates the table with expense totals per month and category
+        and triggers which update it in the same transaction as expenses
+        """
+        expenses = self.__database_tables["expenses"]
+        totals = get_monthly_totals_table_name(self.__database_tables)
+        existed = len(self.execute_query("PRAGMA table_info({})".format(totals))) > 0
+        columns = [
+            ("month", "TEXT NOT NULL"),
+            ("category_id", "INTEGER NOT NULL"),
+            ("total", "INTEGER NOT NULL DEFAULT 0"),
+            ("count", "INTEGER NOT NULL DEFAULT 0")
+        ]
+
+        self.__ensure_table_exists(totals, columns)
+        self.ensure_necessary_indexes_exist()
+
+        add_new = "INSERT INTO {totals} (month, category_id, total, count) " \
+            "VALUES (strftime('%Y-%m', new.purchase_date, 'unixepoch'), " \
+            "new.category_id, new.cost, 1) " \
+            "ON CONFLICT (month, category_id) DO UPDATE SET " \
+            "total = total + excluded.total, count = count + 1;"
+        old_key = "month = strftime('%Y-%m', old.purchase_date, 'unixepoch') " \
+            "AND category_id = old.category_id"
+        subtract_old = "UPDATE {totals} SET total = total - old.cost, " \
+            "count = count - 1 WHERE " + old_key + "; " \
+            "DELETE FROM {totals} WHERE " + old_key + " AND count <= 0;"
+        triggers = [
+            ("ai", "AFTER INSERT", add_new),
+            ("ad", "AFTER DELETE", subtract_old),
+            ("au", "AFTER UPDATE OF cost, purchase_date, category_id",
+             subtract_old + " " + add_new)
+        ]
+
+        for suffix, event, statements in triggers:
+            self.execute_query("CREATE TRIGGER IF NOT EXISTS {totals}_{suffix} " \
+                "{event} ON {expenses} BEGIN {statements} END".format(
+                    totals=totals, suffix=suffix, event=event,
+                    expenses=expenses,
+                    statements=statements.format(totals=totals)))
+
+        if not existed:
+            self.rebuild_monthly_totals()
+
+    def __ensure_suggestions_tables_exist(self):
+        """
+        Creates the table of suggestions with months (1-12) as a comma
+        separated list and the table with one row per suggestion and month,
+        kept in sync by triggers, which lets suggestions be looked up by month
+        """
+        suggestions = self.__database_tables.get("suggestions")
+
+        if not suggestions:
+            return None
+
+        suggestion_months = get_suggestion_months_table_name(self.__database_tables)
+        existed = len(self.execute_query(
+            "PRAGMA table_info({})".format(suggestion_months))) > 0
+
+        self.__ensure_table_exists(suggestions, [
+            ("name", "TEXT NOT NULL"),
+            ("category_id", "INTEGER"),
+            ("cost", "INTEGER NOT NULL DEFAULT 0"),
+            ("months", "TEXT")
+        ])
+        self.__ensure_table_exists(suggestion_months, [
+            ("month", "INTEGER NOT NULL"),
+            ("suggestion_id", "INTEGER NOT NULL")
+        ])
+        self.ensure_necessary_indexes_exist()
+
+        add_new = self.__create_suggestion_months_insert("new.rowid", "new.months")
+        remove_old = "DELETE FROM {} WHERE suggestion_id = old.rowid;".format(
+            suggestion_months)
+        triggers = [
+            ("ai", "AFTER INSERT", add_new),
+            ("ad", "AFTER DELETE", remove_old),
+            ("au", "AFTER UPDATE OF months", remove_old + " " + add_new)
+        ]
+
+        for suffix, event, statements in triggers:
+            self.execute_query("CREATE TRIGGER IF NOT EXISTS {months}_{suffix} " \
+                "{event} ON {suggestions} BEGIN {statements} END".format(
+                    months=suggestion_months, suffix=suffix, event=event,
+                    suggestions=suggestions, statements=statements))
+
+        if not existed:
+            self.rebuild_suggestion_months()
+
+    def __create_suggestion_months_insert(self, suggestion_id, months, source=None):
+        """
+        Returns a statement inserting (month, suggestion id) rows of the
+        comma separated months, split with json_each (triggers can't use CTEs)
+        """
+        months_array = "'[\"' || replace(replace({months}, ' ', ''), ',', " \
+            "'\",\"') || '\"]'".format(months=months)
+
+        return "INSERT OR IGNORE INTO {table} (month, suggestion_id) " \
+            "SELECT CAST(months.value AS INTEGER), {suggestion_id} " \
+            "FROM {source}json_each(CASE WHEN json_valid({array}) " \
+            "THEN {array} ELSE '[]' END) AS months " \
+            "WHERE CAST(months.value AS INTEGER) BETWEEN 1 AND 12;".format(
+                table=get_suggestion_months_table_name(self.__database_tables),
+                suggestion_id=suggestion_id, array=months_array,
+                source=source + ", " if source else "")
+
+    def __get_search_table_name(self):
+        return get_search_table_name(self.__database_tables["expenses"])
+
     def __ensure_categories_table_exists(self):
         # CREATE TABLE categories (category_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL)
         columns = [
@@ -118,6 +496,69 @@ class SqliteDatabaseConnectionProvider:
         self.execute_query(query)
         self.__ensure_table_columns_exist(table_name, columns)
 
+    def __ensure_index_exists(self, name, table_name, columns, unique):
+        indexed_columns = [row[2] for row in self.execute_query(
+            "PRAGMA index_info({})".format(name))]
+
+        if indexed_columns == columns:
+            return None
+
+        if indexed_columns:
+            self.execute_query("DROP INDEX {}".format(name))
+
+        if unique and table_name == self.__database_tables["tags"]:
+            self.__merge_duplicate_tags()
+        elif unique:
+            self.__remove_duplicates(table_name, columns)
+
+        # Rows which still violate a unique index make it fail
+        self.execute_query("CREATE {}INDEX IF NOT EXISTS {} ON {} ({})".format(
+            "UNIQUE " if unique else "", name, table_name, ", ".join(columns)))
+
+    def __merge_duplicate_tags(self):
+        """
+        Keeps the first tag of every name, moving relations of the other
+        tags with the same name to it
+        """
+        tags = self.__database_tables["tags"]
+        expense_tags = self.__database_tables["expense_tags"]
+        surviving_tag_ids = {}
+        merged_tag_ids = []
+
+        for tag_id, name in self.execute_query(
+                "SELECT tag_id, name FROM {} ORDER BY rowid".format(tags)):
+            if name in surviving_tag_ids:
+                merged_tag_ids.append((surviving_tag_ids[name], tag_id))
+            else:
+                surviving_tag_ids[name] = tag_id
+
+        if not merged_tag_ids:
+            return None
+
+        with self.transaction() as transaction:
+            # An Expense related to both tags keeps the existing relation
+            transaction.execute_many(
+                "UPDATE OR IGNORE {} SET tag_id = ? WHERE tag_id = ?".format(
+                    expense_tags), merged_tag_ids)
+            transaction.execute_many(
+                "DELETE FROM {} WHERE tag_id = ?".format(expense_tags),
+                [(tag_id,) for _, tag_id in merged_tag_ids])
+            transaction.execute_many(
+                "DELETE FROM {} WHERE tag_id = ?".format(tags),
+                [(tag_id,) for _, tag_id in merged_tag_ids])
+
+    def __remove_duplicates(self, table_name, columns):
+        """Removes rows with duplicated values of all columns of the table"""
+        column_names = [row[1] for row in self.execute_query(
+            "PRAGMA table_info({})".format(table_name))]
+
+        if sorted(column_names) != sorted(columns):
+            return None
+
+        self.execute_query("DELETE FROM {table} WHERE rowid NOT IN " \
+            "(SELECT MIN(rowid) FROM {table} GROUP BY {columns})".format(
+                table=table_name, columns=", ".join(columns)))
+
     def __ensure_table_columns_exist(self, table_name, columns):
         selection = "PRAGMA table_info({})".format(table_name)
 
@@ -125,6 +566,9 @@ class SqliteDatabaseConnectionProvider:
         column_names = [row[1] for row in rows]
 
         for column, schema in columns:
+            if column.startswith("FOREIGN KEY"):
+                continue
+
             if not column in column_names:
                 selection = "ALTER TABLE {} ADD COLUMN {} {}".format(
                              table_name, column, schema)
@@ -1,14 +1,206 @@
+import sqlite3
+
 from storage.DbQueryProvider import DbQueryProvider, DbQueryType
+from storage.SqliteDatabaseConnectionProvider import (
+  get_monthly_totals_table_name, get_search_table_name,
+  get_suggestion_months_table_name)
+
+EXPENSE_COLUMNS = "{expenses}.expense_id, {expenses}.name, {expenses}.cost, " \
+  "{expenses}.purchase_date, {categories}.category_id, " \
+  "{categories}.name AS 'category_name'"
+
+# Columns of an Expense with its category name and tags (as a JSON array),
+# usable both in a SELECT and in a RETURNING clause
+EXPENSE_ROW_COLUMNS = "expense_id, name, cost, purchase_date, category_id, " \
+  "(SELECT name FROM {categories} WHERE " \
+  "{categories}.category_id = {expenses}.category_id), " \
+  "(SELECT json_group_array(json_array({tags}.name, {tags}.tag_id)) " \
+  "FROM {expense_tags} JOIN {tags} ON {tags}.tag_id = {expense_tags}.tag_id " \
+  "WHERE {expense_tags}.expense_id = CAST({expenses}.expense_id AS TEXT))"
+
+IN_PERIOD = "{expenses}.purchase_date BETWEEN ? AND ?"
+NAME_LIKE = "casefold({expenses}.name) LIKE casefold(?) ESCAPE '\\'"
+NAME_MATCH = "{expenses}.expense_id IN " \
+  "(SELECT rowid FROM {search} WHERE {search} MATCH ?)"
+AFTER_CURSOR = " AND ({expenses}.purchase_date, {expenses}.expense_id) < (?, ?)"
+UPDATE_EXPENSE = "UPDATE {expenses} SET name = COALESCE(?, name), " \
+  "cost = COALESCE(?, cost), purchase_date = COALESCE(?, purchase_date), " \
+  "category_id = COALESCE(?, category_id) WHERE expense_id = ?"
+
+# UPDATE ... RETURNING is supported since Sqlite 3.35
+RETURNING_SUPPORTED = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+def create_expenses_with_tags_query(condition, limited=False):
+  """
+  Creates a query of Expenses matching the condition (the latest first)
+  with one row per tag. A limited query takes the limit as the last param.
+  """
+  source = "{expenses}"
+
+  if limited:
+    # Limits expenses before joining tags, which multiply the rows
+    source = "(SELECT * FROM {expenses} WHERE " + condition + \
+      " ORDER BY purchase_date DESC, expense_id DESC LIMIT ?) AS {expenses}"
+    condition = "1"
+
+  return "SELECT " + EXPENSE_COLUMNS + ", {tags}.name AS 'tag_name', " \
+    "{tags}.tag_id FROM " + source + " " \
+    "LEFT JOIN {categories} ON {expenses}.category_id = {categories}.category_id " \
+    "LEFT JOIN {expense_tags} ON " \
+    "{expense_tags}.expense_id = CAST({expenses}.expense_id AS TEXT) " \
+    "LEFT JOIN {tags} ON {tags}.tag_id = {expense_tags}.tag_id " \
+    "WHERE " + condition + " " \
+    "ORDER BY {expenses}.purchase_date DESC, {expenses}.expense_id DESC"
 
 class SqliteDbQueryProvider(DbQueryProvider):
   """Creates Sqlite database queries"""
 
-  def create_query(self, type: DbQueryType) -> str:
-    if type == DbQueryType.SAVE_EXPENSE:
-      return self.__create_save_expense_query()
+  QUERY_TEMPLATES = {
+    DbQueryType.SAVE_EXPENSE:
+      "INSERT INTO {expenses} (name, cost, purchase_date, category_id) "
+      "VALUES (?, ?, ?, ?)",
+    DbQueryType.SELECT_LAST_INSERT_ID: "SELECT last_insert_rowid()",
+    DbQueryType.SELECT_EXPENSE:
+      "SELECT " + EXPENSE_COLUMNS + " FROM {expenses} "
+      "LEFT JOIN {categories} ON {expenses}.category_id = {categories}.category_id "
+      "WHERE {expenses}.expense_id = ?",
+    DbQueryType.SELECT_EXPENSE_ROW:
+      "SELECT " + EXPENSE_ROW_COLUMNS + " FROM {expenses} WHERE expense_id = ?",
+    DbQueryType.UPDATE_EXPENSE:
+      UPDATE_EXPENSE + " RETURNING " + EXPENSE_ROW_COLUMNS,
+    DbQueryType.DELETE_EXPENSE: "DELETE FROM {expenses} WHERE expense_id = ?",
+    DbQueryType.SELECT_EXPENSES_IN_PERIOD:
+      create_expenses_with_tags_query(IN_PERIOD),
+    DbQueryType.SELECT_EXPENSES_PAGE_IN_PERIOD:
+      create_expenses_with_tags_query(IN_PERIOD, True),
+    DbQueryType.SELECT_EXPENSES_PAGE_IN_PERIOD_AFTER:
+      create_expenses_with_tags_query(IN_PERIOD + AFTER_CURSOR, True),
+    DbQueryType.FILTER_EXPENSES:
+      "SELECT " + EXPENSE_COLUMNS + " FROM {expenses} "
+      "LEFT JOIN {categories} ON {expenses}.category_id = {categories}.category_id "
+      "WHERE " + NAME_LIKE + " "
+      "ORDER BY {expenses}.purchase_date DESC LIMIT ? OFFSET ?",
+    DbQueryType.FILTER_EXPENSES_PAGE:
+      create_expenses_with_tags_query(NAME_LIKE, True),
+    DbQueryType.FILTER_EXPENSES_PAGE_AFTER:
+      create_expenses_with_tags_query(NAME_LIKE + AFTER_CURSOR, True),
+    DbQueryType.SEARCH_EXPENSES:
+      "SELECT " + EXPENSE_COLUMNS + " FROM {search} "
+      "JOIN {expenses} ON {expenses}.expense_id = {search}.rowid "
+      "LEFT JOIN {categories} ON {expenses}.category_id = {categories}.category_id "
+      "WHERE {search} MATCH ? "
+      "ORDER BY {search}.rank, {expenses}.purchase_date DESC LIMIT ? OFFSET ?",
+    DbQueryType.SEARCH_EXPENSES_PAGE:
+      create_expenses_with_tags_query(NAME_MATCH, True),
+    DbQueryType.SEARCH_EXPENSES_PAGE_AFTER:
+      create_expenses_with_tags_query(NAME_MATCH + AFTER_CURSOR, True),
+    DbQueryType.SELECT_ANY_SEARCH_MATCH:
+      "SELECT 1 FROM {search} WHERE {search} MATCH ? LIMIT 1",
+    DbQueryType.SELECT_COMMON_EXPENSE_COST:
+      "SELECT MIN(name), cost, COUNT(*) AS 'counter' FROM {expenses} "
+      "WHERE casefold(name) = casefold(?) GROUP BY cost "
+      "ORDER BY COUNT(*) DESC, cost ASC LIMIT 1",
+    DbQueryType.SELECT_SIMILAR_EXPENSE_NAMES:
+      "SELECT {expenses}.name, {categories}.name AS 'category_name' "
+      "FROM {expenses} LEFT JOIN {categories} "
+      "ON {expenses}.category_id = {categories}.category_id "
+      "WHERE " + NAME_LIKE + " GROUP BY {expenses}.name, {categories}.name "
+      "ORDER BY COUNT(*) DESC, {expenses}.name ASC LIMIT ?",
+    DbQueryType.SELECT_EXPENSE_NAME_COUNTS:
+      "SELECT {expenses}.name, {categories}.name AS 'category_name', COUNT(*) "
+      "FROM {expenses} LEFT JOIN {categories} "
+      "ON {expenses}.category_id = {categories}.category_id "
+      "GROUP BY {expenses}.name, {categories}.name",
+    DbQueryType.SELECT_EXPENSE_COSTS:
+      "SELECT name, purchase_date, cost, COUNT(*) FROM {expenses} "
+      "GROUP BY name, purchase_date, cost",
+    DbQueryType.SELECT_EXPENSE_COSTS_OF_NAME:
+      "SELECT name, purchase_date, cost, COUNT(*) FROM {expenses} "
+      "WHERE " + NAME_LIKE + " GROUP BY name, purchase_date, cost",
+    DbQueryType.SELECT_EXPENSE_COLUMNS_IN_PERIOD:
+      "SELECT purchase_date, cost, category_id FROM {expenses} "
+      "WHERE " + IN_PERIOD,
+    DbQueryType.SELECT_DAILY_TOTALS:
+      "SELECT purchase_date / 86400 AS day, category_id, SUM(cost) FROM {expenses} "
+      "GROUP BY day, category_id",
+    DbQueryType.SELECT_TOTAL_IN_PERIOD:
+      "SELECT COALESCE(SUM(cost), 0) FROM {expenses} "
+      "WHERE " + IN_PERIOD + " AND (? IS NULL OR category_id = ?)",
+    DbQueryType.SELECT_EXPENSE_SUGGESTIONS:
+      "SELECT s.name, s.category_id, c.name AS category_name, s.cost "
+      "FROM {suggestion_months} sm "
+      "JOIN {suggestions} s ON s.rowid = sm.suggestion_id "
+      "LEFT JOIN {categories} c ON s.category_id = c.category_id "
+      "WHERE sm.month = ? AND NOT EXISTS (SELECT 1 FROM {expenses} e "
+      "WHERE e.name = s.name AND e.purchase_date >= ? AND e.purchase_date < ?)",
+    DbQueryType.SELECT_EXPENSE_HISTORY:
+      "SELECT name, category_id, cost, purchase_date FROM {expenses}",
+    DbQueryType.SELECT_EXPENSE_SNAPSHOT:
+      "SELECT expense_id, name, cost, purchase_date, category_id FROM {expenses}",
+    DbQueryType.SELECT_EXPENSE_SNAPSHOT_TAGS:
+      "SELECT CAST({expense_tags}.expense_id AS INTEGER), {tags}.name, "
+      "{tags}.tag_id FROM {expense_tags} JOIN {tags} "
+      "ON {tags}.tag_id = {expense_tags}.tag_id",
+    DbQueryType.SELECT_SUGGESTIONS:
+      "SELECT rowid, name, category_id, cost, months FROM {suggestions}",
+    DbQueryType.SAVE_SUGGESTION:
+      "INSERT INTO {suggestions} (name, category_id, cost, months) "
+      "VALUES (?, ?, ?, ?)",
+    DbQueryType.UPDATE_SUGGESTION:
+      "UPDATE {suggestions} SET cost = ?, months = ? WHERE rowid = ?",
+    DbQueryType.DELETE_SUGGESTION: "DELETE FROM {suggestions} WHERE rowid = ?",
+    DbQueryType.SELECT_SUMMARY:
+      "SELECT {monthly_totals}.month, {monthly_totals}.category_id, "
+      "{categories}.name AS 'category_name', {monthly_totals}.total, "
+      "{monthly_totals}.count FROM {monthly_totals} LEFT JOIN {categories} "
+      "ON {monthly_totals}.category_id = {categories}.category_id "
+      "WHERE {monthly_totals}.month BETWEEN ? AND ? "
+      "ORDER BY {monthly_totals}.month DESC, {categories}.name ASC",
+    DbQueryType.SELECT_MONTH_COUNTS:
+      "SELECT month, SUM(count) FROM {monthly_totals} GROUP BY month",
+    DbQueryType.SAVE_CATEGORY: "INSERT INTO {categories} (name) VALUES (?)",
+    DbQueryType.SELECT_CATEGORIES:
+      "SELECT category_id, name FROM {categories} ORDER BY name ASC",
+    DbQueryType.SAVE_SHOP: "INSERT INTO {shops} (name) VALUES (?)",
+    DbQueryType.SAVE_TAG: "INSERT OR IGNORE INTO {tags} (tag_id, name) VALUES (?, ?)",
+    DbQueryType.SELECT_TAGS: "SELECT name, tag_id FROM {tags} ORDER BY name ASC",
+    DbQueryType.SELECT_TAG_IDS_BY_NAMES:
+      "SELECT name, tag_id FROM {tags} "
+      "WHERE name IN (SELECT value FROM json_each(?))",
+    DbQueryType.SELECT_EXPENSE_TAGS:
+      "SELECT {tags}.name, {tags}.tag_id FROM {tags} JOIN {expense_tags} "
+      "ON {tags}.tag_id = {expense_tags}.tag_id "
+      "WHERE {expense_tags}.expense_id = ?",
+    DbQueryType.SELECT_EXPENSE_TAG_LINKS:
+      "SELECT expense_id, tag_id FROM {expense_tags} "
+      "WHERE expense_id IN (SELECT value FROM json_each(?))",
+    DbQueryType.SAVE_EXPENSE_TAG_LINK:
+      "INSERT INTO {expense_tags} (expense_id, tag_id) VALUES (?, ?)",
+    DbQueryType.DELETE_EXPENSE_TAG_LINK:
+      "DELETE FROM {expense_tags} WHERE expense_id = ? AND tag_id = ?",
+    DbQueryType.DELETE_EXPENSE_TAG_LINKS:
+      "DELETE FROM {expense_tags} WHERE expense_id = ?"
+  }
+
+  def __init__(self, database_tables=None, returning_supported=RETURNING_SUPPORTED):
+    self.__returning_supported = returning_supported
+
+    super().__init__(database_tables)
+
+  def is_returning_supported(self):
+    return self.__returning_supported
+
+  def get_query_templates(self):
+    if self.__returning_supported:
+      return self.QUERY_TEMPLATES
+
+    templates = dict(self.QUERY_TEMPLATES)
+    templates[DbQueryType.UPDATE_EXPENSE] = UPDATE_EXPENSE
 
-    return super().create_query()
+    return templates
 
-  def __create_save_expense_query(self):
-    """Creates a query that saves an Expense in the database"""
-    return "INSERT INTO expenses (name, cost, purchase_date, category_id) VALUES (?, ?, ?, ?)"
+  def get_template_arguments(self, database_tables):
+    return dict(database_tables,
+                search=get_search_table_name(database_tables["expenses"]),
+                monthly_totals=get_monthly_totals_table_name(database_tables),
+                suggestion_months=get_suggestion_months_table_name(database_tables))
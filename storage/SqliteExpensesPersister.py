@@ -1,30 +1,36 @@
 """Uses Sqlite to save and update Expenses in the database"""
 import html
+import json
+import uuid
 from typing import Tuple
 
-from const import DATABASE_TYPE
 from validation_utils import validate_dict, validate_non_empty_string
-from expense.Expense import Expense, convert_date_string_to_timestamp
-from storage.ExpensesRetrieverFactory import ExpensesRetrieverFactory
+from expense.Category import Category
+from expense.Expense import Expense
+from expense.Tag import Tag
+from storage.ExpenseChanges import convert_expense_changes
 from storage.ExpensesPersisterBase import ExpensesPersisterBase
+from storage.InMemoryIndexes import get_category_id
 from storage.DbQueryProvider import DbQueryProvider, DbQueryType
+from storage.SqliteDbQueryProvider import SqliteDbQueryProvider
+from storage.TagDictionary import TagDictionary
 
 SaveExpenseParams = Tuple[str, int, int, str]
 
 class SqliteExpensesPersister(ExpensesPersisterBase):
     """Persists Expenses data in a database"""
 
-    def __init__(self, database_tables, connection_provider, query_provider: DbQueryProvider):
+    def __init__(self, database_tables, connection_provider,
+                 query_provider: DbQueryProvider = None, in_memory_indexes=None):
         self.__validate_database_tables(database_tables)
         self.__validate_connection_provider(connection_provider)
 
-        self.__expenses_table_name = database_tables["expenses"]
-        self.__categories_table_name = database_tables["categories"]
-        self.__tags_table_name = database_tables["tags"]
-        self.__expense_tags_table_name = database_tables["expense_tags"]
-        self.__shops_table_name = database_tables["shops"]
         self.__connection_provider = connection_provider
-        self.__query_provider = query_provider
+        self.__query_provider = query_provider or \
+            SqliteDbQueryProvider(database_tables)
+        self.__in_memory_indexes = in_memory_indexes
+        self.__tag_dictionary = in_memory_indexes.get_tag_dictionary() \
+            if in_memory_indexes else TagDictionary()
 
     def add_expense(self, expense : Expense):
         """Adds a new Expense to database"""
@@ -37,65 +43,149 @@ class SqliteExpensesPersister(ExpensesPersisterBase):
           expense.get_name(), expense.get_cost(),
           expense.get_purchase_date(), expense.get_category().get_category_id())
 
-        self.__connection_provider.execute_query(query, params)
-        self.persist_expense_tags(expense)
+        with self.__connection_provider.transaction() as transaction:
+            transaction.execute_query(query, params)
+            expense_id = transaction.get_last_row_id()
+            tag_ids = self.__replace_expense_tags(
+                transaction, [(expense.get_expense_id() or expense_id,
+                               expense.get_tags())], new_expenses=True)
+
+        self.__update_tag_dictionary(tag_ids)
+
+        if self.__in_memory_indexes:
+            self.__in_memory_indexes.on_expense_added(
+                self.__create_persisted_expense(expense, expense_id, tag_ids))
 
         print("Added: {}".format(expense))
 
+        return expense_id
+
+    def add_expenses(self, expenses):
+        """
+        Adds Expenses with their tags to the database in a single
+        transaction, returns the list of ids assigned to them
+        """
+        if not expenses:
+            return []
+
+        query = self.__query_provider.create_query(DbQueryType.SAVE_EXPENSE)
+        params = [(expense.get_name(), expense.get_cost(),
+                   expense.get_purchase_date(),
+                   expense.get_category().get_category_id())
+                  for expense in expenses]
+
+        with self.__connection_provider.transaction() as transaction:
+            transaction.execute_many(query, params)
+
+            # The write lock is held, so rowids of the batch are consecutive
+            last_id = transaction.execute_query(
+                self.__create_query(DbQueryType.SELECT_LAST_INSERT_ID))[0][0]
+            expense_ids = list(range(last_id - len(expenses) + 1, last_id + 1))
+
+            tag_ids = self.__replace_expense_tags(
+                transaction, [(expense_id, expense.get_tags()) for expense, expense_id
+                              in zip(expenses, expense_ids)], new_expenses=True)
+
+        self.__update_tag_dictionary(tag_ids)
+
+        if self.__in_memory_indexes:
+            for expense, expense_id in zip(expenses, expense_ids):
+                self.__in_memory_indexes.on_expense_added(
+                    self.__create_persisted_expense(expense, expense_id, tag_ids))
+
+        print("Added {} expenses".format(len(expenses)))
+
+        return expense_ids
+
     def update_expense(self, expense_id, changes):
-        """Updates existing Expense in the database"""
+        """
+        Updates existing Expense in the database, returns the updated
+        Expense or None if it doesn't exist
+        """
 
-        updates = ["{} = '{}'".format(k, convert_date_string_to_timestamp(v) if k == 'purchase_date' else v) for k, v in changes.items()]
-        query = "UPDATE {} SET {}  WHERE expense_id = '{}'".format(
-                self.__expenses_table_name,
-                ", ".join(updates),
-                expense_id)
+        columns = convert_expense_changes(changes)
+        params = tuple(columns.get(column) for column in
+                       ["name", "cost", "purchase_date", "category_id"])
+        previous_expense = None
 
-        self.__connection_provider.execute_query(query)
+        with self.__connection_provider.transaction() as transaction:
+            if self.__in_memory_indexes:
+                previous_expense = self.__read_expense(transaction, expense_id)
 
-        retriever = ExpensesRetrieverFactory.create(DATABASE_TYPE)
-        expense = retriever.retrieve_expense(expense_id)
+            rows = transaction.execute_query(
+                self.__create_query(DbQueryType.UPDATE_EXPENSE),
+                params + (expense_id,))
+
+            if not self.__query_provider.is_returning_supported():
+                rows = transaction.execute_query(
+                    self.__create_query(DbQueryType.SELECT_EXPENSE_ROW),
+                    (expense_id,))
+
+        if not rows:
+            return None
+
+        expense = self.__convert_row_to_expense(rows[0])
+
+        if self.__in_memory_indexes and previous_expense:
+            self.__in_memory_indexes.on_expense_updated(previous_expense, expense)
 
         print("Updated: {}".format(expense))
 
         return expense
 
+    def delete_expense(self, expense_id):
+        """
+        Deletes the Expense and its tag relations from the database,
+        returns the deleted Expense or None if it doesn't exist
+        """
+
+        with self.__connection_provider.transaction() as transaction:
+            expense = self.__read_expense(transaction, expense_id)
+
+            if not expense:
+                return None
+
+            transaction.execute_query(
+                self.__create_query(DbQueryType.DELETE_EXPENSE),
+                (expense.get_expense_id(),))
+            transaction.execute_query(
+                self.__create_query(DbQueryType.DELETE_EXPENSE_TAG_LINKS),
+                (str(expense.get_expense_id()),))
+
+        if self.__in_memory_indexes:
+            self.__in_memory_indexes.on_expense_deleted(expense)
+
+        print("Deleted: {}".format(expense))
+
+        return expense
+
     def add_category(self, category):
         """Adds a new Category to the database"""
 
-        query = "INSERT INTO {} (name) VALUES ('{}', '{}')".format(
-                    self.__categories_table_name,
-                    html.escape(category.get_name()))
+        self.__connection_provider.execute_query(
+            self.__create_query(DbQueryType.SAVE_CATEGORY),
+            (html.escape(category.get_name()),))
 
-        self.__connection_provider.execute_query(query)
+        if self.__in_memory_indexes:
+            self.__in_memory_indexes.on_category_added()
 
         print("Added: {}".format(category))
 
     def persist_tags(self, tags=[]):
-        """Adds Tags to the database"""
-
-        if not tags or len(tags) == 0:
-            return []
-
-        new_tags = self.__filter_out_existing_tags(tags)
+        """
+        Adds missing Tags (matched by name) to the database,
+        returns the Tags with ids they are persisted with
+        """
 
-        if len(new_tags) == 0:
+        if not tags:
             return []
 
-        tag_persist_query_parts = map(
-            self.__create_tag_persisting_query_part,
-            new_tags
-        )
-
-        tag_query_parts = list(filter(None, tag_persist_query_parts))
-        insertion_query = "INSERT INTO {table_name} " \
-            "(tag_id, name) VALUES {tags}".format(
-                table_name=self.__tags_table_name,
-                tags=", ".join(tag_query_parts))
+        with self.__connection_provider.transaction() as transaction:
+            tag_ids = self.__resolve_tag_ids(transaction, tags)
 
-        self.__connection_provider.execute_query(insertion_query)
+        self.__update_tag_dictionary(tag_ids)
 
-        return tags
+        return [Tag.get_shared(tag_ids[tag.get_name()], tag.get_name()) for tag in tags]
 
     def persist_expense_tags(self, expense):
         """
@@ -106,74 +196,153 @@ class SqliteExpensesPersister(ExpensesPersisterBase):
         if not expense:
             return []
 
-        retriever = ExpensesRetrieverFactory.create(DATABASE_TYPE)
-        previous_tags = retriever.retrieve_expense_tags(expense)
-        current_tags = expense.get_tags()
-        obsolete_tags = list(set(previous_tags) - set(current_tags))
-        new_tags = list(set(current_tags) - set(previous_tags))
+        self.persist_expenses_tags([expense])
+
+        return expense.get_tags()
 
-        if obsolete_tags and len(obsolete_tags) > 0:
-            delete_query = self.__get_expense_tags_delete_query(expense, obsolete_tags)
+    def persist_expenses_tags(self, expenses):
+        """
+        Adds tags of the Expenses to the database and replaces their relations
+        with the Expenses, using the same number of queries for any batch
+        """
 
-            self.__connection_provider.execute_query(delete_query)
+        if not expenses:
+            return None
 
-        if new_tags and len(new_tags) > 0:
-            insert_query = "INSERT INTO {} (tag_id, expense_id) " \
-                "VALUES {}".format(
-                    self.__expense_tags_table_name,
-                    ", ".join(["('{}', '{}')".format(
-                            tag.get_tag_id(), expense.get_expense_id()
-                        ) for tag in new_tags])
-                )
+        with self.__connection_provider.transaction() as transaction:
+            tag_ids = self.__replace_expense_tags(
+                transaction, [(expense.get_expense_id(), expense.get_tags())
+                              for expense in expenses])
 
-            self.__connection_provider.execute_query(insert_query)
-            self.persist_tags(new_tags)
+        self.__update_tag_dictionary(tag_ids)
 
-        return current_tags
+        if self.__in_memory_indexes:
+            self.__in_memory_indexes.on_expense_tags_changed(
+                [(expense.get_expense_id(),
+                  self.__create_persisted_tags(expense, tag_ids))
+                 for expense in expenses])
 
     def persist_shop(self, shop):
         """
         Adds Shop record to the database
         """
 
-        query = "INSERT INTO {} (name) VALUES ('{}')".format(
-                    self.__shops_table_name,
-                    html.escape(shop.get_name()))
-
-        self.__connection_provider.execute_query(query)
+        self.__connection_provider.execute_query(
+            self.__create_query(DbQueryType.SAVE_SHOP),
+            (html.escape(shop.get_name()),))
 
         print("Added: {}".format(shop))
 
-    def __get_expense_tags_delete_query(self, expense: Expense, obsolete_tags):
-        expense_id = expense.get_expense_id()
+    def __create_query(self, query_type):
+        return self.__query_provider.create_query(query_type)
+
+    def __update_tag_dictionary(self, tag_ids):
+        if self.__tag_dictionary.update(tag_ids) and self.__in_memory_indexes:
+            self.__in_memory_indexes.on_tags_added()
+
+    def __read_expense(self, transaction, expense_id):
+        rows = transaction.execute_query(
+            self.__create_query(DbQueryType.SELECT_EXPENSE_ROW), (expense_id,))
+
+        return self.__convert_row_to_expense(rows[0]) if rows else None
+
+    def __convert_row_to_expense(self, row):
+        expense_id, name, cost, purchase_date, category_id, category_name, \
+            tag_rows = row
+
+        return Expense(
+            expense_id=expense_id,
+            name=html.unescape(name),
+            cost=cost,
+            date=purchase_date,
+            category=Category.get_shared(
+                category_id, html.unescape(category_name) if category_name else None),
+            tags=[Tag.get_shared(tag_id, html.unescape(tag_name))
+                  for tag_name, tag_id in json.loads(tag_rows or "[]")])
+
+    def __create_persisted_expense(self, expense, expense_id, tag_ids):
+        """Returns the added Expense as it is read from the database"""
+        category = expense.get_category()
+        category_name = category.get_name() if category else None
+
+        return Expense(
+            expense_id=expense_id,
+            name=html.unescape(expense.get_name()),
+            cost=expense.get_cost(),
+            date=expense.get_purchase_date(),
+            category=Category.get_shared(
+                get_category_id(expense),
+                html.unescape(category_name) if category_name else None),
+            tags=self.__create_persisted_tags(expense, tag_ids))
+
+    def __create_persisted_tags(self, expense, tag_ids):
+        return list(dict.fromkeys(
+            Tag.get_shared(tag_ids[tag.get_name()], html.unescape(tag.get_name()))
+            for tag in expense.get_tags()))
+
+    def __replace_expense_tags(self, transaction, expense_tags, new_expenses=False):
+        """
+        Makes (expense id, Tags) pairs the only tag relations of the Expenses,
+        returns the name to tag id mapping of all the Tags
+        """
+        tag_ids = self.__resolve_tag_ids(
+            transaction, [tag for _, tags in expense_tags for tag in tags])
+        expected_links = {(str(expense_id), tag_ids[tag.get_name()])
+                          for expense_id, tags in expense_tags for tag in tags}
+        current_links = set()
+
+        if not new_expenses:
+            current_links = set(transaction.execute_query(
+                self.__create_query(DbQueryType.SELECT_EXPENSE_TAG_LINKS),
+                (json.dumps([str(expense_id) for expense_id, _ in expense_tags]),)))
 
-        if obsolete_tags and len(obsolete_tags) > 0:
-            tag_ids = [tag.get_tag_id() for tag in obsolete_tags]
+        obsolete_links = current_links - expected_links
+        new_links = expected_links - current_links
+
+        if obsolete_links:
+            transaction.execute_many(
+                self.__create_query(DbQueryType.DELETE_EXPENSE_TAG_LINK),
+                sorted(obsolete_links))
+
+        if new_links:
+            transaction.execute_many(
+                self.__create_query(DbQueryType.SAVE_EXPENSE_TAG_LINK),
+                sorted(new_links))
+
+        return tag_ids
+
+    def __resolve_tag_ids(self, transaction, tags):
+        """
+        Returns the name to tag id mapping of the Tags, adding the ones
+        missing in the database (matched by the unique tag name)
+        """
+        names = list(dict.fromkeys(tag.get_name() for tag in tags))
+        tag_ids = self.__tag_dictionary.get_tag_ids(names)
+        missing_tags = {}
 
-            return "DELETE FROM {} WHERE expense_id='{}' " \
-                "AND tag_id IN ('{}')".format(
-                    self.__expense_tags_table_name,
-                    expense_id,
-                    "', '".join(tag_ids))
+        for tag in tags:
+            if tag.get_name() not in tag_ids:
+                missing_tags.setdefault(tag.get_name(), tag.get_tag_id())
 
-        return "DELETE FROM {} WHERE expense_id='{}'".format(
-            self.__expense_tags_table_name, expense_id)
+        if missing_tags:
+            tag_ids.update(self.__insert_tags(transaction, missing_tags))
 
-    def __filter_out_existing_tags(self, tags):
-        return list(filter(lambda tag: not self.__check_if_tag_exists(tag), tags))
+        # A tag id taken by another name makes the insert ignored
+        conflicting_names = [name for name in missing_tags if name not in tag_ids]
 
-    def __create_tag_persisting_query_part(self, tag):
-        return "('{}', '{}')".format(tag.get_tag_id(), tag.get_name())
+        if conflicting_names:
+            tag_ids.update(self.__insert_tags(
+                transaction, {name: str(uuid.uuid4()) for name in conflicting_names}))
 
-    def __check_if_tag_exists(self, tag):
-        if not tag:
-            return False
+        return tag_ids
 
-        rows = self.__connection_provider.execute_query("SELECT * FROM {} " \
-            "WHERE name LIKE '{}'".format(self.__tags_table_name,
-                                          tag.get_name()))
+    def __insert_tags(self, transaction, tag_ids_by_name):
+        transaction.execute_many(self.__create_query(DbQueryType.SAVE_TAG),
+            [(tag_id, name) for name, tag_id in tag_ids_by_name.items()])
 
-        return True if rows else False
+        return dict(transaction.execute_query(
+            self.__create_query(DbQueryType.SELECT_TAG_IDS_BY_NAMES),
+            (json.dumps(list(tag_ids_by_name)),)))
 
     def __validate_connection_provider(self, connection_provider):
         if not connection_provider:
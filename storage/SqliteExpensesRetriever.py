@@ -1,59 +1,104 @@
-import datetime
 import html
 import itertools
-import pendulum
-import time
+import re
+from date_utils import (get_month_boundaries, get_period, get_period_months,
+                        parse_month)
 from validation_utils import validate_dict, validate_non_empty_string
 from expense.Expense import Expense
 from expense.Category import Category
 from expense.Tag import Tag
 from storage.ExpensesRetrieverBase import ExpensesRetrieverBase
+from storage.MonthsIndex import MonthsIndex
+from storage.PageCursor import (decode_page_cursor, encode_page_cursor,
+                                validate_page_size)
+from storage.CostStatistics import CostStatistics
+from storage.DataVersions import CATEGORIES, EXPENSES, SUGGESTIONS, TAGS
+from storage.DailyTotals import get_date_range
+from storage.DbQueryProvider import DbQueryProvider, DbQueryType
+from storage.ExpenseNamesIndex import get_pair
+from storage.ExpenseAnalytics import (HISTORY_MONTHS, convert_rows_to_columns,
+                                      create_category_shares, create_trends,
+                                      validate_number_of_months)
+from storage.ExpenseSnapshot import convert_cost
+from storage.SqliteDbQueryProvider import SqliteDbQueryProvider
+
+def create_full_text_match(phrase):
+    """
+    Converts a user provided phrase into a FTS5 query matching
+    expenses whose name has words starting with every word of the phrase
+    """
+    words = re.findall(r"\w+", phrase or "")
+
+    return " ".join('"{}"*'.format(word) for word in words)
+
+def escape_like_pattern(text):
+    """Escapes LIKE wildcards so the text is matched literally"""
+    return re.sub(r"([\\%_])", r"\\\1", text or "")
 
 class SqliteExpensesRetriever(ExpensesRetrieverBase):
 
-    def __init__(self, database_tables, connection_provider):
+    def __init__(self, database_tables, connection_provider,
+                 in_memory_indexes=None, query_provider: DbQueryProvider = None):
         self.__validate_database_tables(database_tables)
         self.__validate_connection_provider(connection_provider)
 
-        self.__expenses_table_name = database_tables["expenses"]
-        self.__categories_table_name = database_tables["categories"]
-        self.__tags_table_name = database_tables["tags"]
-        self.__expense_tags_table_name = database_tables["expense_tags"]
-        self.__suggestions_table_name = database_tables["suggestions"]
         self.__connection_provider = connection_provider
+        self.__in_memory_indexes = in_memory_indexes
+        self.__query_provider = query_provider or \
+            SqliteDbQueryProvider(database_tables)
 
-    def filter_expenses(self, expense_name):
-        """Returns a list of Expenses with matching expense_name"""
+    def filter_expenses(self, expense_name, limit=None, offset=0):
+        """
+        Returns a list of Expenses with matching expense_name,
+        the best matches first when full-text search is enabled
+        """
 
-        selection = """SELECT {ex_table}.expense_id, {ex_table}.name,
-                    {ex_table}.cost, {ex_table}.purchase_date,
-                    {cat_table}.category_id,
-                    {cat_table}.name AS 'category_name'
-                    FROM {ex_table}
-                    LEFT JOIN {cat_table} ON
-                    {ex_table}.category_id = {cat_table}.category_id
-                    WHERE {ex_table}.name COLLATE UTF8_GENERAL_CI LIKE '%{expense_name}%'""".format(
-                        ex_table=self.__expenses_table_name,
-                        cat_table=self.__categories_table_name,
-                        expense_name=expense_name)
+        match = self.__get_full_text_match(expense_name)
 
-        rows = self.__execute_query(selection)
+        if match:
+            query_type = DbQueryType.SEARCH_EXPENSES
+        else:
+            match = "%{}%".format(escape_like_pattern(expense_name))
+            query_type = DbQueryType.FILTER_EXPENSES
+
+        rows = self.__execute_query(
+            query_type, (match, -1 if limit is None else limit, offset))
 
         return self.__get_models_array(rows, "expense")
 
     def retrieve_common_expense_cost(self, expense_name):
         """Returns the most common price for provided Expense name"""
-        selection = """SELECT name, cost, COUNT(name) as 'counter'
-                    FROM {ex_table}
-                    WHERE name LIKE '{ex_name}'
-                    GROUP BY name, cost
-                    ORDER BY COUNT(name) DESC
-                    LIMIT 1""".format(
-                        ex_table=self.__expenses_table_name,
-                        ex_name=expense_name
-                    )
-
-        rows = self.__execute_query(selection)
+        if self.__in_memory_indexes and self.__in_memory_indexes.is_built():
+            return self.__in_memory_indexes.get_cost_statistics().get_common_cost(
+                expense_name)
+
+        return self.__get_cached(
+            "retrieve_common_expense_cost", (expense_name,), (EXPENSES,),
+            lambda: self.__retrieve_common_expense_cost(expense_name))
+
+    def retrieve_expense_cost_statistics(self, expense_name):
+        """
+        Returns count, modal, last, median, min and max cost of Expenses
+        with provided name or None if there are none
+        """
+        if self.__in_memory_indexes and self.__in_memory_indexes.is_built():
+            return self.__in_memory_indexes.get_cost_statistics().get_statistics(
+                expense_name)
+
+        cost_statistics = CostStatistics()
+        cost_statistics.build(self.__execute_query(
+            DbQueryType.SELECT_EXPENSE_COSTS_OF_NAME,
+            (escape_like_pattern(expense_name),)))
+
+        return cost_statistics.get_statistics(expense_name)
+
+    def retrieve_expense_costs(self):
+        """Returns (expense name, purchase date, cost, number of expenses) rows"""
+        return self.__execute_query(DbQueryType.SELECT_EXPENSE_COSTS)
+
+    def __retrieve_common_expense_cost(self, expense_name):
+        rows = self.__execute_query(DbQueryType.SELECT_COMMON_EXPENSE_COST,
+                                    (expense_name,))
 
         if not rows or rows[0][2] < 5:
             return 0
@@ -63,177 +108,330 @@ class SqliteExpensesRetriever(ExpensesRetrieverBase):
     def retrieve_expense(self, expense_id):
         """Returns an Expense from the database"""
 
-        expense_query = """SELECT {ex_table}.expense_id, {ex_table}.name,
-                    {ex_table}.cost, {ex_table}.purchase_date,
-                    {cat_table}.category_id,
-                    {cat_table}.name AS 'category_name'
-                    FROM {ex_table}
-                    LEFT JOIN {cat_table} ON
-                    {ex_table}.category_id = {cat_table}.category_id
-                    WHERE {ex_table}.expense_id = '{expense_id}'""".format(
-                        ex_table=self.__expenses_table_name,
-                        cat_table=self.__categories_table_name,
-                        expense_id=expense_id)
-
-        expense_rows = self.__execute_query(expense_query)
+        expense_rows = self.__execute_query(DbQueryType.SELECT_EXPENSE,
+                                            (expense_id,))
 
         if not expense_rows:
             return None
 
-        tag_query = "SELECT {tag_table}.name, {tag_table}.tag_id " \
-            "FROM {tag_table} " \
-            "JOIN {ex_tag_table} " \
-            "ON {tag_table}.tag_id = {ex_tag_table}.tag_id " \
-            "JOIN {ex_table} " \
-            "ON {ex_tag_table}.expense_id = {ex_table}.expense_id " \
-            "WHERE {ex_table}.expense_id = '{expense_id}'".format(
-                tag_table=self.__tags_table_name,
-                ex_tag_table=self.__expense_tags_table_name,
-                ex_table=self.__expenses_table_name,
-                expense_id=expense_rows[0][0]
-            )
+        tag_rows = self.__execute_query(DbQueryType.SELECT_EXPENSE_TAGS,
+                                        (str(expense_rows[0][0]),))
 
-        tag_rows = self.__execute_query(tag_query)
-
-        return self.__convert_table_row_to_expense(expense_rows[0], tag_rows)
+        return self.__convert_table_row_to_expense(expense_rows[0],
+                                                   {expense_rows[0][0]: tag_rows})
 
     def retrieve_expenses(self, latest_month, number_of_months):
         """Returns the list of Expenses for certain period of time"""
+        return list(self.iterate_expenses(latest_month, number_of_months))
+
+    def iterate_expenses(self, latest_month, number_of_months):
+        """
+        Yields Expenses for certain period of time (the latest first)
+        while they are read from the database
+        """
+
+        period = get_period(latest_month, number_of_months)
+        snapshot = self.__get_expense_snapshot()
+
+        if snapshot:
+            return iter(snapshot.get_expenses(*period))
+
+        return self.__iterate_cached(
+            "iterate_expenses", period, (EXPENSES, CATEGORIES, TAGS),
+            lambda: self.__iterate_expenses(
+                DbQueryType.SELECT_EXPENSES_IN_PERIOD, period))
+
+    def retrieve_expense_snapshot_rows(self):
+        """
+        Returns (expense id, name, cost, purchase date, category id) rows,
+        (expense id, tag name, tag id) rows and Categories of all Expenses
+        """
+        return (self.__connection_provider.iterate_query(
+                    self.__query_provider.create_query(
+                        DbQueryType.SELECT_EXPENSE_SNAPSHOT)),
+                self.__execute_query(DbQueryType.SELECT_EXPENSE_SNAPSHOT_TAGS),
+                self.retrieve_categories())
+
+    def __get_expense_snapshot(self):
+        if not self.__in_memory_indexes or not self.__in_memory_indexes.is_built():
+            return None
 
-        month_end = pendulum.parse(latest_month).add(months=1).subtract(seconds=1)
-        month_start = month_end.subtract(months=number_of_months).add(seconds=1)
-
-        expenses_query = """SELECT {ex_table}.expense_id, {ex_table}.name,
-                    {ex_table}.cost, {ex_table}.purchase_date,
-                    {cat_table}.category_id,
-                    {cat_table}.name AS 'category_name'
-                    FROM {ex_table}
-                    LEFT JOIN {cat_table} ON
-                    {ex_table}.category_id = {cat_table}.category_id
-                    WHERE {ex_table}.purchase_date
-                    BETWEEN {start_date} AND {end_date}
-                    ORDER BY purchase_date DESC""".format(
-                        ex_table=self.__expenses_table_name,
-                        cat_table=self.__categories_table_name,
-                        start_date=month_start.int_timestamp,
-                        end_date=month_end.int_timestamp)
-
-        expense_rows = self.__execute_query(expenses_query)
-
-        tags_query = "SELECT " \
-            "{ex_table}.expense_id, {tag_table}.name, {tag_table}.tag_id " \
-            "FROM {tag_table} " \
-            "JOIN {ex_tag_table} " \
-            "ON {tag_table}.tag_id = {ex_tag_table}.tag_id " \
-            "JOIN {ex_table} " \
-            "ON {ex_tag_table}.expense_id = {ex_table}.expense_id".format(
-                tag_table=self.__tags_table_name,
-                ex_tag_table=self.__expense_tags_table_name,
-                ex_table=self.__expenses_table_name
-            )
-
-        tag_rows = self.__execute_query(tags_query)
-
-        return self.__get_models_array(expense_rows, "expense", tag_rows)
+        return self.__in_memory_indexes.ensure_expense_snapshot_built(self)
+
+    def retrieve_expenses_page(self, latest_month, number_of_months,
+                               page_size, cursor=None):
+        """
+        Returns a (list of Expenses, next page cursor) tuple with up to
+        page_size Expenses of the period following the cursor position
+        """
+
+        return self.__retrieve_expenses_page(
+            DbQueryType.SELECT_EXPENSES_PAGE_IN_PERIOD,
+            DbQueryType.SELECT_EXPENSES_PAGE_IN_PERIOD_AFTER,
+            get_period(latest_month, number_of_months), page_size, cursor)
+
+    def filter_expenses_page(self, expense_name, page_size, cursor=None):
+        """
+        Returns a (list of Expenses, next page cursor) tuple with up to
+        page_size Expenses with matching expense_name (the latest first)
+        """
+
+        match = self.__get_full_text_match(expense_name)
+
+        if match:
+            return self.__retrieve_expenses_page(
+                DbQueryType.SEARCH_EXPENSES_PAGE,
+                DbQueryType.SEARCH_EXPENSES_PAGE_AFTER, (match,), page_size,
+                cursor)
+
+        return self.__retrieve_expenses_page(
+            DbQueryType.FILTER_EXPENSES_PAGE,
+            DbQueryType.FILTER_EXPENSES_PAGE_AFTER,
+            ("%{}%".format(escape_like_pattern(expense_name)),), page_size,
+            cursor)
+
+    def __retrieve_expenses_page(self, query_type, after_cursor_query_type,
+                                 params, page_size, cursor):
+        validate_page_size(page_size)
+
+        if cursor:
+            query_type = after_cursor_query_type
+            params = params + decode_page_cursor(cursor)
+
+        expenses = list(self.__iterate_expenses(query_type,
+                                                params + (page_size + 1,)))
+
+        if len(expenses) <= page_size:
+            return expenses, None
+
+        last_expense = expenses[page_size - 1]
+
+        return expenses[:page_size], encode_page_cursor(
+            last_expense.get_purchase_date(), last_expense.get_expense_id())
+
+    def __iterate_expenses(self, query_type, params):
+        """Yields Expenses read with a query returning one row per tag"""
+
+        rows = self.__connection_provider.iterate_query(
+            self.__query_provider.create_query(query_type), params)
+
+        # Rows of a single Expense (one per tag) come one after another
+        for expense_id, expense_rows in itertools.groupby(rows, lambda row: row[0]):
+            expense_rows = list(expense_rows)
+            tag_rows = [row[6:] for row in expense_rows if row[7] is not None]
+
+            yield self.__convert_table_row_to_expense(expense_rows[0][:6],
+                                                      {expense_id: tag_rows})
+
+    def retrieve_summary(self, latest_month, number_of_months):
+        """
+        Returns totals and counts of Expenses per month and category
+        for certain period of time (the latest month first)
+        """
+
+        rows = self.__execute_query(DbQueryType.SELECT_SUMMARY,
+                                    get_period_months(latest_month, number_of_months))
+
+        return [{
+            "month": month,
+            "category": {
+                "id": category_id,
+                "name": html.unescape(category_name) if category_name else None
+            },
+            "total": total,
+            "count": count
+        } for month, category_id, category_name, total, count in rows]
+
+    def retrieve_trends(self, latest_month, number_of_months):
+        """
+        Returns monthly totals, trailing averages and year-over-year deltas
+        of all Expenses and per Category for certain period of time
+        """
+        validate_number_of_months(number_of_months)
+
+        return self.__get_cached(
+            "retrieve_trends", (latest_month, number_of_months),
+            (EXPENSES, CATEGORIES),
+            lambda: create_trends(
+                self.retrieve_expense_columns(*get_period(
+                    latest_month, number_of_months + HISTORY_MONTHS)),
+                self.retrieve_categories(), latest_month, number_of_months))
+
+    def retrieve_category_shares(self, latest_month, number_of_months):
+        """
+        Returns totals, counts and shares of spending per Category
+        for certain period of time
+        """
+        validate_number_of_months(number_of_months)
+
+        return self.__get_cached(
+            "retrieve_category_shares", (latest_month, number_of_months),
+            (EXPENSES, CATEGORIES),
+            lambda: create_category_shares(
+                self.retrieve_expense_columns(
+                    *get_period(latest_month, number_of_months)),
+                self.retrieve_categories()))
+
+    def retrieve_expense_columns(self, first_date, last_date):
+        """
+        Returns purchase dates, costs and category ids arrays of Expenses
+        purchased between the timestamps
+        """
+        snapshot = self.__get_expense_snapshot()
+
+        if snapshot:
+            return snapshot.get_columns(first_date, last_date)
+
+        return convert_rows_to_columns(self.__execute_query(
+            DbQueryType.SELECT_EXPENSE_COLUMNS_IN_PERIOD, (first_date, last_date)))
+
+    def retrieve_daily_totals(self):
+        """Returns (day since epoch, category id, total cost) rows"""
+        return self.__execute_query(DbQueryType.SELECT_DAILY_TOTALS)
+
+    def retrieve_total(self, first_date=None, last_date=None, category_id=None):
+        """
+        Returns the total cost of Expenses (of the category if it's given)
+        purchased from first_date to last_date (YYYY-MM-DD, both optional)
+        """
+        first_timestamp, last_timestamp = get_date_range(first_date, last_date)
+
+        if self.__in_memory_indexes and self.__in_memory_indexes.is_built():
+            return self.__in_memory_indexes.get_daily_totals().get_total(
+                first_timestamp, last_timestamp, category_id)
+
+        rows = self.__execute_query(
+            DbQueryType.SELECT_TOTAL_IN_PERIOD,
+            (first_timestamp, last_timestamp, category_id, category_id))
+
+        return convert_cost(round(rows[0][0], 2))
 
     def retrieve_months(self):
         """Returns a list of months which may have Expenses registered"""
-        oldest_timestamp = self.__execute_query("""SELECT {ex_table}.purchase_date
-                                              FROM {ex_table}
-                                              ORDER BY {ex_table}.purchase_date ASC
-                                              LIMIT 1""".format(ex_table=self.__expenses_table_name))
+        return self.__get_months_index().get_months()
 
-        oldest_date = pendulum.from_timestamp(int(oldest_timestamp[0][0]))
-        period = pendulum.period(oldest_date, pendulum.now())
+    def retrieve_months_with_counts(self):
+        """
+        Returns a list of {month, count} dictionaries for months which
+        may have Expenses registered
+        """
+        return self.__get_months_index().get_month_counts()
 
-        months = [month.format("YYYY-MM") for month in period.range("months")]
+    def retrieve_month_counts(self):
+        """Returns (month, number of expenses) rows"""
+        return self.__execute_query(DbQueryType.SELECT_MONTH_COUNTS)
 
-        return months
+    def __get_months_index(self):
+        if self.__in_memory_indexes and self.__in_memory_indexes.is_built():
+            return self.__in_memory_indexes.get_months_index()
 
-    def retrieve_similar_expense_names(self, expense_name):
+        months_index = MonthsIndex()
+        months_index.build(self.retrieve_month_counts())
+
+        return months_index
+
+    def retrieve_similar_expense_names(self, expense_name, limit=None):
         """Returns a list of expense name and category pairs
-        for the provided expense name"""
-        list_of_rows = self.__execute_query("""SELECT {ex_table}.name,
-                        {cat_table}.name AS 'category_name' FROM {ex_table}
-                        LEFT JOIN {cat_table}
-                        ON {ex_table}.category_id = {cat_table}.category_id
-                        WHERE {ex_table}.name LIKE '%{name}%'
-                        ORDER BY {ex_table}.name ASC""".format(
-                            ex_table=self.__expenses_table_name,
-                            cat_table=self.__categories_table_name,
-                            name=expense_name
-                        ))
-
-        rows = [{ "name": n, "category": c } for n, c in list_of_rows]
-        unique_rows = list(rows)
-        sorted_by_frequency = sorted(unique_rows, key=unique_rows.count, reverse=True)
-
-        return self.__leave_unique_values(sorted_by_frequency)
+        for the provided expense name, the most frequent first"""
+        if self.__in_memory_indexes and self.__in_memory_indexes.is_built():
+            return self.__in_memory_indexes.get_expense_names_index().search(
+                expense_name, limit)
+
+        list_of_rows = self.__execute_query(
+            DbQueryType.SELECT_SIMILAR_EXPENSE_NAMES,
+            ("%{}%".format(escape_like_pattern(expense_name)), limit or -1))
+
+        return [{ "name": name, "category": category } for name, category in
+                (get_pair(n, c) for n, c in list_of_rows)]
+
+    def retrieve_expense_name_counts(self):
+        """Returns (expense name, category name, number of expenses) rows"""
+        return self.__execute_query(DbQueryType.SELECT_EXPENSE_NAME_COUNTS)
 
     def retrieve_categories(self):
         """Returns the list of all Categories"""
-        rows = self.__execute_query("""SELECT * FROM {table_name}
-                        ORDER BY name ASC""".format(
-                            table_name=self.__categories_table_name
-                        ))
-
-        return self.__get_models_array(rows, "category")
+        return self.__get_cached("retrieve_categories", (), (CATEGORIES,),
+                                 lambda: self.__get_models_array(
+                                     self.__execute_query(
+                                         DbQueryType.SELECT_CATEGORIES),
+                                     "category"))
 
     def retrieve_tags(self):
         """Returns the list of all Tags"""
-        rows = self.__execute_query("SELECT name, tag_id FROM {} ORDER BY name ASC".format(
-                                    self.__tags_table_name))
-
-        return self.__get_models_array(rows, "tag")
+        return self.__get_cached("retrieve_tags", (), (TAGS,),
+                                 lambda: self.__get_models_array(
+                                     self.__execute_query(DbQueryType.SELECT_TAGS),
+                                     "tag"))
 
     def retrieve_expense_tags(self, expense: Expense):
         """Returns the list of all Tags"""
-        rows = self.__execute_query("SELECT name, {tag_table}.tag_id FROM {tag_table} " \
-            "JOIN {ex_tag_table} ON " \
-            "{tag_table}.tag_id = {ex_tag_table}.tag_id " \
-            "WHERE {ex_tag_table}.expense_id='{expense_id}'".format(
-                tag_table=self.__tags_table_name,
-                ex_tag_table=self.__expense_tags_table_name,
-                expense_id=expense.get_expense_id())
-            )
+        rows = self.__execute_query(DbQueryType.SELECT_EXPENSE_TAGS,
+                                    (str(expense.get_expense_id()),))
 
         return self.__get_models_array(rows, "tag")
 
     def retrieve_expense_suggestions(self, month_date):
       """Returns a list of expense suggestions for the provided month_date"""
+      return self.__get_cached(
+          "retrieve_expense_suggestions", (month_date,),
+          (EXPENSES, CATEGORIES, SUGGESTIONS),
+          lambda: self.__retrieve_expense_suggestions(month_date))
 
-      month_end = pendulum.parse(month_date).add(months=1).subtract(seconds=1)
-      month_start = month_end.subtract(months=1).add(seconds=1)
-      month = month_start.month
+    def __retrieve_expense_suggestions(self, month_date):
+      month_start, month_end = get_month_boundaries(month_date)
+      month = parse_month(month_date)[1]
 
-      s_table = self.__suggestions_table_name
-      e_table = self.__expenses_table_name
-      c_table = self.__categories_table_name
+      rows = self.__execute_query(DbQueryType.SELECT_EXPENSE_SUGGESTIONS,
+                                  (month, month_start, month_end + 1))
 
-      query = f"SELECT s.name, s.category_id, c.name AS category_name, s.cost FROM {s_table} s " \
-        f"LEFT JOIN {c_table} c ON s.category_id = c.category_id " \
-        f"WHERE NOT EXISTS (SELECT * FROM {e_table} e WHERE s.name = e.name " \
-        f"AND e.purchase_date < {month_end.int_timestamp} AND e.purchase_date >= {month_start.int_timestamp}) " \
-        f"AND REGEXP('^{month},|,{month},|,{month}$', s.months)"
+      return self.__get_models_array(list(rows), "suggestion")
 
-      rows = self.__execute_query(query)
+    def __get_full_text_match(self, expense_name):
+        """
+        Returns a FTS5 query of the expense_name or None if full-text search
+        is disabled or finds nothing (then substrings are matched with LIKE)
+        """
+        if not self.__is_full_text_search_enabled():
+            return None
 
-      return self.__get_models_array(list(rows), "suggestion")
+        match = create_full_text_match(expense_name)
+
+        if not match or not self.__execute_query(
+                DbQueryType.SELECT_ANY_SEARCH_MATCH, (match,)):
+            return None
+
+        return match
 
-    def __leave_unique_values(self, list_of_values):
-        if not list:
-            return []
+    def __is_full_text_search_enabled(self):
+        provider = self.__connection_provider
+
+        return hasattr(provider, "is_full_text_search_enabled") and \
+            provider.is_full_text_search_enabled()
+
+    def get_query_cache_stats(self):
+        """Returns statistics of the query results cache (None if disabled)"""
+        if not self.__in_memory_indexes:
+            return None
 
-        unique_list = []
+        return self.__in_memory_indexes.get_query_cache().get_stats()
 
-        for value in list_of_values:
-            if not value in unique_list:
-                unique_list.append(value)
+    def __get_cached(self, name, args, tables, load):
+        if not self.__in_memory_indexes:
+            return load()
 
-        return unique_list
+        return self.__in_memory_indexes.get_query_cache().get(
+            name, args, tables, load)
 
-    def __execute_query(self, query):
-        return self.__connection_provider.execute_query(query)
+    def __iterate_cached(self, name, args, tables, iterate):
+        if not self.__in_memory_indexes:
+            return iterate()
+
+        return self.__in_memory_indexes.get_query_cache().iterate(
+            name, args, tables, iterate)
+
+    def __execute_query(self, query_type, params=()):
+        return self.__connection_provider.execute_query(
+            self.__query_provider.create_query(query_type), params)
 
     def __get_models_array(self, rows, model_type, additional_rows=[]):
         models = []
@@ -261,8 +459,9 @@ class SqliteExpensesRetriever(ExpensesRetrieverBase):
         if model_type == "suggestion":
             return self.__convert_table_row_to_suggestion
 
-    def __convert_table_row_to_expense(self, table_row, tag_rows):
-        expense_tag_rows = self.__extract_expense_tag_rows(table_row[0], tag_rows)
+    def __convert_table_row_to_expense(self, table_row, tag_rows_by_expense_id):
+        expense_tag_rows = tag_rows_by_expense_id.get(table_row[0], []) \
+            if tag_rows_by_expense_id else []
 
         return Expense(
             expense_id=table_row[0],
@@ -275,21 +474,16 @@ class SqliteExpensesRetriever(ExpensesRetrieverBase):
         )
 
     def __convert_table_row_to_category(self, table_row, additional_rows=[]):
-        return Category(table_row[0], html.unescape(table_row[1]))
+        return Category.get_shared(table_row[0], html.unescape(table_row[1]))
 
     def __convert_table_row_to_tag(self, table_row, additional_rows=[]):
-        return Tag(table_row[1], html.unescape(table_row[0]))
+        return Tag.get_shared(table_row[1], html.unescape(table_row[0]))
 
     def __convert_table_row_to_suggestion(self, table_row, additional_rows=[]):
-        category = Category(table_row[1], table_row[2])
+        category = Category.get_shared(table_row[1], table_row[2])
 
         return Expense('', table_row[0], table_row[3], None, category, [])
 
-    def __extract_expense_tag_rows(self, expense_id, tag_rows):
-        filtered = list(filter(lambda row: row[0] == expense_id, tag_rows))
-
-        return [tuple(row[1:]) for row in filtered]
-
     def __validate_connection_provider(self, connection_provider):
         if not connection_provider:
             raise ValueError("InvalidArgument: connection_provider must be "
@@ -300,6 +494,11 @@ class SqliteExpensesRetriever(ExpensesRetrieverBase):
             raise ValueError("InvalidArgument: connection_provider must have "
                              "execute_query method")
 
+        if (not hasattr(connection_provider, "iterate_query") or
+            not callable(connection_provider.iterate_query)):
+            raise ValueError("InvalidArgument: connection_provider must have "
+                             "iterate_query method")
+
     def __validate_database_tables(self, database_tables):
         validator_map = {
             "expenses": validate_non_empty_string,
@@ -0,0 +1,60 @@
+"""Reports which indexes the queries of SqliteExpensesRetriever use"""
+import json
+import sys
+
+from const import DATABASE_TABLES, FULL_DATABASE_PATH
+from date_utils import get_current_month
+from storage.SqliteDatabaseConnectionProvider import (
+    SqliteDatabaseConnectionProvider, get_used_indexes)
+from storage.SqliteExpensesRetriever import SqliteExpensesRetriever
+
+def get_retriever_calls(month, expense_name):
+    """Returns (method name, arguments) of the reported retriever methods"""
+    return [
+        ("filter_expenses", (expense_name,)),
+        ("retrieve_common_expense_cost", (expense_name,)),
+        ("retrieve_expense", (1,)),
+        ("retrieve_expenses", (month, 12)),
+        ("retrieve_months", ()),
+        ("retrieve_similar_expense_names", (expense_name,)),
+        ("retrieve_categories", ()),
+        ("retrieve_tags", ()),
+        ("retrieve_expense_suggestions", (month,))
+    ]
+
+def create_query_plan_report(retriever, connection_provider, month,
+                             expense_name="a"):
+    """
+    Calls every reported retriever method and returns a dictionary with
+    the queries it executed, their plans and the indexes they used
+    """
+    report = {}
+
+    for method_name, args in get_retriever_calls(month, expense_name):
+        with connection_provider.recording_query_plans() as query_plans:
+            error = None
+
+            try:
+                getattr(retriever, method_name)(*args)
+            except Exception as exception:
+                error = str(exception)
+
+        report[method_name] = {
+            "queries": [{
+                "query": " ".join(query.split()),
+                "plan": plan,
+                "indexes": get_used_indexes(plan),
+                "full_scans": [detail for detail in plan
+                               if detail.startswith("SCAN")]
+            } for query, plan in query_plans],
+            "error": error
+        }
+
+    return report
+
+if __name__ == "__main__":
+    month = sys.argv[1] if len(sys.argv) > 1 else get_current_month()
+    provider = SqliteDatabaseConnectionProvider(FULL_DATABASE_PATH, DATABASE_TABLES)
+    retriever = SqliteExpensesRetriever(DATABASE_TABLES, provider)
+
+    print(json.dumps(create_query_plan_report(retriever, provider, month), indent=2))
@@ -0,0 +1,40 @@
+"""The module contains in-memory dictionary of tag ids"""
+import threading
+
+class TagDictionary:
+    """
+    Maps tag names to ids of the persisted tags. Tags are never renamed
+    or removed, so names missing from the dictionary are the only ones
+    which need to be looked up in (or written to) the database.
+    """
+
+    def __init__(self):
+        self.__tag_ids = {}
+        self.__lock = threading.Lock()
+
+    def build(self, tags):
+        """Replaces dictionary content with the persisted Tags"""
+        with self.__lock:
+            self.__tag_ids = {tag.get_name(): tag.get_tag_id() for tag in tags}
+
+    def update(self, tag_ids_by_name):
+        """
+        Adds name to tag id mapping of persisted tags,
+        returns True if any of the names was unknown
+        """
+        with self.__lock:
+            known_count = len(self.__tag_ids)
+            self.__tag_ids.update(tag_ids_by_name)
+
+            return len(self.__tag_ids) != known_count
+
+    def get_tag_id(self, name):
+        """Returns the id of the persisted tag or None if it is unknown"""
+        with self.__lock:
+            return self.__tag_ids.get(name)
+
+    def get_tag_ids(self, names):
+        """Returns a dictionary with ids of the known tags among the names"""
+        with self.__lock:
+            return {name: self.__tag_ids[name] for name in names
+                    if name in self.__tag_ids}
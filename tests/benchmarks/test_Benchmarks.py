@@ -0,0 +1,35 @@
+import unittest
+
+from benchmarks.Benchmarks import MIN_REPEAT, find_regressions, measure, run_benchmarks
+
+class TestBenchmarks(unittest.TestCase):
+    def test_measures_calls_of_benchmark(self):
+        calls = []
+        result = measure(lambda: calls.append(None))
+
+        self.assertEqual(result["calls"], len(calls))
+        self.assertGreaterEqual(result["calls"], MIN_REPEAT)
+        self.assertLessEqual(result["min"], result["median"])
+
+    def test_reports_errors_of_benchmarks(self):
+        def fail():
+            raise ValueError("InvalidArgument: failure")
+
+        results = run_benchmarks({"fail": fail, "pass": lambda: None})
+
+        self.assertEqual(results["fail"],
+                         {"error": "ValueError: InvalidArgument: failure"})
+        self.assertIn("median", results["pass"])
+
+    def test_finds_benchmarks_slower_than_threshold(self):
+        baseline = {"faster": {"median": 2.0}, "same": {"median": 1.0},
+                    "slower": {"median": 1.0}, "failed": {"error": "Error"}}
+        results = {"faster": {"median": 1.0}, "same": {"median": 1.1},
+                   "slower": {"median": 1.5}, "failed": {"median": 5.0},
+                   "new": {"median": 5.0}}
+
+        self.assertEqual(find_regressions(results, baseline, 0.2),
+                         [("slower", 1.0, 1.5)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,18 @@
+import unittest
+
+from benchmarks.RouteBenchmarks import get_route_calls
+from rest.routes import app
+
+class TestRouteBenchmarks(unittest.TestCase):
+    def test_covers_every_route(self):
+        facts = {"month": "2023-12", "name": "Bread", "first_expense_id": 1,
+                 "last_expense_id": 2000, "category_id": 1}
+        routes = {(method, rule.rule) for rule in app.url_map.iter_rules()
+                  if rule.endpoint != "static"
+                  for method in rule.methods - {"HEAD", "OPTIONS"}}
+
+        self.assertEqual({(method, rule) for method, rule, _, _
+                          in get_route_calls(facts)}, routes)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from benchmarks.StorageBenchmarks import (create_storage_benchmarks,
+                                          get_persister_calls, get_retriever_calls)
+from benchmarks.SyntheticDataset import generate_dataset
+from const import DATABASE_TABLES
+from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
+from storage.SqliteExpensesPersister import SqliteExpensesPersister
+from storage.SqliteExpensesRetriever import SqliteExpensesRetriever
+
+def get_public_methods(cls):
+    return sorted(name for name in dir(cls)
+                  if not name.startswith("_") and callable(getattr(cls, name)))
+
+class TestStorageBenchmarks(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_path = os.path.join(self.directory.name, "expenses.db")
+        self.scratch_path = os.path.join(self.directory.name, "scratch.db")
+
+        generate_dataset(self.database_path, 2000)
+        generate_dataset(self.scratch_path, 2000)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_generates_the_same_dataset_for_the_same_seed(self):
+        query = "SELECT * FROM {} ORDER BY expense_id".format(
+            DATABASE_TABLES["expenses"])
+        expenses = SqliteDatabaseConnectionProvider(
+            self.database_path, DATABASE_TABLES).execute_query(query)
+
+        self.assertEqual(len(expenses), 2000)
+        self.assertEqual(expenses, SqliteDatabaseConnectionProvider(
+            self.scratch_path, DATABASE_TABLES).execute_query(query))
+
+    def test_covers_every_retriever_and_persister_method(self):
+        facts = {"month": "2023-12", "name": "Bread", "first_expense_id": 1,
+                 "last_expense_id": 2000, "category_id": 1}
+
+        self.assertEqual([name for name, _ in get_retriever_calls(facts)],
+                         get_public_methods(SqliteExpensesRetriever))
+        self.assertEqual([name for name, _ in get_persister_calls(facts)],
+                         get_public_methods(SqliteExpensesPersister))
+
+    def test_runs_every_benchmark(self):
+        benchmarks = create_storage_benchmarks(
+            SqliteDatabaseConnectionProvider(self.database_path, DATABASE_TABLES),
+            SqliteDatabaseConnectionProvider(self.scratch_path, DATABASE_TABLES))
+
+        for name, benchmark in benchmarks.items():
+            with self.subTest(name=name), contextlib.redirect_stdout(io.StringIO()):
+                benchmark()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from unittest.mock import patch
+
+from const import DATABASE_TABLES
+from rest import routes
+from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
+from storage.SqliteExpensesRetriever import SqliteExpensesRetriever
+
+class TestRoutes(unittest.TestCase):
+    def setUp(self):
+        connection_provider = SqliteDatabaseConnectionProvider(":memory:",
+                                                               DATABASE_TABLES)
+        connection_provider.ensure_necessary_tables_exist()
+        retriever = SqliteExpensesRetriever(DATABASE_TABLES, connection_provider)
+        patcher = patch.object(routes, "get_expenses_retriever",
+                               return_value=retriever)
+
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = routes.app.test_client()
+
+    def assert_bad_request(self, url):
+        response = self.client.get(url)
+
+        self.assertEqual(400, response.status_code, url)
+        self.assertRegex(response.get_json()["error"], "InvalidArgument:")
+
+    def test_rejects_invalid_months_with_json_error(self):
+        for url in ["/expenses/2024-13/1", "/summary/2024-13/1",
+                    "/analytics/trends/2024-13/1", "/suggestions/2024-13"]:
+            with self.subTest(url=url):
+                self.assert_bad_request(url)
+
+    def test_rejects_category_of_totals_which_is_not_an_id(self):
+        self.assert_bad_request("/totals?category=abc")
+        self.assertEqual(200, self.client.get("/totals?category=1").status_code)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import threading
+import time
+import unittest
+
+from storage.ConnectionPool import ConnectionPool
+
+class ConnectionStub(object):
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def close(self):
+        self.closed = True
+
+class TestConnectionPool(unittest.TestCase):
+    def create(self, size=2, max_idle_time=None, check_connection=None):
+        return ConnectionPool(self.create_connection, size, max_idle_time,
+                              check_connection)
+
+    def setUp(self):
+        self.created_connections = []
+
+    def create_connection(self):
+        connection = ConnectionStub()
+        self.created_connections.append(connection)
+
+        return connection
+
+    def test_validates_create_connection(self):
+        with self.assertRaises(ValueError) as cm:
+            ConnectionPool(None)
+
+        self.assertRegex(str(cm.exception),
+                         "InvalidArgument:.*create_connection")
+
+    def test_validates_size(self):
+        for size in [None, 0, -1, "5", True]:
+            with self.subTest(size=size):
+                with self.assertRaises(ValueError) as cm:
+                    self.create(size=size)
+
+                self.assertRegex(str(cm.exception), "InvalidArgument:.*size")
+
+    def test_reuses_returned_connections(self):
+        sut = self.create()
+
+        with sut.connection() as first:
+            pass
+
+        with sut.connection() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(1, len(self.created_connections))
+
+    def test_opens_at_most_size_connections(self):
+        sut = self.create(size=2)
+
+        sut.checkout()
+        sut.checkout()
+
+        with self.assertRaises(TimeoutError):
+            sut.checkout(timeout=0.01)
+
+        self.assertEqual(2, sut.get_open_connections_count())
+
+    def test_waiting_checkout_receives_returned_connection(self):
+        sut = self.create(size=1)
+        connection = sut.checkout()
+
+        def return_connection():
+            time.sleep(0.05)
+            sut.checkin(connection)
+
+        thread = threading.Thread(target=return_connection)
+        thread.start()
+
+        self.assertIs(connection, sut.checkout(timeout=1))
+        thread.join()
+
+    def test_replaces_unhealthy_connections_on_checkout(self):
+        sut = self.create(check_connection=lambda c: c.healthy)
+
+        connection = sut.checkout()
+        sut.checkin(connection)
+        connection.healthy = False
+
+        replacement = sut.checkout()
+
+        self.assertIsNot(connection, replacement)
+        self.assertTrue(connection.closed)
+        self.assertEqual(1, sut.get_open_connections_count())
+
+    def test_treats_raising_health_check_as_unhealthy(self):
+        def check_connection(connection):
+            raise Exception("Lost connection")
+
+        sut = self.create(check_connection=check_connection)
+        connection = sut.checkout()
+        sut.checkin(connection)
+
+        self.assertIsNot(connection, sut.checkout())
+
+    def test_evicts_idle_connections(self):
+        sut = self.create(max_idle_time=0.01)
+
+        connection = sut.checkout()
+        sut.checkin(connection)
+        time.sleep(0.02)
+        sut.evict_idle_connections()
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(0, sut.get_open_connections_count())
+
+    def test_releases_slot_when_opening_connection_fails(self):
+        def create_connection():
+            raise Exception("Cannot connect")
+
+        sut = ConnectionPool(create_connection, 1)
+
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                sut.checkout(timeout=0.01)
+
+        self.assertEqual(0, sut.get_open_connections_count())
+
+    def test_close_closes_idle_and_returned_connections(self):
+        sut = self.create()
+
+        idle = sut.checkout()
+        in_use = sut.checkout()
+        sut.checkin(idle)
+
+        sut.close()
+        sut.checkin(in_use)
+
+        self.assertTrue(idle.closed)
+        self.assertTrue(in_use.closed)
+
+        with self.assertRaises(RuntimeError):
+            sut.checkout()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from storage.CostStatistics import CostStatistics
+
+class TestCostStatistics(unittest.TestCase):
+    def setUp(self):
+        self.sut = CostStatistics()
+
+        self.sut.build([
+            ("Bread", 100, 3, 4),
+            ("Bread", 300, 5, 1),
+            ("bread", 200, 2, 1),
+            ("Milk", 100, 4, 1)
+        ])
+
+    def test_returns_statistics_of_name_ignoring_case(self):
+        self.assertDictEqual({
+            "count": 6,
+            "modal_cost": 3,
+            "modal_count": 4,
+            "last_cost": 5,
+            "median_cost": 3,
+            "min_cost": 2,
+            "max_cost": 5
+        }, self.sut.get_statistics("BREAD"))
+
+    def test_returns_none_for_unknown_name(self):
+        self.assertIsNone(self.sut.get_statistics("Water"))
+        self.assertEqual(0, self.sut.get_common_cost("Water"))
+
+    def test_returns_common_cost_only_if_frequent(self):
+        self.assertEqual(0, self.sut.get_common_cost("Bread"))
+
+        self.sut.add("Bread", 400, 3)
+
+        self.assertEqual(3, self.sut.get_common_cost("Bread"))
+
+    def test_averages_two_middle_costs_of_even_count(self):
+        self.sut.add("Milk", 200, 5)
+
+        self.assertEqual(4.5, self.sut.get_statistics("Milk")["median_cost"])
+
+    def test_follows_removed_purchases(self):
+        self.sut.remove("Bread", 300, 5)
+
+        statistics = self.sut.get_statistics("Bread")
+
+        self.assertEqual(5, statistics["count"])
+        self.assertEqual(2, statistics["last_cost"])
+        self.assertEqual(3, statistics["max_cost"])
+
+        self.sut.remove("Milk", 100, 4)
+
+        self.assertIsNone(self.sut.get_statistics("Milk"))
@@ -0,0 +1,73 @@
+import unittest
+
+from date_utils import convert_date_string_to_timestamp
+from storage.DailyTotals import DailyTotals, get_date_range
+
+DAY = 86400
+
+class TestDailyTotals(unittest.TestCase):
+    def setUp(self):
+        self.sut = DailyTotals()
+
+        self.sut.build([(10, 1, 5), (12, 2, 7), (12, 1, 1.5)])
+
+    def test_returns_totals_of_days_between_dates(self):
+        self.assertEqual(13.5, self.sut.get_total())
+        self.assertEqual(5, self.sut.get_total(10 * DAY, 11 * DAY + 100))
+        self.assertEqual(8.5, self.sut.get_total(11 * DAY))
+        self.assertEqual(1.5, self.sut.get_total(12 * DAY + 5, None, 1))
+        self.assertEqual(0, self.sut.get_total(None, None, 3))
+        self.assertEqual(0, self.sut.get_total(0, 9 * DAY))
+        self.assertEqual(0, self.sut.get_total(20 * DAY))
+        self.assertEqual(0, self.sut.get_total(12 * DAY, 10 * DAY))
+
+    def test_applies_added_and_removed_costs_outside_of_days_range(self):
+        self.sut.add(5 * DAY, 3, 10)
+        self.sut.add(30 * DAY + 10, 1, 2)
+        self.sut.remove(12 * DAY, 2, 7)
+
+        self.assertEqual(18.5, self.sut.get_total())
+        self.assertEqual(10, self.sut.get_total(None, None, 3))
+        self.assertEqual(0, self.sut.get_total(None, None, 2))
+        self.assertEqual(2, self.sut.get_total(25 * DAY))
+        self.assertEqual(6.5, self.sut.get_total(6 * DAY, 12 * DAY))
+
+    def test_keeps_costs_of_outlier_dates_without_growing_days(self):
+        last_date = convert_date_string_to_timestamp("9999-12-31")
+
+        self.sut.add(last_date, 1, 4)
+        self.sut.add(last_date, 4, 3)
+        self.sut.build([(10, 1, 5), (last_date // DAY, 1, 4)])
+        self.sut.add(last_date + 100, 1, 1)
+        self.sut.add(-last_date, 2, 2)
+
+        self.assertEqual(1, self.sut._DailyTotals__costs.shape[1])
+        self.assertEqual(12, self.sut.get_total())
+        self.assertEqual(10, self.sut.get_total(None, None, 1))
+        self.assertEqual(5, self.sut.get_total(last_date))
+        self.assertEqual(7, self.sut.get_total(None, 100 * DAY))
+
+        self.sut.remove(last_date, 1, 5)
+
+        self.assertEqual(0, self.sut.get_total(last_date))
+
+    def test_starts_empty(self):
+        self.sut = DailyTotals()
+
+        self.assertEqual(0, self.sut.get_total())
+
+        self.sut.add(100, 1, 3)
+
+        self.assertEqual(3, self.sut.get_total(-10 * DAY, 10 * DAY))
+
+    def test_returns_date_range_of_whole_days(self):
+        self.assertEqual((DAY, 3 * DAY - 1),
+                         get_date_range("1970-01-02", "1970-01-03"))
+        self.assertEqual(DAY, get_date_range("1970-01-02")[0])
+        self.assertLess(get_date_range()[0], -DAY * 365 * 10000)
+
+        with self.assertRaises(ValueError):
+            get_date_range("1970-02-30")
+
+if __name__ == "__main__":
+    unittest.main()
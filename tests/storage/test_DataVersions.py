@@ -0,0 +1,23 @@
+import unittest
+
+from storage.DataVersions import DataVersions, CATEGORIES, EXPENSES, TAGS
+
+class TestDataVersions(unittest.TestCase):
+    def setUp(self):
+        self.sut = DataVersions("boot")
+
+    def test_starts_with_version_zero(self):
+        self.assertEqual(0, self.sut.get_version(EXPENSES))
+        self.assertEqual("boot-0-0", self.sut.get_etag(EXPENSES, TAGS))
+
+    def test_bumps_only_changed_tables(self):
+        self.sut.bump(EXPENSES)
+        self.sut.bump(EXPENSES, TAGS)
+
+        self.assertEqual(2, self.sut.get_version(EXPENSES))
+        self.assertEqual("boot-2-1-0", self.sut.get_etag(EXPENSES, TAGS, CATEGORIES))
+        self.assertEqual("boot-0", self.sut.get_etag(CATEGORIES))
+
+    def test_differs_between_processes(self):
+        self.assertNotEqual(DataVersions().get_etag(EXPENSES),
+                            DataVersions().get_etag(EXPENSES))
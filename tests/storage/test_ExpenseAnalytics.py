@@ -0,0 +1,70 @@
+import calendar
+import unittest
+
+from expense.Category import Category
+from storage.ExpenseAnalytics import (convert_rows_to_columns,
+                                      create_category_shares, create_trends,
+                                      validate_number_of_months)
+
+def get_timestamp(year, month, day=1):
+    return calendar.timegm((year, month, day, 0, 0, 0))
+
+class TestExpenseAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.categories = [Category(1, "Food")]
+        self.columns = convert_rows_to_columns([
+            (get_timestamp(2018, 3), 10, 1),
+            (get_timestamp(2019, 1), 20, 1),
+            (get_timestamp(2019, 2), 30, 2),
+            (get_timestamp(2019, 3), 40, 1),
+            (get_timestamp(2019, 3, 31), 5.5, 2)
+        ])
+
+    def test_creates_trends_with_history_before_period(self):
+        trends = create_trends(self.columns, self.categories, "2019-03", 3)
+
+        self.assertListEqual(["2019-01", "2019-02", "2019-03"], trends["months"])
+        self.assertListEqual([20, 30, 45.5], trends["totals"])
+        self.assertListEqual([6.67, 16.67, 31.83], trends["average_3"])
+        self.assertListEqual([2.5, 5, 7.96], trends["average_12"])
+        self.assertListEqual([20, 30, 35.5], trends["year_over_year"])
+        self.assertDictEqual({
+            "category": {"id": 1, "name": "Food"},
+            "totals": [20, 0, 40],
+            "average_3": [6.67, 6.67, 20],
+            "average_12": [2.5, 2.5, 5],
+            "year_over_year": [20, 0, 30]
+        }, trends["categories"][0])
+        self.assertDictEqual({"id": 2, "name": None},
+                             trends["categories"][1]["category"])
+
+    def test_creates_empty_trends_without_expenses(self):
+        trends = create_trends(convert_rows_to_columns([]), [], "2019-01", 2)
+
+        self.assertListEqual(["2018-12", "2019-01"], trends["months"])
+        self.assertListEqual([0, 0], trends["average_12"])
+        self.assertListEqual([], trends["categories"])
+
+    def test_creates_category_shares_the_most_expensive_first(self):
+        self.assertListEqual([{
+            "category": {"id": 1, "name": "Food"},
+            "total": 70,
+            "count": 3,
+            "share": 0.6635
+        }, {
+            "category": {"id": 2, "name": None},
+            "total": 35.5,
+            "count": 2,
+            "share": 0.3365
+        }], create_category_shares(self.columns, self.categories))
+        self.assertListEqual([], create_category_shares(
+            convert_rows_to_columns([]), self.categories))
+
+    def test_validates_number_of_months(self):
+        for number_of_months in [0, -1, "3", None]:
+            with self.subTest(number_of_months=number_of_months):
+                with self.assertRaisesRegex(ValueError, "InvalidArgument"):
+                    validate_number_of_months(number_of_months)
+
+if __name__ == "__main__":
+    unittest.main()
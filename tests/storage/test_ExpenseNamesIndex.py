@@ -0,0 +1,65 @@
+import unittest
+
+from storage.ExpenseNamesIndex import ExpenseNamesIndex
+
+class TestExpenseNamesIndex(unittest.TestCase):
+    def setUp(self):
+        self.sut = ExpenseNamesIndex()
+
+        self.sut.build([
+            ("Bread", "Food", 3),
+            ("Breakfast", "Food", 5),
+            ("Umbrella", "Clothes", 1),
+            ("Bread", "Bakery", 1)
+        ])
+
+    def test_finds_names_containing_fragment_the_most_used_first(self):
+        expected = [
+            {"name": "Breakfast", "category": "Food"},
+            {"name": "Bread", "category": "Food"},
+            {"name": "Bread", "category": "Bakery"},
+            {"name": "Umbrella", "category": "Clothes"}
+        ]
+
+        self.assertListEqual(expected, self.sut.search("re"))
+
+    def test_matches_case_insensitively(self):
+        self.assertListEqual([{"name": "Umbrella", "category": "Clothes"}],
+                             self.sut.search("UMBR"))
+
+    def test_limits_number_of_results(self):
+        self.assertListEqual([{"name": "Breakfast", "category": "Food"}],
+                             self.sut.search("b", 1))
+
+    def test_returns_empty_list_for_empty_or_unknown_fragment(self):
+        self.assertListEqual([], self.sut.search(""))
+        self.assertListEqual([], self.sut.search("xyz"))
+
+    def test_matches_escaped_category_names_of_database_with_model_names(self):
+        self.sut.build([("Pizza", "Food &amp; Drinks", 2)])
+        self.sut.add("Pizza", "Food & Drinks")
+        self.sut.remove("Pizza", "Food & Drinks", 3)
+
+        self.assertListEqual([], self.sut.search("pizza"))
+
+        self.sut.add("Pizza", "Food &amp; Drinks")
+
+        self.assertListEqual([{"name": "Pizza", "category": "Food & Drinks"}],
+                             self.sut.search("pizza"))
+        self.assertEqual(1, self.sut.get_count("Pizza", "Food & Drinks"))
+
+    def test_adding_pair_increases_its_rank(self):
+        self.sut.add("Bread", "Bakery", 10)
+
+        self.assertEqual({"name": "Bread", "category": "Bakery"},
+                         self.sut.search("bread")[0])
+        self.assertEqual(11, self.sut.get_count("Bread", "Bakery"))
+
+    def test_removing_last_usage_removes_pair(self):
+        self.sut.remove("Umbrella", "Clothes")
+
+        self.assertListEqual([], self.sut.search("umb"))
+        self.assertEqual(0, self.sut.get_count("Umbrella", "Clothes"))
+
+if __name__ == "__main__":
+    unittest.main()
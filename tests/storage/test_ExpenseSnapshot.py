@@ -0,0 +1,90 @@
+import unittest
+
+from expense.Category import Category
+from expense.Expense import Expense
+from expense.Tag import Tag
+from storage.ExpenseSnapshot import ExpenseSnapshot
+
+class TestExpenseSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.food = Category(1, "Food")
+        self.fuel = Category(2, "Fuel")
+        self.sut = ExpenseSnapshot()
+
+        self.assertTrue(self.sut.build([
+            (1, "Bread", 3, 100, 1),
+            (2, "Petrol", 50.5, 200, 2),
+            (3, "Milk &amp; eggs", 4, 200, 1),
+            (4, "Cheese", 10, 300, 1)
+        ], [(3, "Daily", "tag-1")], [self.food, self.fuel]))
+
+    def get_ids(self, first_date=None, last_date=None):
+        return [expense.get_expense_id()
+                for expense in self.sut.get_expenses(first_date, last_date)]
+
+    def test_returns_expenses_of_range_the_latest_first(self):
+        expenses = self.sut.get_expenses(150, 300)
+
+        self.assertListEqual([4, 3, 2], [e.get_expense_id() for e in expenses])
+        self.assertDictEqual({
+            "category": {"id": 1, "name": "Food"},
+            "cost": 4,
+            "date": "1970-01-01",
+            "id": 3,
+            "name": "Milk & eggs",
+            "tags": [{"id": "tag-1", "name": "Daily"}]
+        }, expenses[1].to_json())
+        self.assertEqual(50.5, expenses[2].get_cost())
+        self.assertListEqual([], self.get_ids(301, 400))
+
+    def test_returns_totals_of_range(self):
+        self.assertEqual(67.5, self.sut.get_total(0, 300))
+        self.assertEqual(54.5, self.sut.get_total(200, 200))
+        self.assertEqual(0, self.sut.get_total(400, 500))
+        self.assertDictEqual({1: 14, 2: 50.5},
+                             self.sut.get_category_totals(150, 300))
+
+        purchase_dates, costs, category_ids = self.sut.get_columns(200, 300)
+
+        self.assertListEqual([200, 200, 300], purchase_dates.tolist())
+        self.assertListEqual([50.5, 4, 10], costs.tolist())
+        self.assertListEqual([2, 1, 1], category_ids.tolist())
+
+    def test_applies_added_updated_and_deleted_expenses(self):
+        self.sut.add(Expense(5, "Tea", 2, 150, self.food, [Tag("tag-1", "Daily")]))
+        self.sut.remove(Expense(1, "Bread", 3, 100, self.food, []))
+        self.sut.remove(Expense(4, "Cheese", 10, 300, self.food, []))
+        self.sut.add(Expense(4, "Cheese", 12, 50, self.food, []))
+
+        self.assertTrue(self.sut.is_built())
+        self.assertListEqual([3, 2, 5, 4], self.get_ids())
+        self.assertEqual(68.5, self.sut.get_total(None, None))
+        self.assertListEqual([Tag("tag-1", "Daily")],
+                             self.sut.get_expenses(150, 150)[0].get_tags())
+
+    def test_replaces_tags_of_expense(self):
+        self.sut.set_tags(1, [Tag("tag-2", "Weekly")])
+        self.sut.set_tags(3, [])
+
+        self.assertTrue(self.sut.is_built())
+        self.assertListEqual([Tag("tag-2", "Weekly")],
+                             self.sut.get_expenses(100, 100)[0].get_tags())
+        self.assertListEqual([], self.sut.get_expenses(200, 200)[0].get_tags())
+
+    def test_becomes_stale_after_expense_it_cannot_add(self):
+        generation = self.sut.get_generation()
+
+        self.sut.add(Expense(None, "Tea", 2, 150, self.food, []))
+
+        self.assertFalse(self.sut.is_built())
+        self.assertFalse(self.sut.build([], [], [], generation))
+        self.assertTrue(self.sut.build([], [], [], self.sut.get_generation()))
+        self.assertListEqual([], self.get_ids())
+
+    def test_becomes_stale_after_expense_of_unknown_category(self):
+        self.sut.add(Expense(5, "Tea", 2, 150, Category(3, "Drinks"), []))
+
+        self.assertFalse(self.sut.is_built())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import calendar
+import unittest
+
+from storage.ExpenseSuggestionsJob import ExpenseSuggestionsJob
+from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
+from storage.SqliteDbQueryProvider import SqliteDbQueryProvider
+
+class TestExpenseSuggestionsJob(unittest.TestCase):
+    def setUp(self):
+        self.database_tables = {
+            "expenses": "expenses",
+            "categories": "categories",
+            "tags": "tags",
+            "expense_tags": "expense_tags",
+            "shops": "shops",
+            "suggestions": "expense_suggestions"
+        }
+
+        self.connection_provider = SqliteDatabaseConnectionProvider(
+            ":memory:", self.database_tables)
+        self.connection_provider.ensure_necessary_tables_exist()
+
+        self.sut = ExpenseSuggestionsJob(
+            self.connection_provider, SqliteDbQueryProvider(self.database_tables))
+
+    def add_expenses(self, name, cost, dates):
+        for year, month in dates:
+            self.connection_provider.execute_query(
+                "INSERT INTO expenses (name, cost, purchase_date, category_id) " \
+                "VALUES (?, ?, ?, 1)",
+                (name, cost, calendar.timegm((year, month, 1, 0, 0, 0))))
+
+    def get_suggestions(self):
+        return self.connection_provider.execute_query(
+            "SELECT name, cost, months FROM expense_suggestions ORDER BY name")
+
+    def test_replaces_only_changed_suggestions(self):
+        self.connection_provider.execute_query(
+            "INSERT INTO expense_suggestions (name, category_id, cost, months) " \
+            "VALUES ('Manual', 1, 1, '1'), ('Tax', 1, 100, '3')")
+        self.add_expenses("Tax", 100, [(2018, 3), (2019, 3)])
+        self.add_expenses("Insurance", 300, [(2018, 5), (2019, 5)])
+
+        self.assertEqual((1, 0, 1), self.sut.run(2019))
+        self.assertListEqual([("Insurance", 300, "5"), ("Tax", 100, "3")],
+                             self.get_suggestions())
+
+        self.add_expenses("Tax", 120, [(2019, 9), (2018, 9)])
+
+        self.assertEqual((0, 1, 0), self.sut.run(2019))
+        self.assertListEqual([("Insurance", 300, "5"), ("Tax", 120, "3,9")],
+                             self.get_suggestions())
+        self.assertEqual((0, 0, 0), self.sut.run(2019))
+
+if __name__ == "__main__":
+    unittest.main()
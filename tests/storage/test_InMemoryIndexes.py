@@ -0,0 +1,36 @@
+import threading
+import time
+import unittest
+
+from expense.Category import Category
+from storage.InMemoryIndexes import InMemoryIndexes
+
+class SlowSnapshotRetriever:
+    def __init__(self):
+        self.calls = 0
+
+    def retrieve_expense_snapshot_rows(self):
+        self.calls += 1
+        time.sleep(0.05)
+
+        return [(1, "Bread", 3, 100, 1)], [], [Category(1, "Food")]
+
+class TestInMemoryIndexes(unittest.TestCase):
+    def test_reloads_expense_snapshot_once_for_concurrent_readers(self):
+        sut = InMemoryIndexes(expense_snapshot_enabled=True)
+        retriever = SlowSnapshotRetriever()
+        snapshots = []
+        threads = [threading.Thread(target=lambda: snapshots.append(
+            sut.ensure_expense_snapshot_built(retriever))) for _ in range(5)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, retriever.calls)
+        self.assertListEqual([sut.get_expense_snapshot()] * 5, snapshots)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import json
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from expense.Category import Category
+from expense.Expense import Expense
+from expense.Tag import Tag
+from storage.InMemoryIndexes import InMemoryIndexes
+from storage.MariaDbExpensesPersister import BULK_INSERT_ROWS, MariaDbExpensesPersister
+
+class FakeTransaction:
+    """Assigns auto-increment ids to inserted Expenses like MariaDb does"""
+
+    def __init__(self):
+        self.next_id = 1
+        self.last_insert_id = None
+        self.autoinc_lock_mode = 1
+        self.auto_increment_increment = 1
+        self.inserts_count = 0
+        self.tags = {}
+        self.links = []
+
+    def execute_query(self, query, params=()):
+        if query.startswith("INSERT INTO expenses"):
+            self.inserts_count += 1
+            self.last_insert_id = self.next_id
+            self.next_id += query.count("(?") * self.auto_increment_increment
+        elif query == "SELECT LAST_INSERT_ID()":
+            return [(self.last_insert_id,)]
+        elif "@@innodb_autoinc_lock_mode" in query:
+            return [(self.autoinc_lock_mode, self.auto_increment_increment)]
+        elif "JSON_CONTAINS" in query:
+            return [(name, self.tags[name]) for name in json.loads(params[0])
+                    if name in self.tags]
+
+        return []
+
+    def execute_many(self, query, params_list):
+        if query.startswith("INSERT IGNORE INTO tags"):
+            for tag_id, name in params_list:
+                if name not in self.tags and tag_id not in self.tags.values():
+                    self.tags[name] = tag_id
+        elif query.startswith("INSERT IGNORE INTO expense_tags"):
+            self.links.extend(params_list)
+
+    def get_last_row_id(self):
+        return self.last_insert_id
+
+class FakeConnectionProvider:
+    def __init__(self):
+        self.fake_transaction = FakeTransaction()
+
+    def execute_query(self, query, params=()):
+        return self.fake_transaction.execute_query(query, params)
+
+    @contextmanager
+    def transaction(self):
+        yield self.fake_transaction
+
+class TestMariaDbExpensesPersister(unittest.TestCase):
+    def setUp(self):
+        self.connection_provider = FakeConnectionProvider()
+        self.in_memory_indexes = InMemoryIndexes(expense_snapshot_enabled=False)
+        self.sut = MariaDbExpensesPersister(
+            {"expenses": "expenses", "categories": "categories"},
+            self.connection_provider, in_memory_indexes=self.in_memory_indexes)
+
+    @patch('builtins.print')
+    def test_adds_expenses_with_tags_in_bulk(self, _mock_print):
+        self.connection_provider.fake_transaction.tags["first tag"] = "existing-id"
+        category = Category("1", "Food")
+        expenses = [Expense(None, "Bread {}".format(index), 3, 1566172800,
+                            category, [Tag("id-1", "first tag")])
+                    for index in range(BULK_INSERT_ROWS)]
+        expenses.append(Expense(None, "Eggs", 5, 1563494400, category,
+                                [Tag("existing-id", "other tag")]))
+
+        with patch.object(self.in_memory_indexes, "on_expense_added") as on_added:
+            expense_ids = self.sut.add_expenses(expenses)
+
+        added = [call.args[0] for call in on_added.call_args_list]
+        tags = self.connection_provider.fake_transaction.tags
+
+        self.assertListEqual(list(range(1, BULK_INSERT_ROWS + 2)), expense_ids)
+        self.assertListEqual(expense_ids, [e.get_expense_id() for e in added])
+        self.assertEqual(1, added[0].get_category().get_category_id())
+        self.assertNotEqual("existing-id", tags["other tag"])
+        self.assertIn((BULK_INSERT_ROWS + 1, tags["other tag"]),
+                      self.connection_provider.fake_transaction.links)
+        self.assertIn((1, "existing-id"),
+                      self.connection_provider.fake_transaction.links)
+        self.assertListEqual([Tag(tags["other tag"], "other tag")],
+                             added[-1].get_tags())
+        self.assertEqual(2, self.connection_provider.fake_transaction.inserts_count)
+
+    @patch('builtins.print')
+    def test_adds_expenses_one_by_one_without_consecutive_ids(self, _mock_print):
+        fake_transaction = self.connection_provider.fake_transaction
+        category = Category("1", "Food")
+        expenses = [Expense(None, "Bread {}".format(index), 3, 1566172800,
+                            category, []) for index in range(3)]
+
+        for lock_mode, increment, expected_ids in [(2, 1, [1, 2, 3]),
+                                                   (1, 2, [4, 6, 8])]:
+            with self.subTest(lock_mode=lock_mode, increment=increment):
+                fake_transaction.autoinc_lock_mode = lock_mode
+                fake_transaction.auto_increment_increment = increment
+                fake_transaction.inserts_count = 0
+
+                self.assertListEqual(expected_ids, self.sut.add_expenses(expenses))
+                self.assertEqual(3, fake_transaction.inserts_count)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from date_utils import get_month_of_timestamp, get_months_between
+from storage.MonthsIndex import MonthsIndex
+
+class TestMonthsIndex(unittest.TestCase):
+    def setUp(self):
+        self.current_month = "2019-08"
+        self.sut = MonthsIndex(lambda: self.current_month)
+
+    def test_lists_months_between_across_years(self):
+        self.assertListEqual(["2018-11", "2018-12", "2019-01"],
+                             get_months_between("2018-11", "2019-01"))
+
+    def test_returns_month_of_timestamp(self):
+        self.assertEqual("2019-08", get_month_of_timestamp(1566172800))
+
+    def test_lists_current_month_when_empty(self):
+        self.assertListEqual(["2019-08"], self.sut.get_months())
+
+    def test_lists_months_from_earliest_one_until_current_month(self):
+        self.sut.build([("2019-07", 2), ("2019-05", 1)])
+
+        self.assertListEqual(["2019-05", "2019-06", "2019-07", "2019-08"],
+                             self.sut.get_months())
+        self.assertListEqual([
+            {"month": "2019-05", "count": 1},
+            {"month": "2019-06", "count": 0},
+            {"month": "2019-07", "count": 2},
+            {"month": "2019-08", "count": 0}
+        ], self.sut.get_month_counts())
+
+    def test_follows_changes_of_earliest_month(self):
+        self.sut.build([("2019-07", 1)])
+
+        self.sut.add("2019-06")
+        self.assertEqual("2019-06", self.sut.get_months()[0])
+
+        self.sut.add("2019-06")
+        self.sut.remove("2019-06")
+        self.assertEqual("2019-06", self.sut.get_months()[0])
+
+        self.sut.remove("2019-06")
+        self.assertEqual("2019-07", self.sut.get_months()[0])
+
+    def test_extends_months_when_current_month_rolls_over(self):
+        self.sut.build([("2019-07", 1)])
+        self.sut.get_months()
+
+        self.current_month = "2019-09"
+
+        self.assertListEqual(["2019-07", "2019-08", "2019-09"],
+                             self.sut.get_months())
+
+if __name__ == "__main__":
+    unittest.main()
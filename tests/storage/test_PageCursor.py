@@ -0,0 +1,31 @@
+import unittest
+
+from storage.PageCursor import (decode_page_cursor, encode_page_cursor,
+                                validate_page_size)
+
+class TestPageCursor(unittest.TestCase):
+    def test_decodes_encoded_cursor(self):
+        cursor = encode_page_cursor(1566172800, 42)
+
+        self.assertEqual((1566172800, 42), decode_page_cursor(cursor))
+
+    def test_rejects_malformed_cursors(self):
+        for cursor in [None, "", "not base64!", encode_page_cursor("x", 1),
+                       "WzFd"]:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError) as cm:
+                    decode_page_cursor(cursor)
+
+                self.assertRegex(str(cm.exception), "InvalidArgument:.*cursor")
+
+    def test_validates_page_size(self):
+        for page_size in [None, 0, -5, "10", True]:
+            with self.subTest(page_size=page_size):
+                with self.assertRaises(ValueError) as cm:
+                    validate_page_size(page_size)
+
+                self.assertRegex(str(cm.exception),
+                                 "InvalidArgument:.*page_size")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from storage.DataVersions import DataVersions, CATEGORIES, EXPENSES
+from storage.QueryCache import QueryCache
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.data_versions = DataVersions("boot")
+        self.sut = QueryCache(self.data_versions, max_items=4)
+        self.loads = 0
+
+    def load(self, result):
+        def load():
+            self.loads += 1
+
+            return result
+
+        return load
+
+    def test_returns_cached_result_until_table_is_changed(self):
+        self.assertEqual([1, 2], self.sut.get("m", (), (EXPENSES,), self.load([1, 2])))
+        self.assertEqual([1, 2], self.sut.get("m", (), (EXPENSES,), self.load([3])))
+        self.assertEqual(1, self.loads)
+
+        self.data_versions.bump(EXPENSES)
+
+        self.assertEqual([3], self.sut.get("m", (), (EXPENSES,), self.load([3])))
+        self.assertEqual(2, self.loads)
+
+    def test_keys_results_by_arguments(self):
+        self.sut.get("m", ("a",), (EXPENSES,), self.load(1))
+        self.sut.get("m", ("b",), (EXPENSES,), self.load(2))
+
+        self.assertEqual(1, self.sut.get("m", ("a",), (EXPENSES,), self.load(3)))
+        self.assertEqual(2, self.loads)
+
+    def test_invalidates_results_of_changed_tables(self):
+        self.sut.get("expenses", (), (EXPENSES, CATEGORIES), self.load([1]))
+        self.sut.get("categories", (), (CATEGORIES,), self.load([2]))
+        self.sut.get("other", (), (EXPENSES,), self.load([3]))
+
+        self.sut.invalidate(CATEGORIES)
+
+        stats = self.sut.get_stats()
+        self.assertEqual(2, stats["invalidations"])
+        self.assertEqual(1, stats["entries"])
+
+    def test_evicts_least_recently_used_results_over_items_limit(self):
+        self.sut.get("a", (), (EXPENSES,), self.load([1, 2]))
+        self.sut.get("b", (), (EXPENSES,), self.load([3, 4]))
+        self.sut.get("a", (), (EXPENSES,), self.load([]))
+        self.sut.get("c", (), (EXPENSES,), self.load([5]))
+
+        self.assertEqual([1, 2], self.sut.get("a", (), (EXPENSES,), self.load([])))
+        self.assertEqual([], self.sut.get("b", (), (EXPENSES,), self.load([])))
+        self.assertDictEqual({"hits": 2, "misses": 4, "evictions": 1,
+                              "invalidations": 0, "entries": 3, "items": 3,
+                              "max_items": 4}, self.sut.get_stats())
+
+    def test_caches_iterated_items_once_all_are_read(self):
+        partial = self.sut.iterate("m", (), (EXPENSES,), lambda: iter([1, 2, 3]))
+        next(partial)
+        partial.close()
+
+        self.assertEqual([1, 2, 3], list(
+            self.sut.iterate("m", (), (EXPENSES,), lambda: iter([1, 2, 3]))))
+        self.assertEqual([1, 2, 3], list(
+            self.sut.iterate("m", (), (EXPENSES,), lambda: iter([]))))
+
+    def test_does_not_cache_results_over_items_limit(self):
+        self.assertEqual(5, len(list(
+            self.sut.iterate("m", (), (EXPENSES,), lambda: iter(range(5))))))
+        self.assertEqual([], list(
+            self.sut.iterate("m", (), (EXPENSES,), lambda: iter([]))))
+
+    def test_returns_copies_of_cached_lists(self):
+        self.sut.get("m", (), (EXPENSES,), self.load([1])).append(2)
+
+        self.assertEqual([1], self.sut.get("m", (), (EXPENSES,), self.load([])))
@@ -0,0 +1,60 @@
+import calendar
+import unittest
+
+from storage.RecurringExpenses import (convert_rows_to_columns,
+                                       detect_recurring_expenses)
+
+def get_timestamp(year, month, day=1):
+    return calendar.timegm((year, month, day, 0, 0, 0))
+
+class TestRecurringExpenses(unittest.TestCase):
+    def detect(self, rows, reference_year=2019):
+        return detect_recurring_expenses(*convert_rows_to_columns(rows),
+                                         reference_year)
+
+    def test_returns_nothing_without_expenses(self):
+        self.assertListEqual([], self.detect([]))
+
+    def test_detects_monthly_and_yearly_expenses_with_their_latest_cost(self):
+        rows = []
+
+        for year in range(2015, 2020):
+            rows += [("Rent", 1, 500 + year, get_timestamp(year, month))
+                     for month in range(1, 13)]
+            rows.append(("Insurance", 2, 300, get_timestamp(year, 5, 10)))
+
+        self.assertListEqual([
+            ("Insurance", 2, 300, [5]),
+            ("Rent", 1, 2519, list(range(1, 13)))
+        ], self.detect(rows))
+
+    def test_requires_purchases_in_most_years_since_the_first_one(self):
+        rows = [("Tax", 1, 100, get_timestamp(year, 3))
+                for year in [2012, 2015, 2019]]
+        rows += [("Fee", 1, 10, get_timestamp(year, 4))
+                 for year in [2016, 2018, 2019]]
+
+        self.assertListEqual([("Fee", 1, 10, [4])], self.detect(rows))
+
+    def test_skips_expenses_not_bought_recently(self):
+        rows = [("Old", 1, 1, get_timestamp(year, 7)) for year in [2014, 2015]]
+        rows.append(("Rent", 1, 1, get_timestamp(2019, 7)))
+
+        self.assertListEqual([], self.detect(rows))
+
+    def test_counts_years_up_to_the_reference_year(self):
+        rows = [("Rent", 1, 1, get_timestamp(year, 7)) for year in [2018, 2019]]
+        rows += [("Tax", 1, 1, get_timestamp(year, 3)) for year in [2016, 2017]]
+
+        self.assertListEqual([("Rent", 1, 1, [7])], self.detect(rows, 2020))
+        self.assertListEqual([], self.detect(rows, 2023))
+
+    def test_separates_categories_of_the_same_name(self):
+        rows = [("Gift", category_id, 5, get_timestamp(year, 12))
+                for year in [2018, 2019] for category_id in [1, 2]]
+
+        self.assertListEqual([("Gift", 1, 5, [12]), ("Gift", 2, 5, [12])],
+                             self.detect(rows))
+
+if __name__ == "__main__":
+    unittest.main()
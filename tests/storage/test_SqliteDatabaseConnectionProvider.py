@@ -1,7 +1,11 @@
+import os
 import re
+import tempfile
+import threading
 import unittest
 from expense.Tag import Tag
-from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
+from storage.SqliteDatabaseConnectionProvider import (
+    SqliteDatabaseConnectionProvider, get_used_indexes)
 from tests.TestValidationUtils import validate_dict, validate_non_empty_string
 
 class TestSqliteDatabaseConnectionProvider(unittest.TestCase):
@@ -71,6 +75,127 @@ class TestSqliteDatabaseConnectionProvider(unittest.TestCase):
     def test_ensures_shops_table_exists_in_database(self):
         self.__check_if_table_exists(self.database_tables["shops"])
 
+    def test_ensures_necessary_indexes_exist_in_database(self):
+        self.sut.ensure_necessary_tables_exist()
+
+        rows = self.sut.execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")
+        index_names = [row[0] for row in rows]
+
+        for name, _table, _columns, _unique in self.sut.get_necessary_indexes():
+            with self.subTest(index=name):
+                self.assertIn(name, index_names)
+
+    def test_recreates_index_with_changed_definition(self):
+        self.sut.ensure_necessary_tables_exist()
+        self.sut.execute_query("DROP INDEX expenses_purchase_date_idx")
+        self.sut.execute_query("CREATE INDEX expenses_purchase_date_idx " \
+                               "ON expenses (cost)")
+
+        self.sut.ensure_necessary_indexes_exist()
+
+        rows = self.sut.execute_query(
+            "PRAGMA index_info(expenses_purchase_date_idx)")
+
+        self.assertEqual(["purchase_date"], [row[2] for row in rows])
+
+    def test_removes_duplicated_expense_tags_before_creating_unique_index(self):
+        self.sut.ensure_necessary_tables_exist()
+        self.sut.execute_query("DROP INDEX expense_tags_expense_id_tag_id_idx")
+        self.sut.execute_query("INSERT INTO expense_tags VALUES " \
+                               "('1', 'tag-1'), ('1', 'tag-1'), ('1', 'tag-2')")
+
+        self.sut.ensure_necessary_indexes_exist()
+
+        self.assertEqual([(2,)], self.sut.execute_query(
+            "SELECT COUNT(*) FROM expense_tags"))
+
+    def test_merges_tags_with_duplicated_names_before_creating_unique_index(self):
+        self.sut.ensure_necessary_tables_exist()
+        self.sut.execute_query("DROP INDEX tags_name_idx")
+        self.sut.execute_query("INSERT INTO tags (tag_id, name) VALUES " \
+                               "('tag-1', 'work'), ('tag-2', 'work'), " \
+                               "('tag-3', 'home'), ('tag-4', 'work')")
+        self.sut.execute_query("INSERT INTO expense_tags VALUES " \
+                               "('1', 'tag-1'), ('1', 'tag-2'), ('2', 'tag-4'), " \
+                               "('2', 'tag-3')")
+
+        self.sut.ensure_necessary_indexes_exist()
+
+        self.assertEqual([("tag-1", "work"), ("tag-3", "home")],
+                         self.sut.execute_query(
+                             "SELECT tag_id, name FROM tags ORDER BY rowid"))
+        self.assertEqual([("1", "tag-1"), ("2", "tag-1"), ("2", "tag-3")],
+                         self.sut.execute_query(
+                             "SELECT expense_id, tag_id FROM expense_tags " \
+                             "ORDER BY expense_id, tag_id"))
+        self.assertEqual([(1,)], self.sut.execute_query(
+            "SELECT \"unique\" FROM pragma_index_list('tags') " \
+            "WHERE name = 'tags_name_idx'"))
+
+    def test_explains_which_indexes_a_query_uses(self):
+        self.sut.ensure_necessary_tables_exist()
+
+        plan = self.sut.explain_query_plan(
+            "SELECT * FROM expenses WHERE purchase_date BETWEEN ? AND ?",
+            (0, 100))
+
+        self.assertEqual(["expenses_purchase_date_idx"], get_used_indexes(plan))
+
+    def test_records_query_plans_of_executed_queries(self):
+        self.sut.ensure_necessary_tables_exist()
+
+        with self.sut.recording_query_plans() as query_plans:
+            self.sut.execute_query("SELECT * FROM tags WHERE name = ?", ("x",))
+            self.sut.execute_query("DELETE FROM tags")
+
+        self.assertEqual(1, len(query_plans))
+        self.assertEqual(["tags_name_idx"], get_used_indexes(query_plans[0][1]))
+
+    def test_iterates_query_rows_in_batches(self):
+        self.sut.execute_query("CREATE TABLE numbers (value INTEGER)")
+        self.sut.execute_query("INSERT INTO numbers VALUES (1), (2), (3)")
+
+        rows = self.sut.iterate_query("SELECT value FROM numbers " \
+                                      "ORDER BY value", batch_size=2)
+
+        self.assertListEqual([(1,), (2,), (3,)], list(rows))
+
+    def test_releases_connection_of_closed_iteration(self):
+        self.sut.execute_query("CREATE TABLE numbers (value INTEGER)")
+        self.sut.execute_query("INSERT INTO numbers VALUES (1), (2), (3)")
+
+        rows = self.sut.iterate_query("SELECT value FROM numbers", batch_size=1)
+
+        next(rows)
+        rows.close()
+
+        self.assertEqual([(3,)],
+                         self.sut.execute_query("SELECT COUNT(*) FROM numbers"))
+
+    def test_executes_queries_from_multiple_threads(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.database_path = os.path.join(directory, "expenses.db")
+            sut = self.create()
+            sut.execute_query("CREATE TABLE numbers (value INTEGER)")
+
+            def insert_numbers():
+                for value in range(20):
+                    sut.execute_query("INSERT INTO numbers VALUES (?)", (value,))
+
+            threads = [threading.Thread(target=insert_numbers) for _ in range(4)]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual([(80,)],
+                             sut.execute_query("SELECT COUNT(*) FROM numbers"))
+
+            sut.close()
+
     def __check_if_table_exists(self, table_name):
         query = "PRAGMA table_info('{}')".format(table_name)
 
@@ -0,0 +1,58 @@
+import unittest
+
+from storage.DbQueryProvider import DbQueryType
+from storage.MariaDbQueryProvider import MariaDbQueryProvider
+from storage.SqliteDatabaseConnectionProvider import (
+    SqliteDatabaseConnectionProvider, get_statement_cache_size)
+from storage.SqliteDbQueryProvider import SqliteDbQueryProvider
+
+class TestSqliteDbQueryProvider(unittest.TestCase):
+    def setUp(self):
+        self.database_tables = {
+            "expenses": "my_expenses",
+            "categories": "my_categories",
+            "tags": "my_tags",
+            "expense_tags": "my_expense_tags",
+            "shops": "my_shops",
+            "suggestions": "my_suggestions",
+            "monthly_totals": "my_monthly_totals"
+        }
+
+        self.sut = SqliteDbQueryProvider(self.database_tables)
+
+    def test_formats_table_names_into_queries(self):
+        query = self.sut.create_query(DbQueryType.SAVE_EXPENSE)
+
+        self.assertRegex(query, "^INSERT INTO my_expenses ")
+
+    def test_all_queries_compile_against_the_schema(self):
+        connection_provider = SqliteDatabaseConnectionProvider(
+            ":memory:", self.database_tables)
+        connection_provider.ensure_necessary_tables_exist()
+
+        for query_type in self.sut.get_query_templates():
+            with self.subTest(query_type=query_type):
+                query = self.sut.create_query(query_type)
+
+                connection_provider.execute_query(
+                    "EXPLAIN " + query, (None,) * query.count("?"))
+
+    def test_updates_expense_without_returning_clause_on_old_sqlite(self):
+        sut = SqliteDbQueryProvider(self.database_tables, False)
+
+        self.assertFalse(sut.is_returning_supported())
+        self.assertNotIn("RETURNING", sut.create_query(DbQueryType.UPDATE_EXPENSE))
+        self.assertEqual(self.sut.get_queries_count(), sut.get_queries_count())
+
+    def test_statement_cache_fits_the_catalog(self):
+        self.assertEqual(len(self.sut.get_query_templates()),
+                         self.sut.get_queries_count())
+        self.assertGreater(get_statement_cache_size(self.sut.get_queries_count()),
+                           self.sut.get_queries_count())
+
+    def test_raises_for_queries_missing_in_the_catalog(self):
+        with self.assertRaises(NotImplementedError):
+            MariaDbQueryProvider().create_query(DbQueryType.SELECT_TAGS)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,9 @@ from expense.Category import Category
 from expense.Expense import Expense
 from expense.Tag import Tag
 from expense.Shop import Shop
+from storage.InMemoryIndexes import InMemoryIndexes
 from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
+from storage.SqliteDbQueryProvider import SqliteDbQueryProvider
 from storage.SqliteExpensesPersister import SqliteExpensesPersister
 from storage.SqliteExpensesRetriever import SqliteExpensesRetriever
 
@@ -163,6 +165,159 @@ class TestSqliteExpensesPersister(unittest.TestCase):
 
         self.assertListEqual(tags, retriever.retrieve_tags())
 
+    def test_replaces_expense_tag_relations(self):
+        category = Category("category-id-1", "Some Category")
+        expense = Expense("expense-id-1", "TEST", 1, 1566172800, category,
+                          [Tag("id-1", "first tag"), Tag("id-2", "other tag")])
+        changed_expense = Expense("expense-id-1", "TEST", 1, 1566172800,
+                                  category, [Tag("id-3", "other tag"),
+                                             Tag("id-4", "third tag")])
+
+        self.sut.persist_expense_tags(expense)
+        self.sut.persist_expense_tags(changed_expense)
+
+        rows = self.connection_provider.execute_query("SELECT tag_id " \
+            "FROM {} ORDER BY tag_id".format(self.expense_tags_table_name))
+
+        self.assertListEqual([("id-2",), ("id-4",)], rows)
+
+    def test_persists_tag_with_id_taken_by_other_name_under_new_id(self):
+        self.connection_provider.execute_query("INSERT INTO {} (tag_id, name)" \
+            " VALUES ('id-1', 'first tag')".format(self.tags_table_name))
+
+        result = self.sut.persist_tags([Tag("id-1", "other tag")])
+
+        self.assertEqual("other tag", result[0].get_name())
+        self.assertNotEqual("id-1", result[0].get_tag_id())
+
+    @patch('builtins.print')
+    def test_updates_expense_and_returns_it_with_category_and_tags(self, _mock_print):
+        self.connection_provider.execute_query(
+            "INSERT INTO {} (category_id, name) VALUES (1, 'Food'), " \
+            "(2, 'Fuel')".format(self.categories_table_name))
+
+        in_memory_indexes = InMemoryIndexes()
+        retriever = SqliteExpensesRetriever(self.database_tables,
+                                            self.connection_provider)
+        in_memory_indexes.ensure_built(retriever)
+        self.sut = SqliteExpensesPersister(self.database_tables,
+                                           self.connection_provider, None,
+                                           in_memory_indexes)
+
+        expense_id = self.sut.add_expense(Expense(
+            None, "Bread", 3, 1566172800, Category(1, "Food"),
+            [Tag("id-1", "first tag")]))
+
+        expense = self.sut.update_expense(expense_id, {
+            "name": "Petrol", "date": "2019-07-19", "category": {"id": 2}})
+
+        self.assertEqual("Petrol", expense.get_name())
+        self.assertEqual("2019-07-19", expense.get_purchase_date_string())
+        self.assertEqual("Fuel", expense.get_category().get_name())
+        self.assertListEqual(["id-1"], [t.get_tag_id() for t in expense.get_tags()])
+        self.assertEqual(expense.to_json(),
+                         retriever.retrieve_expense(expense_id).to_json())
+
+        names_index = in_memory_indexes.get_expense_names_index()
+
+        self.assertEqual(0, names_index.get_count("Bread", "Food"))
+        self.assertEqual(1, names_index.get_count("Petrol", "Fuel"))
+
+    @patch('builtins.print')
+    def test_updates_expense_without_returning_clause(self, _mock_print):
+        self.connection_provider.execute_query(
+            "INSERT INTO {} (category_id, name) VALUES (1, 'Food'), " \
+            "(2, 'Fuel')".format(self.categories_table_name))
+        self.sut = SqliteExpensesPersister(
+            self.database_tables, self.connection_provider,
+            SqliteDbQueryProvider(self.database_tables, False))
+
+        expense_id = self.sut.add_expense(Expense(
+            None, "Bread", 3, 1566172800, Category(1, "Food"),
+            [Tag("id-1", "first tag")]))
+
+        expense = self.sut.update_expense(expense_id, {
+            "name": "Petrol", "category": {"id": 2}})
+
+        self.assertEqual("Petrol", expense.get_name())
+        self.assertEqual(3, expense.get_cost())
+        self.assertEqual("Fuel", expense.get_category().get_name())
+        self.assertListEqual(["id-1"], [t.get_tag_id() for t in expense.get_tags()])
+        self.assertIsNone(self.sut.update_expense(expense_id + 1, {"name": "Tea"}))
+
+    def test_rejects_changes_of_unknown_fields(self):
+        with self.assertRaises(ValueError) as cm:
+            self.sut.update_expense(1, {"expense_id": 2})
+
+        self.assertRegex(str(cm.exception), "InvalidArgument:.*expense_id")
+
+    def test_does_not_update_missing_expense(self):
+        self.assertIsNone(self.sut.update_expense(1, {"name": "Bread"}))
+
+    @patch('builtins.print')
+    def test_adds_expenses_with_tags_in_bulk(self, _mock_print):
+        self.connection_provider.execute_query(
+            "INSERT INTO {} (category_id, name) VALUES (1, 'Food')".format(
+                self.categories_table_name))
+        self.connection_provider.execute_query(
+            "INSERT INTO {} (tag_id, name) VALUES ('existing-id', 'first tag')"
+            .format(self.tags_table_name))
+
+        category = Category(1, "Food")
+        expenses = [
+            Expense(None, "Bread", 3, 1566172800, category,
+                    [Tag("id-1", "first tag"), Tag("id-2", "other tag")]),
+            Expense(None, "Milk", 2, 1566259200, category, []),
+            Expense(None, "Eggs", 5, 1563494400, category,
+                    [Tag("id-3", "other tag")])
+        ]
+
+        expense_ids = self.sut.add_expenses(expenses)
+
+        retriever = SqliteExpensesRetriever(self.database_tables,
+                                            self.connection_provider)
+        added = [retriever.retrieve_expense(expense_id)
+                 for expense_id in expense_ids]
+
+        self.assertListEqual(["Bread", "Milk", "Eggs"],
+                             [expense.get_name() for expense in added])
+        self.assertListEqual(["existing-id", "id-2"],
+                             [tag.get_tag_id() for tag in added[0].get_tags()])
+        self.assertListEqual(["id-2"],
+                             [tag.get_tag_id() for tag in added[2].get_tags()])
+        self.assertEqual(2, len(retriever.retrieve_tags()))
+
+    @patch('builtins.print')
+    def test_keeps_expense_snapshot_built_after_writes_from_json(self, _mock_print):
+        self.connection_provider.execute_query(
+            "INSERT INTO {} (category_id, name) VALUES (1, 'Food &amp; Drinks')"
+            .format(self.categories_table_name))
+
+        in_memory_indexes = InMemoryIndexes()
+        retriever = SqliteExpensesRetriever(self.database_tables,
+                                            self.connection_provider,
+                                            in_memory_indexes)
+        in_memory_indexes.ensure_built(retriever)
+        self.sut = SqliteExpensesPersister(self.database_tables,
+                                           self.connection_provider, None,
+                                           in_memory_indexes)
+
+        expense_id = self.sut.add_expense(Expense.from_json({
+            "name": "Bread", "cost": 3, "date": "2019-08-19",
+            "category": {"id": "1", "name": "Food & Drinks"}, "tags": []}))
+        self.sut.persist_expense_tags(Expense(
+            str(expense_id), "Bread", 3, 1566172800, Category("1", None),
+            [Tag("id-1", "first tag")]))
+
+        snapshot = in_memory_indexes.get_expense_snapshot()
+        expenses = snapshot.get_expenses(None, None)
+
+        self.assertTrue(snapshot.is_built())
+        self.assertDictEqual(
+            SqliteExpensesRetriever(self.database_tables, self.connection_provider)
+            .retrieve_expense(expense_id).to_json(),
+            expenses[0].to_json())
+
     @patch('builtins.print')
     def test_persists_shops(self, _mock_print):
         self.sut = self.create()
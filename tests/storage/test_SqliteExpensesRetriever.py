@@ -5,6 +5,7 @@ from unittest.mock import patch
 from expense.Category import Category
 from expense.Expense import Expense
 from expense.Tag import Tag
+from storage.InMemoryIndexes import InMemoryIndexes
 from storage.SqliteDatabaseConnectionProvider import SqliteDatabaseConnectionProvider
 from storage.SqliteExpensesPersister import SqliteExpensesPersister
 from storage.SqliteExpensesRetriever import SqliteExpensesRetriever
@@ -93,15 +94,17 @@ class TestSqliteExpensesRetriever(unittest.TestCase):
             )
 
         validate_provided(validate_existence)
-        validate_object_with_methods(self, ["execute_query"], validate_methods)
+        validate_object_with_methods(self, ["execute_query", "iterate_query"],
+                                     validate_methods)
 
     def test_retrieve_common_expense_cost_value_if_frequent(self):
         self.sut = self.create()
 
-        query = "INSERT INTO {} (name, cost) VALUES " \
-            "('TEST', 4), ('TEST', 3), ('TEST', 4), ('TEST', 4), " \
-            "('OTHER', 2), ('OTHER', 2), " \
-            "('TEST', 1), ('TEST', 1), ('TEST', 4), ('TEST', 4)".format(
+        query = "INSERT INTO {} (name, cost, purchase_date, category_id) " \
+            "VALUES ('TEST', 4, 0, 1), ('TEST', 3, 0, 1), ('TEST', 4, 0, 1), " \
+            "('TEST', 4, 0, 1), ('OTHER', 2, 0, 1), ('OTHER', 2, 0, 1), " \
+            "('TEST', 1, 0, 1), ('TEST', 1, 0, 1), ('TEST', 4, 0, 1), " \
+            "('TEST', 4, 0, 1)".format(
                 self.expenses_table_name
             )
 
@@ -109,12 +112,86 @@ class TestSqliteExpensesRetriever(unittest.TestCase):
 
         self.assertEqual(self.sut.retrieve_common_expense_cost("TEST"), 4)
 
+    def test_retrieves_expense_cost_statistics_with_and_without_indexes(self):
+        query = "INSERT INTO {} (name, cost, purchase_date, category_id) " \
+            "VALUES ('Test', 4, 10, 1), ('TEST', 3, 30, 1), ('Test', 4, 20, 1), " \
+            "('Test_', 9, 40, 1)".format(self.expenses_table_name)
+
+        self.connection_provider.execute_query(query)
+
+        in_memory_indexes = InMemoryIndexes()
+        indexed_retriever = SqliteExpensesRetriever(
+            self.database_tables, self.connection_provider, in_memory_indexes)
+
+        in_memory_indexes.ensure_built(indexed_retriever)
+
+        expected = {"count": 3, "modal_cost": 4, "modal_count": 2,
+                    "last_cost": 3, "median_cost": 4, "min_cost": 3,
+                    "max_cost": 4}
+
+        self.assertDictEqual(expected,
+                             self.sut.retrieve_expense_cost_statistics("test"))
+        self.assertDictEqual(expected,
+                             indexed_retriever.retrieve_expense_cost_statistics("test"))
+        self.assertIsNone(self.sut.retrieve_expense_cost_statistics("Other"))
+
+    def test_retrieves_the_same_common_cost_with_and_without_indexes(self):
+        query = "INSERT INTO {} (name, cost, purchase_date, category_id) " \
+            "VALUES ('Test', 4, 10, 1), ('Test', 4, 20, 1), ('Test', 4, 30, 1), " \
+            "('TEST', 4, 40, 1), ('TEST', 4, 50, 1), ('Tests', 7, 60, 1), " \
+            "('Tests', 7, 70, 1), ('Tests', 7, 80, 1), ('Tests', 7, 90, 1), " \
+            "('Tests', 7, 100, 1), ('Test_', 9, 110, 1), ('Test_', 9, 120, 1), " \
+            "('Test_', 9, 130, 1), ('Test_', 9, 140, 1), ('Test_', 9, 150, 1), " \
+            "('Test%', 2, 160, 1)".format(self.expenses_table_name)
+
+        self.connection_provider.execute_query(query)
+
+        in_memory_indexes = InMemoryIndexes()
+        indexed_retriever = SqliteExpensesRetriever(
+            self.database_tables, self.connection_provider, in_memory_indexes)
+
+        in_memory_indexes.ensure_built(indexed_retriever)
+
+        for name, expected_cost in [("test", 4), ("TEST_", 9), ("Test%", 0)]:
+            with self.subTest(name=name):
+                self.assertEqual(expected_cost,
+                                 self.sut.retrieve_common_expense_cost(name))
+                self.assertEqual(expected_cost,
+                                 indexed_retriever.retrieve_common_expense_cost(name))
+
+    def test_matches_non_ascii_names_ignoring_case_with_and_without_indexes(self):
+        query = "INSERT INTO {} (name, cost, purchase_date, category_id) " \
+            "VALUES ('Żurek', 6, 10, 1), ('Żurek', 6, 20, 1), ('ŻUREK', 6, 30, 1), " \
+            "('żurek', 6, 40, 1), ('żurek', 5, 50, 1), ('Żurek', 6, 60, 1)".format(
+                self.expenses_table_name)
+
+        self.connection_provider.execute_query(query)
+        self.connection_provider.execute_query("INSERT INTO {} " \
+            "(category_id, name) VALUES (1, 'Food')".format(
+                self.categories_table_name))
+
+        in_memory_indexes = InMemoryIndexes()
+        indexed_retriever = SqliteExpensesRetriever(
+            self.database_tables, self.connection_provider, in_memory_indexes)
+
+        in_memory_indexes.ensure_built(indexed_retriever)
+
+        for retriever in [self.sut, indexed_retriever]:
+            with self.subTest(indexed=retriever is indexed_retriever):
+                self.assertEqual(6, retriever.retrieve_common_expense_cost("żurek"))
+                self.assertEqual(6, retriever.retrieve_expense_cost_statistics(
+                    "żUREK")["count"])
+                self.assertListEqual(["Żurek", "żurek", "ŻUREK"], [
+                    pair["name"] for pair in
+                    retriever.retrieve_similar_expense_names("żur")])
+
     def test_retrieve_common_expense_cost_zero_value_if_infrequent(self):
         self.sut = self.create()
 
-        query = "INSERT INTO {} (name, cost) VALUES " \
-            "('OTHER', 2), ('OTHER', 2), " \
-            "('TEST', 1), ('TEST', 1), ('TEST', 4), ('TEST', 4)".format(
+        query = "INSERT INTO {} (name, cost, purchase_date, category_id) " \
+            "VALUES ('OTHER', 2, 0, 1), ('OTHER', 2, 0, 1), " \
+            "('TEST', 1, 0, 1), ('TEST', 1, 0, 1), ('TEST', 4, 0, 1), " \
+            "('TEST', 4, 0, 1)".format(
                 self.expenses_table_name
             )
 
@@ -122,6 +199,124 @@ class TestSqliteExpensesRetriever(unittest.TestCase):
 
         self.assertEqual(self.sut.retrieve_common_expense_cost("TEST"), 0)
 
+    def test_retrieves_similar_expense_names_the_most_frequent_first(self):
+        query = "INSERT INTO {} (name, cost, purchase_date, category_id) " \
+            "VALUES ('Bread', 1, 0, 1), ('Breakfast', 1, 0, 1), " \
+            "('Breakfast', 1, 0, 1), ('Water', 1, 0, 1)".format(
+                self.expenses_table_name
+            )
+
+        self.connection_provider.execute_query(query)
+        self.connection_provider.execute_query("INSERT INTO {} " \
+            "(category_id, name) VALUES (1, 'Food')".format(
+                self.categories_table_name))
+
+        in_memory_indexes = InMemoryIndexes()
+        indexed_retriever = SqliteExpensesRetriever(
+            self.database_tables, self.connection_provider, in_memory_indexes)
+
+        in_memory_indexes.ensure_built(indexed_retriever)
+
+        expected = [
+            {"name": "Breakfast", "category": "Food"},
+            {"name": "Bread", "category": "Food"}
+        ]
+
+        self.assertListEqual(expected,
+                             self.sut.retrieve_similar_expense_names("bre"))
+        self.assertListEqual(expected,
+                             indexed_retriever.retrieve_similar_expense_names("bre"))
+
+    def test_retrieves_pages_of_expenses_after_cursor(self):
+        self.connection_provider.execute_query("INSERT INTO {} " \
+            "(category_id, name) VALUES (1, 'Food')".format(
+                self.categories_table_name))
+
+        for expense_id in range(1, 6):
+            self.connection_provider.execute_query("INSERT INTO {} " \
+                "(expense_id, name, cost, purchase_date, category_id) " \
+                "VALUES (?, 'Coffee', 1, ?, 1)".format(self.expenses_table_name),
+                (expense_id, 1566172800 + expense_id // 2))
+
+        def retrieve_pages(retrieve_page):
+            pages = []
+            cursor = None
+
+            while True:
+                expenses, cursor = retrieve_page(cursor)
+                pages.append([e.get_expense_id() for e in expenses])
+
+                if not cursor:
+                    return pages
+
+        expected_pages = [[5, 4], [3, 2], [1]]
+
+        self.assertListEqual(expected_pages, retrieve_pages(
+            lambda cursor: self.sut.retrieve_expenses_page("2019-08", 1, 2, cursor)))
+        self.assertListEqual(expected_pages, retrieve_pages(
+            lambda cursor: self.sut.filter_expenses_page("coffee", 2, cursor)))
+
+    def test_filters_expenses_ignoring_case_and_diacritics(self):
+        query = "INSERT INTO {} (expense_id, name, cost, purchase_date, " \
+            "category_id) VALUES (1, 'Żabka zakupy', 1, 1, 1), " \
+            "(2, 'ZAKUPY spożywcze', 1, 2, 1), (3, 'Kawa', 1, 3, 1)".format(
+                self.expenses_table_name
+            )
+
+        self.connection_provider.execute_query(query)
+        self.connection_provider.execute_query("INSERT INTO {} " \
+            "(category_id, name) VALUES (1, 'Food')".format(
+                self.categories_table_name))
+
+        def filter_expense_ids(phrase, *args):
+            return [e.get_expense_id() for e in self.sut.filter_expenses(phrase, *args)]
+
+        self.assertListEqual([2, 1], filter_expense_ids("zakup"))
+        self.assertListEqual([1], filter_expense_ids("zabka"))
+        self.assertListEqual([2], filter_expense_ids("spozywcze zak"))
+        self.assertListEqual([1], filter_expense_ids("zakup", 1, 1))
+        self.assertListEqual([], filter_expense_ids("%"))
+
+    def test_filters_expenses_by_fragments_inside_words(self):
+        self.connection_provider.execute_query("INSERT INTO {} (expense_id, " \
+            "name, cost, purchase_date, category_id) VALUES " \
+            "(1, 'Biedronka Market', 1, 1, 1), (2, 'Kawa', 1, 2, 1), " \
+            "(3, '100% sok', 1, 3, 1)".format(self.expenses_table_name))
+        self.connection_provider.execute_query("INSERT INTO {} " \
+            "(category_id, name) VALUES (1, 'Food')".format(
+                self.categories_table_name))
+
+        def filter_expense_ids(phrase):
+            return [e.get_expense_id() for e in self.sut.filter_expenses(phrase)]
+
+        def filter_expense_page_ids(phrase):
+            expenses, _ = self.sut.filter_expenses_page(phrase, 10)
+
+            return [e.get_expense_id() for e in expenses]
+
+        self.assertListEqual([1], filter_expense_ids("ark"))
+        self.assertListEqual([1], filter_expense_page_ids("ark"))
+        self.assertListEqual([3], filter_expense_ids("0%"))
+        self.assertListEqual([], filter_expense_ids("xyz"))
+
+    def test_filters_expenses_by_their_current_name(self):
+        self.connection_provider.execute_query("INSERT INTO {} (expense_id, " \
+            "name, cost, purchase_date, category_id) VALUES " \
+            "(1, 'Coffee', 1, 1, 1)".format(self.expenses_table_name))
+        self.connection_provider.execute_query("INSERT INTO {} " \
+            "(category_id, name) VALUES (1, 'Food')".format(
+                self.categories_table_name))
+        self.connection_provider.execute_query("UPDATE {} SET name = 'Tea' " \
+            "WHERE expense_id = 1".format(self.expenses_table_name))
+
+        self.assertListEqual([], self.sut.filter_expenses("coffee"))
+        self.assertEqual(1, len(self.sut.filter_expenses("tea")))
+
+        self.connection_provider.execute_query("DELETE FROM {}".format(
+            self.expenses_table_name))
+
+        self.assertListEqual([], self.sut.filter_expenses("tea"))
+
     def test_retrieves_tags(self):
         self.sut = self.create()
 
@@ -145,6 +340,29 @@ class TestSqliteExpensesRetriever(unittest.TestCase):
 
         self.assertEqual(expected_tags, self.sut.retrieve_tags())
 
+    @patch('builtins.print')
+    def test_caches_categories_until_persister_adds_one(self, _mock_print):
+        in_memory_indexes = InMemoryIndexes()
+        cached_retriever = SqliteExpensesRetriever(
+            self.database_tables, self.connection_provider, in_memory_indexes)
+        persister = SqliteExpensesPersister(
+            self.database_tables, self.connection_provider,
+            in_memory_indexes=in_memory_indexes)
+
+        self.assertListEqual([], cached_retriever.retrieve_categories())
+
+        # Written around the persister, so the cached result is kept
+        self.connection_provider.execute_query("INSERT INTO {} " \
+            "(category_id, name) VALUES (1, 'Food')".format(
+                self.categories_table_name))
+        self.assertListEqual([], cached_retriever.retrieve_categories())
+
+        persister.add_category(Category(None, "Bills"))
+
+        self.assertListEqual(["Bills", "Food"], [category.get_name() for category
+                             in cached_retriever.retrieve_categories()])
+        self.assertEqual(1, cached_retriever.get_query_cache_stats()["hits"])
+
     @patch('builtins.print')
     def test_retrieves_expense_tags(self, _mock_print):
         self.sut = self.create()
@@ -170,6 +388,229 @@ class TestSqliteExpensesRetriever(unittest.TestCase):
 
         self.assertListEqual(tags[:2], self.sut.retrieve_expense_tags(expenses[0]))
 
+    def test_retrieves_expenses_with_their_tags_from_requested_period(self):
+        self.sut = self.create()
+
+        queries = [
+            "INSERT INTO {} (category_id, name) VALUES (1, 'Food')".format(
+                self.categories_table_name),
+            "INSERT INTO {} (expense_id, name, cost, purchase_date, " \
+                "category_id) VALUES (1, 'In August', 11, 1566172800, 1), " \
+                "(2, 'In July', 22, 1563494400, 1), " \
+                "(3, 'Untagged', 33, 1566259200, 1)".format(
+                self.expenses_table_name),
+            "INSERT INTO {} (tag_id, name) VALUES ('tag-1', 'First Tag'), " \
+                "('tag-2', 'Second Tag')".format(self.tags_table_name),
+            "INSERT INTO {} (expense_id, tag_id) VALUES ('1', 'tag-1'), " \
+                "('1', 'tag-2'), ('2', 'tag-1')".format(
+                self.expense_tags_table_name)
+        ]
+
+        for query in queries:
+            self.connection_provider.execute_query(query)
+
+        expenses = list(self.sut.iterate_expenses("2019-08", 1))
+
+        self.assertListEqual([3, 1], [e.get_expense_id() for e in expenses])
+        self.assertListEqual([], expenses[0].get_tags())
+        self.assertListEqual([Tag("tag-1", "First Tag"), Tag("tag-2", "Second Tag")],
+                             expenses[1].get_tags())
+        self.assertListEqual(
+            [e.to_json() for e in expenses],
+            [e.to_json() for e in self.sut.retrieve_expenses("2019-08", 1)])
+
+        # Expenses with the same category and tags share their instances
+        expenses = self.sut.retrieve_expenses("2019-08", 2)
+
+        self.assertIs(expenses[0].get_category(), expenses[2].get_category())
+        self.assertIs(expenses[1].get_tags()[0], expenses[2].get_tags()[0])
+
+    @patch('builtins.print')
+    def test_retrieves_expenses_from_snapshot_kept_up_to_date(self, _mock_print):
+        in_memory_indexes = InMemoryIndexes(expense_snapshot_enabled=True)
+        snapshot_retriever = SqliteExpensesRetriever(
+            self.database_tables, self.connection_provider, in_memory_indexes)
+        persister = SqliteExpensesPersister(
+            self.database_tables, self.connection_provider,
+            in_memory_indexes=in_memory_indexes)
+        category = Category(1, "Food")
+
+        self.connection_provider.execute_query("INSERT INTO {} (category_id, " \
+            "name) VALUES (1, 'Food')".format(self.categories_table_name))
+        persister.add_expense(Expense(None, "Bread", 3, 1566172800, category,
+                                      [Tag(None, "Daily")]))
+        in_memory_indexes.ensure_built(snapshot_retriever)
+
+        self.assertTrue(in_memory_indexes.get_expense_snapshot().is_built())
+
+        persister.add_expenses([
+            Expense(None, "Milk", 4, 1563494400, category, [Tag(None, "Daily")]),
+            Expense(None, "Tea", 5, 1566259200, category, [])])
+        persister.update_expense(1, {"cost": 6, "name": "Rolls"})
+        persister.delete_expense(3)
+
+        self.assertTrue(in_memory_indexes.get_expense_snapshot().is_built())
+        self.assertListEqual(
+            [e.to_json() for e in self.sut.retrieve_expenses("2019-08", 2)],
+            [e.to_json() for e in snapshot_retriever.retrieve_expenses("2019-08", 2)])
+
+        # Replaced tags make the snapshot read again
+        persister.persist_expense_tags(
+            Expense(2, "Milk", 4, 1563494400, category, [Tag(None, "Dairy")]))
+
+        self.assertListEqual(
+            [e.to_json() for e in self.sut.retrieve_expenses("2019-08", 2)],
+            [e.to_json() for e in snapshot_retriever.retrieve_expenses("2019-08", 2)])
+        self.assertTrue(in_memory_indexes.get_expense_snapshot().is_built())
+
+    def test_retrieves_same_analytics_with_and_without_snapshot(self):
+        queries = [
+            "INSERT INTO {} (category_id, name) VALUES (1, 'Food'), " \
+                "(2, 'Fuel')".format(self.categories_table_name),
+            "INSERT INTO {} (name, cost, purchase_date, category_id) VALUES " \
+                "('Bread', 3, 1534723200, 1), ('Petrol', 50, 1563494400, 2), " \
+                "('Milk', 4, 1566172800, 1), ('Petrol', 40, 1566259200, 2)".format(
+                self.expenses_table_name)
+        ]
+
+        for query in queries:
+            self.connection_provider.execute_query(query)
+
+        in_memory_indexes = InMemoryIndexes(expense_snapshot_enabled=True)
+        snapshot_retriever = SqliteExpensesRetriever(
+            self.database_tables, self.connection_provider, in_memory_indexes)
+        in_memory_indexes.ensure_built(snapshot_retriever)
+
+        trends = self.sut.retrieve_trends("2019-08", 2)
+
+        self.assertListEqual([50, 44], trends["totals"])
+        self.assertListEqual([50, 41], trends["year_over_year"])
+        self.assertDictEqual(trends, snapshot_retriever.retrieve_trends("2019-08", 2))
+        self.assertListEqual(["Fuel", "Food"], [share["category"]["name"] for share
+                             in self.sut.retrieve_category_shares("2019-08", 1)])
+        self.assertListEqual(self.sut.retrieve_category_shares("2019-08", 1),
+                             snapshot_retriever.retrieve_category_shares("2019-08", 1))
+
+        with self.assertRaisesRegex(ValueError, "InvalidArgument"):
+            self.sut.retrieve_trends("2019-08", 0)
+
+    @patch('builtins.print')
+    def test_retrieves_same_totals_with_and_without_indexes(self, _mock_print):
+        in_memory_indexes = InMemoryIndexes()
+        indexed_retriever = SqliteExpensesRetriever(
+            self.database_tables, self.connection_provider, in_memory_indexes)
+        persister = SqliteExpensesPersister(
+            self.database_tables, self.connection_provider,
+            in_memory_indexes=in_memory_indexes)
+        food, fuel = Category(1, "Food"), Category(2, "Fuel")
+
+        persister.add_expense(Expense(None, "Bread", 3, 1566172800, food, []))
+        in_memory_indexes.ensure_built(indexed_retriever)
+        persister.add_expenses([
+            Expense(None, "Petrol", 50, 1563494400, fuel, []),
+            Expense(None, "Milk", 4, 1566259200, food, [])])
+        persister.update_expense(1, {"cost": 6, "date": "2019-08-20"})
+        persister.delete_expense(2)
+
+        for args in [(), ("2019-08-19", "2019-08-19"), ("2019-08-20", None, 1),
+                     (None, "2019-08-01", 1), (None, None, 2)]:
+            with self.subTest(args=args):
+                self.assertEqual(self.sut.retrieve_total(*args),
+                                 indexed_retriever.retrieve_total(*args))
+
+        self.assertEqual(10, indexed_retriever.retrieve_total("2019-08-20", None, 1))
+
+    def test_retrieves_summary_maintained_by_triggers(self):
+        queries = [
+            "INSERT INTO {} (category_id, name) VALUES (1, 'Food'), " \
+                "(2, 'Fuel')".format(self.categories_table_name),
+            "INSERT INTO {} (expense_id, name, cost, purchase_date, " \
+                "category_id) VALUES (1, 'Bread', 10, 1566172800, 1), " \
+                "(2, 'Milk', 5, 1566259200, 1), " \
+                "(3, 'Petrol', 20, 1563494400, 2)".format(
+                self.expenses_table_name),
+            "UPDATE {} SET cost = 7 WHERE expense_id = 2".format(
+                self.expenses_table_name),
+            "UPDATE {} SET purchase_date = 1566172800 WHERE expense_id = 3"
+                .format(self.expenses_table_name),
+            "DELETE FROM {} WHERE expense_id = 1".format(
+                self.expenses_table_name)
+        ]
+
+        for query in queries:
+            self.connection_provider.execute_query(query)
+
+        expected = [
+            {"month": "2019-08", "category": {"id": 1, "name": "Food"},
+             "total": 7, "count": 1},
+            {"month": "2019-08", "category": {"id": 2, "name": "Fuel"},
+             "total": 20, "count": 1}
+        ]
+
+        self.assertListEqual(expected, self.sut.retrieve_summary("2019-08", 2))
+
+        self.connection_provider.execute_query("DELETE FROM monthly_totals")
+        self.connection_provider.rebuild_monthly_totals()
+
+        self.assertListEqual(expected, self.sut.retrieve_summary("2019-08", 2))
+
+    @patch("storage.MonthsIndex.get_current_month", return_value="2019-09")
+    def test_retrieves_months_from_in_memory_indexes(self, _mock_month):
+        self.connection_provider.execute_query(
+            "INSERT INTO {} (expense_id, name, cost, purchase_date, " \
+            "category_id) VALUES (1, 'Bread', 10, 1563494400, 1)".format(
+                self.expenses_table_name))
+
+        in_memory_indexes = InMemoryIndexes()
+        self.sut = SqliteExpensesRetriever(self.database_tables,
+                                           self.connection_provider,
+                                           in_memory_indexes)
+        in_memory_indexes.ensure_built(self.sut)
+
+        self.assertListEqual([
+            {"month": "2019-07", "count": 1},
+            {"month": "2019-08", "count": 0},
+            {"month": "2019-09", "count": 0}
+        ], self.sut.retrieve_months_with_counts())
+
+        expense = Expense(2, "Milk", 5, 1559347200, Category(1, "Food"), [])
+        in_memory_indexes.on_expense_added(expense)
+
+        self.assertListEqual(["2019-06", "2019-07", "2019-08", "2019-09"],
+                             self.sut.retrieve_months())
+
+    def test_retrieves_suggestions_of_month_not_bought_in_it(self):
+        queries = [
+            "INSERT INTO {} (category_id, name) VALUES (1, 'Bills')".format(
+                self.categories_table_name),
+            "INSERT INTO {} (name, category_id, cost, months) VALUES " \
+                "('Rent', 1, 500, '1,2,3,4,5,6,7,8,9,10,11,12'), " \
+                "('Insurance', 1, 300, '5'), ('Tax', 1, 100, '3, 05 ,11'), " \
+                "('Gifts', 1, 50, '12,1')".format(self.suggestions_table_name),
+            # Rent is paid already in May 2019
+            "INSERT INTO {} (name, cost, purchase_date, category_id) " \
+                "VALUES ('Rent', 500, 1557878400, 1), " \
+                "('Insurance', 300, 1554076800, 1)".format(
+                self.expenses_table_name)
+        ]
+
+        for query in queries:
+            self.connection_provider.execute_query(query)
+
+        self.assertListEqual(["Insurance", "Tax"], sorted(
+            suggestion.get_name()
+            for suggestion in self.sut.retrieve_expense_suggestions("2019-05")))
+
+        self.connection_provider.execute_query("UPDATE {} SET months = '1' " \
+            "WHERE name = 'Tax'".format(self.suggestions_table_name))
+        self.connection_provider.execute_query("DELETE FROM {} " \
+            "WHERE name = 'Insurance'".format(self.suggestions_table_name))
+
+        self.assertListEqual([], self.sut.retrieve_expense_suggestions("2019-05"))
+        self.assertListEqual(["Gifts", "Rent", "Tax"], sorted(
+            suggestion.get_name()
+            for suggestion in self.sut.retrieve_expense_suggestions("2020-01")))
+
     def test_retrieves_shops(self):
       self.sut = self.create()
 
@@ -0,0 +1,50 @@
+import unittest
+
+from date_utils import (convert_date_string_to_timestamp, format_timestamp_as_date,
+                        get_date_of_timestamp, get_month_boundaries,
+                        get_month_of_timestamp, get_months_between, get_period,
+                        get_period_months, parse_month)
+
+class TestDateUtils(unittest.TestCase):
+    def test_converts_date_string_to_utc_midnight(self):
+        self.assertEqual(1566172800, convert_date_string_to_timestamp("2019-08-19"))
+        self.assertEqual(0, convert_date_string_to_timestamp("1970-01-01"))
+
+    def test_rejects_invalid_dates(self):
+        for value in ["2019-02-29", "2019-13-01", "2019-08", "yesterday"]:
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    convert_date_string_to_timestamp(value)
+
+    def test_formats_timestamps_in_utc(self):
+        self.assertEqual("2019-08-19", format_timestamp_as_date(1566259199))
+        self.assertEqual("2019-08-20", format_timestamp_as_date(1566259200))
+        self.assertEqual("2019-08", get_month_of_timestamp(1566259199.5))
+        self.assertEqual((2019, 8, 19),
+                         get_date_of_timestamp(1566172800).timetuple()[:3])
+
+    def test_parses_months(self):
+        self.assertEqual((2019, 8), parse_month("2019-08"))
+        self.assertEqual((2019, 8), parse_month("2019-08-19"))
+
+        for value in ["2019-13", "2019", "", None]:
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    parse_month(value)
+
+    def test_returns_month_boundaries(self):
+        self.assertEqual((1548979200, 1551398399), get_month_boundaries("2019-02"))
+
+    def test_period_starts_with_the_first_day_of_its_first_month(self):
+        # February is shorter than January, so subtracting a month
+        # from its last day doesn't reach the first day of the period
+        self.assertEqual(get_month_boundaries("2019-02"), get_period("2019-02", 1))
+        self.assertEqual(convert_date_string_to_timestamp("2018-12-01"),
+                         get_period("2019-02", 3)[0])
+        self.assertEqual(convert_date_string_to_timestamp("2019-03-01") - 1,
+                         get_period("2019-02", 3)[1])
+
+    def test_returns_months_of_period_across_years(self):
+        self.assertEqual(("2018-11", "2019-02"), get_period_months("2019-02", 4))
+        self.assertListEqual(["2018-12", "2019-01"],
+                             get_months_between("2018-12", "2019-01"))